@@ -0,0 +1,5 @@
+# Command line program of the parameter sweep, see ppq.cli.sweep
+from ppq.cli.sweep import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark and statistical equivalence check of the count-based fast simulation.
+
+With a fixed seed the script builds one library per sigma. Then, for each (sigma, P, secret bit),
+it draws Q1' and the satellite's Q1' many times from a fixed number of Alice's 1's, once by
+building and distorting the strings as ppq.trial.run_trial does, and once from the category
+counts with ppq.fastsim.sample_ones. It stops with an assertion error if the means differ by
+more than 5 standard errors or the log of the ratio of the variances is more than 5 of its
+standard deviations from 0, and otherwise prints the time per draw of each version. With few
+draws the sample variances scatter widely, so the allowed ratio widens as --draws shrinks.
+
+Usage: python benchmarks/bench_fastsim.py -R 200000 --draws 200
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.fastsim import FastLibrary, sample_ones
+from ppq.kernel import bernoulli_mask, distort_and_retrieve
+from ppq.pairs import build_library
+from ppq.satellite import SatelliteString, random_mask
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters R, n')
+parser.add_argument('-R', default=200000, metavar='R', type=int,
+                    help='Even integer > 0, length of bit string (and number of pairs)')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+parser.add_argument('--draws', default=200, type=int,
+                    help='Number of draws of each version per point')
+parser.add_argument('--seed', default=2019, type=int,
+                    help='Seed of the random number generator')
+args = parser.parse_args()
+if args.draws < 2:
+    parser.error('--draws must be at least 2 to estimate a variance')
+R, n = args.R, args.n
+
+# Largest ratio of the two sample variances accepted. The log of the ratio of two sample variances
+# of draws values each is close to normal with variance 4 / (draws - 1) (Fisher's z), so this is
+# 5 of its standard deviations: a factor of about 2 at 200 draws, but 28 at 10.
+RATIO_BOUND = math.exp(5 * math.sqrt(4 / (args.draws - 1)))
+
+rng = np.random.default_rng(args.seed)
+
+
+def full_ones(library, Q1_holder, P, secret_bit, rng):
+    """Q1' for the original and the satellite strings, by distorting whole strings."""
+    pairs, convert_pairs, satellite = library
+    bit_string = random_mask(R, Q1_holder, rng)
+    correct = bernoulli_mask(R, P, rng)
+    retrieved = distort_and_retrieve(bit_string, convert_pairs, pairs.less, pairs.more, secret_bit, correct)
+    sat_retrieved = satellite.restore(distort_and_retrieve(bit_string, satellite.string, pairs.less, pairs.more, secret_bit, correct))
+    return retrieved.count(), sat_retrieved.count()
+
+
+def check(name, full, fast):
+    full, fast = np.asarray(full, dtype=np.float64), np.asarray(fast, dtype=np.float64)
+    z = (full.mean() - fast.mean()) / math.sqrt((full.var(ddof=1) + fast.var(ddof=1)) / args.draws + 1e-12)
+    ratio = (full.var(ddof=1) + 1) / (fast.var(ddof=1) + 1)
+    assert abs(z) < 5 and 1 / RATIO_BOUND < ratio < RATIO_BOUND, '%s: full and fast simulations disagree (z = %.2f, variance ratio = %.2f)' % (name, z, ratio)
+    return z
+
+
+print('R = ', R, ' n = ', n, ' draws = ', args.draws, ' seed = ', args.seed,
+      ' variance ratio bound = ', format(RATIO_BOUND, '.2f'), '\n')
+
+for constant in (0.3, 0.4, 0.6, 1.5):
+    pairs, bits = build_library(R, n, constant * n, args.seed)
+    library = (pairs, bits, SatelliteString(bits, rng))
+    fast_library = FastLibrary.from_library(*library)
+
+    for P in (0.2, 0.8):
+        for secret_bit in (0, 1):
+            Q1_holder = R // 2 + R // 8
+
+            start = time.perf_counter()
+            full = [full_ones(library, Q1_holder, P, secret_bit, rng) for draw in range(args.draws)]
+            full_time = (time.perf_counter() - start) / args.draws
+
+            start = time.perf_counter()
+            fast = [sample_ones(fast_library.counts, Q1_holder, P, secret_bit, rng) for draw in range(args.draws)]
+            fast_time = (time.perf_counter() - start) / args.draws
+
+            z = check('Q1*', [f[0] for f in full], [f[0] for f in fast])
+            sat_z = check('SQ1', [f[1] for f in full], [f[1] for f in fast])
+
+            print('sigma = ', constant, '* n  P = ', P, ' secret bit = ', secret_bit,
+                  '  z = ', format(z, '.2f'), ' Sz = ', format(sat_z, '.2f'))
+            print('\tfull: ', format(full_time * 1000, '.2f'), 'ms', '  fast: ', format(fast_time * 1e6, '.1f'), 'us',
+                  '  speedup: ', format(full_time / fast_time, '.0f'), 'x')
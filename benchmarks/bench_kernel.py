@@ -0,0 +1,62 @@
+"""Benchmark and equivalence check of Step 4: distortion and retrieval of Alice's bit string.
+
+With a fixed seed the script builds one library and one Alice string, then runs the per-bit
+reference loop and the packed whole-string kernel on the same Bernoulli(P) mask, for both
+secret bits. The retrieved strings must be identical; the script stops with an assertion
+error if they are not, and otherwise prints the time taken by each version.
+
+Usage: python benchmarks/bench_kernel.py -R 200000 -n 100 --seed 2019
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.bitstring import BitString
+from ppq.kernel import bernoulli_mask, distort_and_retrieve, distort_and_retrieve_reference
+from ppq.pairs import generate_pairs
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters R, n')
+parser.add_argument('-R', default=200000, metavar='R', type=int,
+                    help='Integer > 0, length of bit string (and number of pairs)')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+parser.add_argument('-P', default=0.7, metavar='P', type=float,
+                    help='Probability of the correct bit transmission')
+parser.add_argument('--seed', default=2019, type=int,
+                    help='Seed of the random number generator')
+args = parser.parse_args()
+R, n, P = args.R, args.n, args.P
+
+rng = np.random.default_rng(args.seed)
+
+b, B, bits = generate_pairs(R, n, 0.4 * n, rng)
+pairs = np.column_stack((b, B))
+bob_bits = BitString.from_bits(bits)
+bit_string = BitString.from_bits(rng.integers(0, 2, R))
+correct = bernoulli_mask(R, P, rng)
+
+print('R = ', R, ' n = ', n, ' P = ', P, ' seed = ', args.seed, '\n')
+
+for secret_bit in (0, 1):
+
+    start = time.perf_counter()
+    expected = distort_and_retrieve_reference(bit_string.unpack().tolist(), bob_bits.unpack().tolist(),
+                                              pairs.tolist(), secret_bit, correct.unpack().tolist())
+    ref_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    b_less = BitString.from_bits(pairs[:, 0] < pairs[:, 1])
+    b_more = BitString.from_bits(pairs[:, 0] > pairs[:, 1])
+    retrieved = distort_and_retrieve(bit_string, bob_bits, b_less, b_more, secret_bit, correct)
+    fast_time = time.perf_counter() - start
+
+    assert retrieved == BitString.from_bits(expected), 'kernel and reference disagree'
+
+    print('secret bit = ', secret_bit, '  (strings identical)')
+    print('\treference: ', format(ref_time, '.3f'), 's')
+    print('\tkernel:    ', format(fast_time, '.4f'), 's', '  speedup: ', format(ref_time / fast_time, '.0f'), 'x')
@@ -0,0 +1,190 @@
+"""Load test of the host: many concurrent clients over the loopback interface, with JSON output.
+
+The script starts a Host in its own process, listening on a free loopback port, and drives it
+with M concurrent simulated clients for each combination of mode, M and bit string size:
+
+    echo    each exchange sends one BITSTRING message and reads the host's echo of it
+    trial   each client uploads its string once as a LIBRARY, then each exchange is one TRIAL
+            request answered by a RESULT holding Alice's distorted string
+
+Every client keeps one exchange outstanding at a time and starts the next as soon as the
+answer is in, for --duration seconds. For each combination the script reports the exchanges
+per second, the throughput in MB/s of the payload bytes sent plus received, the latency
+percentiles of an exchange, and the CPU time the host process used as a share of one core.
+
+The clients run on one event loop in this process, so on a machine with few cores they
+compete with the host for CPU; the host's CPU share shows which side is the bottleneck. The
+JSON document holds the environment and one record per (mode, clients, bits), so the records
+of two runs can be matched to track regressions in the transport code.
+
+Usage: python benchmarks/bench_load.py --clients 1,4,16 --bits 16000,1000000,10000000 --modes echo,trial
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_suite import environment, integers
+from ppq.bitstring import BitString
+from ppq.server import DEFAULT_TRIAL_THREADS, Host
+from ppq.wire import BITSTRING, LIBRARY, TRIAL, encode_header, read_frame, unpack_header, write_frame
+
+MODES = ['echo', 'trial']
+
+
+def serve(connection, trial_threads, seed):
+    """Body of the host process: send the port, then answer every message on connection with the CPU time used."""
+    async def run():
+        host = Host(trial_threads=trial_threads, seed=seed)
+        server = await asyncio.start_server(host.handle_connection, '127.0.0.1', 0, limit=host.read_buffer)
+        connection.send(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    def answer_cpu():
+        while connection.recv() is not None:
+            connection.send(time.process_time())
+
+    threading.Thread(target=answer_cpu, daemon=True).start()
+    asyncio.run(run())
+
+
+def start_host(trial_threads, seed):
+    """Start the host process; returns (process, connection, port)."""
+    ours, theirs = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(theirs, trial_threads, seed), daemon=True)
+    process.start()
+    return process, ours, ours.recv()
+
+
+def host_cpu(connection):
+    connection.send(True)
+    return connection.recv()
+
+
+def random_string(bits, rng):
+    data = rng.integers(0, 256, size=(bits + 7) // 8, dtype=np.uint8)
+    if bits % 8:
+        data[-1] &= 0xFF << (8 - bits % 8) & 0xFF   # Padding bits are 0
+    return BitString.from_bytes(data, bits)
+
+
+async def exchange(reader, writer, *buffers):
+    """Send one frame and read the answer; returns its payload."""
+    write_frame(writer, *buffers)
+    await writer.drain()
+    payload = await read_frame(reader)
+    if payload is None:
+        raise ConnectionError('host closed the connection')
+    return payload
+
+
+async def client(port, mode, n, bit_string, sigma, stop, latencies, counts):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+    try:
+        bits = len(bit_string)
+        if mode == 'trial':
+            header = encode_header(LIBRARY, bits, n, sigma, bits, sequence=1)
+            library = unpack_header(await exchange(reader, writer, header, bit_string.data)).library
+
+        request = 0
+        while time.perf_counter() < stop:
+            request += 1
+            if mode == 'echo':
+                buffers = (encode_header(BITSTRING, bits, n, sigma, bits, sequence=request), bit_string.data)
+            else:
+                buffers = (encode_header(TRIAL, bits, n, sigma, sequence=request, library=library,
+                                         extra=(0.7, request % 2)),)
+            start = time.perf_counter()
+            payload = await exchange(reader, writer, *buffers)
+            latencies.append(time.perf_counter() - start)
+            counts['sent'] += sum(memoryview(buffer).nbytes for buffer in buffers)
+            counts['received'] += len(payload)
+    finally:
+        writer.close()
+
+
+async def load(port, mode, n, clients, bit_strings, duration):
+    """Run clients clients for duration seconds; returns (seconds, latencies, counts)."""
+    latencies = []
+    counts = {'sent': 0, 'received': 0}
+    start = time.perf_counter()
+    stop = start + duration
+    await asyncio.gather(*(client(port, mode, n, bit_strings[c], 0.4 * n, stop, latencies, counts)
+                           for c in range(clients)))
+    return time.perf_counter() - start, latencies, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the numbers of clients and string sizes to load the host with')
+    parser.add_argument('--clients', default='1,4,16', type=integers,
+                        help='Comma-separated numbers of concurrent clients')
+    parser.add_argument('--bits', default='16000,1000000,10000000', type=integers,
+                        help='Comma-separated bit string sizes (1e6 style is accepted)')
+    parser.add_argument('--modes', default=','.join(MODES), type=lambda text: text.split(','),
+                        help='Comma-separated modes to run, from: ' + ', '.join(MODES))
+    parser.add_argument('--duration', default=5.0, type=float,
+                        help='Seconds of load for each combination')
+    parser.add_argument('--trial-threads', default=DEFAULT_TRIAL_THREADS, metavar='N', type=int,
+                        help="Number of the host's threads running trial requests")
+    parser.add_argument('-n', default=100, type=int,
+                        help='Value of n put in the messages')
+    parser.add_argument('--seed', default=2019, type=int,
+                        help='Seed of the random number generators')
+    parser.add_argument('--output', default=None,
+                        help='File to write the JSON results to (default: standard output)')
+    args = parser.parse_args()
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error('unknown mode %r' % mode)
+
+    records = []
+    rng = np.random.default_rng(args.seed)
+    process, connection, port = start_host(args.trial_threads, args.seed)
+
+    for mode in args.modes:
+        for bits in args.bits:
+            bit_strings = [random_string(bits, rng) for _ in range(max(args.clients))]
+            for clients in args.clients:
+                cpu = host_cpu(connection)
+                seconds, latencies, counts = asyncio.run(load(port, mode, args.n, clients, bit_strings, args.duration))
+                cpu = host_cpu(connection) - cpu
+
+                latencies = np.array(latencies) * 1000
+                p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (None,) * 3
+                record = {'mode': mode, 'clients': clients, 'bits': bits, 'seconds': seconds, 'exchanges': len(latencies),
+                          'exchanges_per_second': len(latencies) / seconds,
+                          'mb_per_second': (counts['sent'] + counts['received']) / seconds / 1e6,
+                          'bytes_sent': counts['sent'], 'bytes_received': counts['received'],
+                          'latency_ms': {'p50': p50, 'p90': p90, 'p99': p99,
+                                         'max': float(latencies.max()) if len(latencies) else None},
+                          'host_cpu_seconds': cpu, 'host_cpu_share': cpu / seconds}
+                records.append(record)
+                print('%-6s clients = %-4d bits = %-9d %8.1f exchanges/s %9.1f MB/s  p50 %8.2f ms  p99 %8.2f ms  host CPU %4.0f%%'
+                      % (mode, clients, bits, record['exchanges_per_second'], record['mb_per_second'],
+                         p50 or 0, p99 or 0, 100 * record['host_cpu_share']), file=sys.stderr)
+
+    connection.send(None)
+    process.terminate()
+    process.join()
+
+    document = {'environment': environment(seed=args.seed, duration=args.duration, trial_threads=args.trial_threads),
+                'results': records}
+    if args.output is None:
+        json.dump(document, sys.stdout, indent=1)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
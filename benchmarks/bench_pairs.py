@@ -0,0 +1,63 @@
+"""Benchmark of Step 1: the per-pair reference loop against the batched NumPy generator.
+
+For each sigma the two generators build a library of m pairs. The script prints the time
+taken by each and compares the resulting distributions (means of b and B, fraction of 1's
+in the bit string and the two-sample Kolmogorov-Smirnov distance between the B samples).
+
+Usage: python benchmarks/bench_pairs.py -m 1000000 -n 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.pairs import generate_pairs, generate_pairs_reference
+
+
+def ks_distance(x, y):
+    """Two-sample Kolmogorov-Smirnov statistic of the samples x and y."""
+    x, y = np.sort(x), np.sort(y)
+    grid = np.concatenate([x, y])
+    cdf_x = np.searchsorted(x, grid, side='right') / len(x)
+    cdf_y = np.searchsorted(y, grid, side='right') / len(y)
+    return np.max(np.abs(cdf_x - cdf_y))
+
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters m, n')
+parser.add_argument('-m', default=1000000, metavar='m', type=int,
+                    help='Integer > 0, number of pairs')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+args = parser.parse_args()
+m, n = args.m, args.n
+
+print('m = ', m, ' n = ', n, '\n')
+
+for constant in (0.3, 0.4, 0.6, 1.5):
+    sigma = constant * n
+
+    start = time.perf_counter()
+    pairs, ref_bits = generate_pairs_reference(m, n, sigma)
+    ref_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    b, B, bits = generate_pairs(m, n, sigma)
+    fast_time = time.perf_counter() - start
+
+    ref_b = np.fromiter((pair[0] for pair in pairs), dtype=np.float64, count=m)
+    ref_B = np.fromiter((pair[1] for pair in pairs), dtype=np.float64, count=m)
+
+    # Critical KS distance at the 0.1% level for two samples of size m
+    ks_critical = 1.95 * np.sqrt(2 / m)
+
+    print('sigma = ', constant, '* n')
+    print('\treference: ', format(ref_time, '.3f'), 's')
+    print('\tbatched:   ', format(fast_time, '.3f'), 's', '  speedup: ', format(ref_time / fast_time, '.1f'), 'x')
+    print('\tmean b:    ', format(ref_b.mean(), '.4f'), ' vs ', format(b.mean(), '.4f'))
+    print('\tmean B:    ', format(ref_B.mean(), '.4f'), ' vs ', format(B.mean(), '.4f'))
+    print('\tones:      ', format(sum(ref_bits) / m, '.4f'), ' vs ', format(bits.mean(), '.4f'))
+    print('\tKS(B):     ', format(ks_distance(ref_B, B), '.5f'), ' (critical ', format(ks_critical, '.5f'), ')')
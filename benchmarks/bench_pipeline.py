@@ -0,0 +1,86 @@
+"""Benchmark and equivalence check of the pipelined trial inputs.
+
+With a fixed seed the script builds the four sigma libraries once and runs the same trials
+with each trial drawing its own random inputs and through a TrialPipeline of each depth and
+number of producer threads given.
+Every run must give the same TrialResults; the script stops with an assertion error if they
+do not, and otherwise prints the time of each run and the time the trials waited for inputs.
+
+The pipeline overlaps the drawing with the trials only when there is a spare core for its
+thread; on one core it can only add its overhead.
+
+Usage: python benchmarks/bench_pipeline.py -R 5000000 -n 100 --trials 20 --depths 1,2,4 --threads 1,2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.metrics import Metrics
+from ppq.pairs import build_library
+from ppq.pipeline import TrialPipeline
+from ppq.satellite import SatelliteString
+from ppq.streams import TRIAL, Streams, generator
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS, run_trial
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters R, n')
+parser.add_argument('-R', default=5000000, metavar='R', type=int,
+                    help='Even integer > 0, length of bit string (and number of pairs)')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+parser.add_argument('--trials', default=20, type=int,
+                    help='Number of trials of each run')
+parser.add_argument('--depths', default='1,2,4', type=lambda text: [int(value) for value in text.split(',')],
+                    help='Comma-separated pipeline depths')
+parser.add_argument('--threads', default='1,2', type=lambda text: [int(value) for value in text.split(',')],
+                    help='Comma-separated numbers of producer threads')
+parser.add_argument('--seed', default=2019, type=int,
+                    help='Seed of the random streams')
+args = parser.parse_args()
+# Depth 0 is the run without a pipeline, which every depth is checked against
+if min(args.depths) < 1 or min(args.threads) < 1:
+    parser.error('--depths and --threads must be at least 1')
+R, n = args.R, args.n
+
+streams = Streams(args.seed)
+sigma_list = sorted(constant * n for constant in SIGMA_CONSTANTS)
+P_list = sorted(P_VALUES)
+libraries = dict()
+for sigma in sigma_list:
+    pairs, bits = build_library(R, n, sigma, streams)
+    libraries[sigma] = (pairs, bits, SatelliteString.from_streams(bits, n, sigma, streams))
+seeds = [streams.seed_sequence(TRIAL, trial) for trial in range(args.trials)]
+
+print('R = ', R, ' n = ', n, ' trials = ', args.trials, ' seed = ', args.seed, ' cpus = ', os.cpu_count(), '\n')
+
+
+def run(depth, threads=1):
+    """TrialResults of the trials, the time taken and the metrics, drawing the inputs in the trials if depth is 0."""
+    metrics = Metrics()
+    start = time.perf_counter()
+    results = []
+    if depth == 0:
+        for seed in seeds:
+            results.append(run_trial(libraries, sigma_list, P_list, R, generator(seed), metrics=metrics))
+    else:
+        pipeline = TrialPipeline(seeds, sigma_list, P_list, {sigma: R for sigma in sigma_list}, R, depth, threads)
+        for trial in range(len(seeds)):
+            results.append(run_trial(libraries, sigma_list, P_list, R, None, metrics=metrics,
+                                     inputs=pipeline.inputs(trial)))
+            pipeline.finished(trial)
+        pipeline.close()
+    return results, time.perf_counter() - start, metrics
+
+
+expected, elapsed, metrics = run(0)
+print('no pipeline   %8.3f s  restarts: %d  inputs drawn in the trials: %.3f s' % (
+    elapsed, sum(result.restarts for result in expected),
+    sum(metrics.stages[name][0] for name in ('step2.alice', 'step3.mask'))))
+for threads in args.threads:
+    for depth in args.depths:
+        results, elapsed, metrics = run(depth, threads)
+        assert results == expected, 'trials differ with a pipeline of depth %d on %d threads' % (depth, threads)
+        print('depth = %-3d threads = %-3d %8.3f s  waited for inputs: %.3f s  (trials identical)' % (
+            depth, threads, elapsed, metrics.stages['pipeline.wait'][0]))
@@ -0,0 +1,60 @@
+"""Benchmark and cross-check of the range finder: Monte Carlo estimate against analytic q.
+
+For each (P, sigma) point the script runs a number of Monte Carlo trials (a fresh library of
+m pairs and N draws each) and the analytic computation. It prints the time of each, the
+mean and spread of the trials next to the analytic q and standard deviation, and stops with
+an assertion error if the trial mean is further than 5 standard errors from the analytic q.
+
+Usage: python benchmarks/bench_range_finder.py -m 30000 -N 500000 --trials 20
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.range_finder import analytic_q, estimate_q
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters m, n, N')
+parser.add_argument('-m', default=30000, metavar='m', type=int,
+                    help='Integer > 0, number of pairs')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+parser.add_argument('-N', default=500000, metavar='N', type=int,
+                    help='Number of draws per Monte Carlo trial')
+parser.add_argument('--trials', default=20, type=int,
+                    help='Number of Monte Carlo trials per point')
+parser.add_argument('--seed', default=2019, type=int,
+                    help='Seed of the random number generator')
+args = parser.parse_args()
+m, n, N = args.m, args.n, args.N
+
+rng = np.random.default_rng(args.seed)
+
+print('m = ', m, ' n = ', n, ' N = ', N, ' trials = ', args.trials, '\n')
+
+for P in (0.2, 0.3, 0.7, 0.8):
+    for constant in (0.3, 0.4, 0.6, 1.5):
+        sigma = constant * n
+
+        start = time.perf_counter()
+        Q_List = [estimate_q(P, sigma, m, n, N, rng) for trial in range(args.trials)]
+        mc_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        q, variance = analytic_q(P, sigma, n, m, N)
+        analytic_time = time.perf_counter() - start
+
+        mean = np.mean(Q_List)
+        z = (mean - q) / math.sqrt(variance / args.trials)
+        assert abs(z) < 5, 'Monte Carlo and analytic q disagree at P = %s, sigma = %s * n' % (P, constant)
+
+        print('P = ', P, ' sigma = ', constant, '* n')
+        print('\tMonte Carlo: q = ', format(mean, '.5f'), ' sd = ', format(np.std(Q_List, ddof=1), '.5f'),
+              ' time = ', format(mc_time, '.3f'), 's')
+        print('\tanalytic:    q = ', format(q, '.5f'), ' sd = ', format(math.sqrt(variance), '.5f'),
+              ' time = ', format(analytic_time * 1000, '.2f'), 'ms', '  z = ', format(z, '.2f'))
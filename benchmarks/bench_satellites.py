@@ -0,0 +1,101 @@
+"""Benchmark and equivalence check of the batched evaluation of many satellites.
+
+With a fixed seed the script builds one library, sets B = b on a share of its pairs (in a
+generated library B is continuous, so no pair has b = B and no satellite can differ from Bob),
+and draws a SatelliteBatch of K satellites. For one trial of each secret bit it compares every
+satellite's count of 1's from SatelliteBatch.count_ones with a full distort, retrieve and
+restore of that satellite's whole string, stopping with an assertion error if any differ. It
+then times the batch against the per-satellite loop for each K given.
+
+Usage: python benchmarks/bench_satellites.py -R 1000000 -n 100 --equal 0.01 -K 1,10,100,1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.bitstring import BitString
+from ppq.kernel import bernoulli_mask, distort, distort_and_retrieve, retrieve, satellite_changes
+from ppq.pairs import PairLibrary, build_library
+from ppq.satellite import SatelliteBatch, random_mask
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters R, n, K')
+parser.add_argument('-R', default=1000000, metavar='R', type=int,
+                    help='Integer > 0, length of bit string (and number of pairs)')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+parser.add_argument('-P', default=0.7, metavar='P', type=float,
+                    help='Probability of the correct bit transmission')
+parser.add_argument('--equal', default=0.01, type=float,
+                    help='Share of the pairs given B = b')
+parser.add_argument('-K', default='1,10,100,1000', type=lambda text: [int(value) for value in text.split(',')],
+                    help='Comma-separated numbers of satellites to time')
+parser.add_argument('--check', default=20, type=int,
+                    help='Number of satellites checked against the full evaluation')
+parser.add_argument('--seed', default=2019, type=int,
+                    help='Seed of the random number generator')
+args = parser.parse_args()
+R, n, P = args.R, args.n, args.P
+
+rng = np.random.default_rng(args.seed)
+
+library, bits = build_library(R, n, 0.4 * n, args.seed)
+B = library.B.copy()
+equal = rng.choice(R, int(args.equal * R), replace=False)
+B[equal] = library.b[equal]
+library = PairLibrary(library.b, B, bits)
+
+bit_string = random_mask(R, R // 2, rng)
+correct = bernoulli_mask(R, P, rng)
+
+print('R = ', R, ' n = ', n, ' P = ', P, ' pairs with b = B: ', len(equal), ' seed = ', args.seed, '\n')
+
+
+def full_mask(batch, row):
+    """The changed positions of one satellite as a whole string (only its sensitive ones are kept)."""
+    mask = BitString(R)
+    mask[batch.positions[np.unpackbits(batch.masks[row], count=len(batch.positions)) == 1]] = 1
+    return mask
+
+
+def batch_counts(batch, secret_bit):
+    distorted = distort(bit_string, bits, secret_bit, correct)
+    retrieved = retrieve(distorted, library.less, library.more, secret_bit)
+    gain, loss = satellite_changes(distorted, retrieved, library.less, library.more, secret_bit)
+    return batch.count_ones(retrieved.count(), gain, loss)
+
+
+def full_counts(masks, secret_bit):
+    return [(distort_and_retrieve(bit_string, bits ^ mask, library.less, library.more, secret_bit, correct) ^ mask).count()
+            for mask in masks]
+
+
+batch = SatelliteBatch.random(library.less, library.more, args.check, rng)
+masks = [full_mask(batch, row) for row in range(len(batch))]
+for secret_bit in (0, 1):
+    assert list(batch_counts(batch, secret_bit)) == full_counts(masks, secret_bit), 'batch and full evaluation disagree'
+    print('secret bit = ', secret_bit, '  (', len(batch), 'satellites identical)')
+print()
+
+for K in args.K:
+    start = time.perf_counter()
+    batch = SatelliteBatch.random(library.less, library.more, K, rng)
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_counts(batch, 1)
+    batch_time = time.perf_counter() - start
+
+    # The per-satellite loop is timed on a few satellites and scaled to K
+    sample = min(K, 10)
+    masks = [full_mask(batch, row) for row in range(sample)]
+    start = time.perf_counter()
+    full_counts(masks, 1)
+    full_time = (time.perf_counter() - start) * K / sample
+
+    print('K = %-6d setup: %8.3f s  batch: %8.4f s  per-satellite loop: %8.3f s  speedup: %6.1f x  masks: %.1f MB'
+          % (K, setup_time, batch_time, full_time, full_time / batch_time, batch.masks.nbytes / 1e6))
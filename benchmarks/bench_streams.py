@@ -0,0 +1,57 @@
+"""Benchmark and reproducibility check of library generation from the random streams.
+
+With a fixed seed the script builds one library with build_library on 1 and on several worker
+processes, and regenerates it chunk by chunk through StreamingLibrary with several chunk
+sizes. Every version must give bit-identical pairs; the script stops with an assertion error
+if they do not, and otherwise prints the time taken by each version.
+
+Usage: python benchmarks/bench_streams.py -m 2000000 -n 100 --workers 1,2,4 --chunks 100000,1048576
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.pairs import build_library
+from ppq.streaming import StreamingLibrary
+
+parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters m, n')
+parser.add_argument('-m', default=2000000, metavar='m', type=int,
+                    help='Integer > 0, number of pairs')
+parser.add_argument('-n', default=100, metavar='n', type=int,
+                    help='Natural number, defines boundary of interval [0, n-1] for b')
+parser.add_argument('--workers', default='1,2,4', type=lambda text: [int(value) for value in text.split(',')],
+                    help='Comma-separated numbers of worker processes')
+parser.add_argument('--chunks', default='100000,1048576', type=lambda text: [int(value) for value in text.split(',')],
+                    help='Comma-separated chunk sizes, in bits, of the streaming library')
+parser.add_argument('--seed', default=2019, type=int,
+                    help='Seed of the random streams')
+args = parser.parse_args()
+m, n, sigma = args.m, args.n, 0.4 * args.n
+
+print('m = ', m, ' n = ', n, ' sigma = ', sigma, ' seed = ', args.seed, '\n')
+
+expected = None
+for workers in args.workers:
+    start = time.perf_counter()
+    pairs, bits = build_library(m, n, sigma, args.seed, workers=workers)
+    elapsed = time.perf_counter() - start
+    arrays = (pairs.b, pairs.B, bits.data)
+    if expected is None:
+        expected = arrays
+    assert all(map(np.array_equal, arrays, expected)), 'library differs with %d workers' % workers
+    print('workers = ', workers, '  %.3f s  (pairs identical)' % elapsed)
+
+for chunk_size in args.chunks:
+    start = time.perf_counter()
+    library = StreamingLibrary(m, n, sigma, args.seed, chunk_size)
+    chunks = [library.pairs(c) for c in range(library.chunks)]
+    arrays = [np.concatenate([getattr(pairs, name) for pairs in chunks]) for name in ('b', 'B')]
+    arrays.append(np.concatenate([pairs.bits.data for pairs in chunks]))
+    elapsed = time.perf_counter() - start
+    assert all(map(np.array_equal, arrays, expected)), 'streaming library differs with chunks of %d bits' % chunk_size
+    print('chunk size = ', library.chunk_size, '  %.3f s  (pairs identical)' % elapsed)
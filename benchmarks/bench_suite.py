@@ -0,0 +1,159 @@
+"""Benchmark suite of every stage of the protocol, with JSON output.
+
+Each stage is timed on its own for every size (m = R) and n given, repeating each measurement
+and keeping all the times:
+
+    pairs          Step 1, generating one sigma's library of m pairs and its bit string
+    satellite      building the SatelliteString of a library
+    alice          Step 2, Alice's random bit string of R bits
+    distortion     Step 3, Alice distorting her string against Bob's
+    retrieval      Bob's retrieval of b from the distorted string
+    restore        changing the satellite's positions back
+    fastsim        one count-based trial (ppq.fastsim), the fast engine for Steps 2 to 5
+    range_finder   Monte Carlo estimate of q with N = m draws
+    loopback       sending one bit string to an in-process host and reading its echo
+
+The JSON document holds the environment (versions, platform, commit) and one record per
+(stage, size, n) with the times in seconds, the best and median time and the rate in bits per
+second of the best time. Records of two runs can be matched on (stage, size, n) to track
+regressions or to compare engines.
+
+Usage: python benchmarks/bench_suite.py --sizes 10000,100000,1000000 -n 100 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ppq.fastsim import FastLibrary, sample_ones
+from ppq.kernel import bernoulli_mask, distort, retrieve
+from ppq.pairs import build_library
+from ppq.range_finder import estimate_q
+from ppq.satellite import SatelliteString
+from ppq.server import Host
+from ppq.trial import build_alice_string
+from ppq.wire import BITSTRING, recv_message, send_message
+
+STAGES = ['pairs', 'satellite', 'alice', 'distortion', 'retrieval', 'restore', 'fastsim', 'range_finder', 'loopback']
+
+
+def integers(text):
+    return [int(float(value)) for value in text.split(',')]
+
+
+def environment(**settings):
+    """Versions, platform and commit the benchmark ran on, with the run's settings."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return dict({'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                 'processor': platform.processor(), 'cpus': os.cpu_count(), 'commit': commit,
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')}, **settings)
+
+
+def start_host():
+    """Run a Host on an event loop in a background thread; returns its port."""
+    loop = asyncio.new_event_loop()
+    host = Host()
+    server = loop.run_until_complete(asyncio.start_server(host.handle_connection, '127.0.0.1', 0, limit=host.read_buffer))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return server.sockets[0].getsockname()[1]
+
+
+def loopback(port, n, sigma, bit_string):
+    """Send bit_string to the host and read its echo over a new connection."""
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        send_message(sock, BITSTRING, len(bit_string), n, sigma, bit_string)
+        recv_message(sock)
+
+
+def timed(function, setup, repeat):
+    """Times of repeat runs of function(*setup()), the setup excluded from the timing."""
+    times = []
+    for _ in range(repeat):
+        inputs = setup()
+        start = time.perf_counter()
+        function(*inputs)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the sizes m = R and values of n to benchmark')
+    parser.add_argument('--sizes', default='10000,100000,1000000,10000000', type=integers,
+                        help='Comma-separated values of m = R (1e4 style is accepted)')
+    parser.add_argument('-n', default='100', type=integers,
+                        help='Comma-separated values of n')
+    parser.add_argument('--stages', default=','.join(STAGES), type=lambda text: text.split(','),
+                        help='Comma-separated stages to run, from: ' + ', '.join(STAGES))
+    parser.add_argument('--repeat', default=3, type=int,
+                        help='Number of timed runs of each stage')
+    parser.add_argument('--seed', default=2019, type=int,
+                        help='Seed of the random number generators')
+    parser.add_argument('--output', default=None,
+                        help='File to write the JSON results to (default: standard output)')
+    args = parser.parse_args()
+    for stage in args.stages:
+        if stage not in STAGES:
+            parser.error('unknown stage %r' % stage)
+    repeat = args.repeat
+
+    records = []
+    rng = np.random.default_rng(args.seed)
+    port = start_host() if 'loopback' in args.stages else None
+
+    for n in args.n:
+        sigma = 0.4 * n
+        for size in args.sizes:
+            R = size
+            pairs, bits = build_library(size, n, sigma, args.seed)
+            satellite = SatelliteString(bits, rng)
+            b_less, b_more = pairs.less, pairs.more
+            k, alice = build_alice_string(R, rng)
+            correct = bernoulli_mask(R, 0.7, rng)
+            distorted = distort(alice, bits, 1, correct)
+
+            stages = {
+                'pairs': lambda: timed(build_library, lambda: (size, n, sigma, None), repeat),
+                'satellite': lambda: timed(SatelliteString, lambda: (bits, rng), repeat),
+                'alice': lambda: timed(build_alice_string, lambda: (R, rng), repeat),
+                'distortion': lambda: timed(distort, lambda: (alice, bits, 1, correct), repeat),
+                'retrieval': lambda: timed(retrieve, lambda: (distorted, b_less, b_more, 1), repeat),
+                'restore': lambda: timed(satellite.restore, lambda: (distorted.copy(),), repeat),
+                'fastsim': lambda: timed(sample_ones, lambda: (FastLibrary.from_library(pairs, bits, satellite).counts,
+                                                                 (k + R) // 2, 0.7, 1, rng), repeat),
+                'range_finder': lambda: timed(estimate_q, lambda: (0.7, sigma, size, n, size, rng), repeat),
+                'loopback': lambda: timed(loopback, lambda: (port, n, sigma, bits), repeat),
+            }
+
+            for stage in args.stages:
+                times = stages[stage]()
+                best = min(times)
+                records.append({'stage': stage, 'size': size, 'n': n, 'sigma': sigma, 'seconds': times,
+                                'best': best, 'median': float(np.median(times)),
+                                'bits_per_second': size / best if best > 0 else None})
+                print('%-13s size = %-9d n = %-4d best = %.6f s' % (stage, size, n, best), file=sys.stderr)
+
+    document = {'environment': environment(seed=args.seed, repeat=args.repeat), 'results': records}
+    if args.output is None:
+        json.dump(document, sys.stdout, indent=1)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
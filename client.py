@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 
 import socket
-import random
 import argparse
-import math
-import copy
 import time
 
+from ppq.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, LibraryCache
+from ppq.pairs import build_library
+from ppq.satellite import SatelliteString
+from ppq.streams import Streams
+from ppq.transmit import (DEFAULT_CHUNK_BITS, DEFAULT_IN_FLIGHT, DEFAULT_QUEUE_DEPTH, run_remote_trials, send_pipelined,
+                          upload_libraries)
+from ppq.wire import BITSTRING, recv_message, send_message
+
 HOST = '127.0.0.1'  # The server's hostname or IP address
 PORT = 27501        # The port used by the server
 
@@ -35,91 +40,106 @@ parser.add_argument('-n', default=100, metavar='n', type=int,
                     help='Natural number, defines boundary of interval [0, n-1] for b')
 parser.add_argument('-R', default=5000000, metavar='R', type=int,
                     help='Even integer > 0, length of bit string, MUST be equal to m')
+parser.add_argument('--seed', default=None, type=int,
+                    help='Seed of the random number generators (default: fresh entropy each run)')
+parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                    help='Directory of the cache of generated pair libraries')
+parser.add_argument('--cache-size', default=DEFAULT_MAX_BYTES / (1 << 30), type=float,
+                    help='Size cap of the library cache, in GiB')
+parser.add_argument('--no-cache', action='store_true',
+                    help='Always generate the pair libraries, without reading or writing the cache '
+                         '(runs without --seed never use it)')
+parser.add_argument('--pipeline', action='store_true',
+                    help='Send each bit string in chunks while it is generated, instead of after Step 1')
+parser.add_argument('--chunk-bits', default=DEFAULT_CHUNK_BITS, metavar='bits', type=int,
+                    help='Bits per chunk in pipelined mode (rounded up to a multiple of 65536)')
+parser.add_argument('--queue-depth', default=DEFAULT_QUEUE_DEPTH, metavar='chunks', type=int,
+                    help='Chunks generated ahead of the socket in pipelined mode')
+parser.add_argument('--session', action='store_true',
+                    help='Upload each library once, then run trials over the same connection with the host as Alice')
+parser.add_argument('--trials', default=100, type=int,
+                    help='Number of trials in session mode')
+parser.add_argument('--in-flight', default=DEFAULT_IN_FLIGHT, metavar='N', type=int,
+                    help='Trial requests sent ahead of their answers in session mode')
 args = parser.parse_args()
 
 # Re-naming parameters
 m, n, R = args.m, args.n, args.R
 assert(m == R)
-# Bounds for B
-B_more_than, B_less_than = 1, n - 2
-
-# Random number generator
-random.seed()
 
+# Random streams: one for each block of pairs, satellite and trial (see ppq.streams)
+streams = Streams(args.seed)
 
-# (1) Creating pairs (b_i, B_i) ==========================================================================================
-
-print("Step 1: Creating Bob's (b, B) pairs and converting them into bit strings", '\n\t', "[this might take a minute...]")
-
-# Initializing the "libraries"
-pairs_dict = dict()          # Initializing the "library" of pairs (b_i, B_i), for each value of sigma
-pairs_to_bits = dict()       # Initialize dictionary of converted pair bit strings
-string_class_dict = dict()   # Creates a dictionary for class SatelliteString
+# Cache of generated pair libraries; an unseeded run's libraries are new every time, so they are not cached
+cache = None if args.no_cache or args.seed is None else LibraryCache(args.cache_dir, int(args.cache_size * (1 << 30)))
 
 # Initialize sigma and P sets
 sigma_set = {0.3 * n, 0.4 * n, 0.6 * n, 1.5 * n}
 P_set = {0.2, 0.3, 0.7, 0.8}
 
 
-# Creates a class for the satellite strings in order to conveniently hold information
-class SatelliteString:
+# Pipelined mode: Step 1 runs chunk by chunk in a producer thread while the chunks are sent
+if args.pipeline:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.connect((HOST, PORT))
+        sent = send_pipelined(s, m, n, sorted(sigma_set), args.seed, args.chunk_bits, args.queue_depth)
 
-    # Initialization of a class variable
-    def __init__(self, *args):
-        self.string = args      # Note: this class must be supplied with an arg to make the functions work
-        self.number = random.randint(1, m + 1)  # Pseudo-random generation of an integer for number of indices to change
-        self.indices = random.sample(range(len(self.string[0])), self.number) # Randomly selects which indices to change
-        self.positions = [0] * m                                              # Used to store changed positions
+        # The host acknowledges each sigma once it has all of its chunks
+        for val in sigma_set:
+            message, data = recv_message(s)
+            print('Host reassembled', message.m, 'bits for sigma = ', message.sigma, 'from', message.sequence + 1, 'chunks')
 
-    # Call to change random indices of the satellite bit string
-    def change_and_save_places(self):
+    print('Sent', sent, 'chunks in', round(time.time() - start_time, 3), 'seconds')
+    exit(0)
 
-        for g in self.indices:
-            self.string[0][g] = (self.string[0][g] + 1) % 2 # change specific bit
-            self.positions[g] = 1   # store changed location
 
+# (1) Creating pairs (b_i, B_i) ==========================================================================================
+
+print("Step 1: Creating Bob's (b, B) pairs and converting them into bit strings", '\n\t', "[this might take a minute...]")
+
+# Initializing the "libraries"
+pairs_dict = dict()          # Initializing the "library" of pairs (b_i, B_i), for each value of sigma
+pairs_to_bits = dict()       # Initialize dictionary of converted pair bit strings
+string_class_dict = dict()   # Creates a dictionary for class SatelliteString
 
 # For each sigma, make a list of pairs, create its bit string, and create a copy of the bit string to be altered
 for val in sigma_set:
     print(val) # Use to track what the current sigma is
 
-    # Initialize empty lists
-    pairs_dict[val] = list()        # List used for pair values
-    pairs_to_bits[val] = list()     # List used for bits
-
-    # Pair creation main loop
-    # While the number of pairs in the library is < m, keep creating new pairs
-    while len(pairs_dict[val]) < m:
+    # Create the PairLibrary of (b, B) pairs and its packed bit string, or open them from the cache
+    if cache is not None:
+        pairs_dict[val], pairs_to_bits[val] = cache.library(m, n, val, args.seed)
+    else:
+        pairs_dict[val], pairs_to_bits[val] = build_library(m, n, val, streams)
 
-        # (i) Selecting b_i
-        b = random.randint(0, n - 1)
+    # For the given sigma value, create a SatelliteString object, which picks the random indices it changes
+    string_class_dict[val] = SatelliteString.from_streams(pairs_to_bits[val], n, val, streams)
 
-        # (ii) Selecting B_i
-        B = random.normalvariate(b, val)
+print('...done!', '\n')
 
-        # (iii) Dropping B_i that lie outside the interval [1, n-2]
-        if B_more_than <= B <= B_less_than and B != ((n - 1) / 2):
-            pair = (b, B)
-            pairs_dict[val].append(pair)
 
-            # Create Bit String
-            if pair[1] >= (n - 1) / 2:          # If B is greater than the midpoint,
-                pairs_to_bits[val].append(1)    # Add a 1 to the string
-            else:
-                pairs_to_bits[val].append(0)    # Else add a 0
 
-    # For the given sigma value, create a SatelliteString object, and supply its string a copy of the respective bit string
-    string_class_dict[val] = SatelliteString(copy.copy(pairs_to_bits[val]))
-    # For each SatelliteString, change random indices and store the changed locations
-    string_class_dict[val].change_and_save_places()
+with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+    s.connect((HOST, PORT))
 
-print('...done!', '\n')
+    # Session mode: the libraries cross the connection once, then every trial reuses them
+    if args.session:
+        library_ids = upload_libraries(s, m, n, pairs_to_bits)
+        print('Uploaded libraries', library_ids, '\n')
 
+        libraries = {val: (pairs_dict[val], pairs_to_bits[val]) for val in sigma_set}
+        for trial, sigma, P, k, mu, restarts in run_remote_trials(s, n, libraries, library_ids, sorted(sigma_set),
+                                                                  sorted(P_set), args.trials, streams, args.in_flight):
+            print('Trial', trial + 1, ' P = ', round(1 - P, 1), ' sigma = ', sigma, ' k = ', k, ' mu = ', mu,
+                  ' q = ', round(0.5 + mu / (2 * k), 4), ' restarts = ', restarts)
 
+        print('\n', args.trials, 'trials in', round(time.time() - start_time, 3), 'seconds')
+        exit(0)
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.connect((HOST, PORT))
-    s.sendall(bytes(pairs_to_bits[val]))
-    data = s.recv(1024)
+    # Bob's bit string for each sigma, sent packed 8 bits per byte straight from its buffer
+    for val in sorted(sigma_set):
+        send_message(s, BITSTRING, m, n, val, pairs_to_bits[val])
+        message, data = recv_message(s)     # The host's reply, read in full into one buffer
 
-print('Received', repr(data))
\ No newline at end of file
+        print('Received', message.nbits, 'bits for sigma = ', message.sigma,
+              '(intact)' if data == pairs_to_bits[val] else '(CORRUPTED)')
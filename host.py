@@ -1,19 +1,44 @@
 #!/usr/bin/env python3
 
-import socket
+import argparse
+import asyncio
+import logging
+
+from ppq.server import (DEFAULT_MAX_CHUNK_RUNS, DEFAULT_MAX_LIBRARIES, DEFAULT_READ_BUFFER, DEFAULT_TRIAL_THREADS,
+                        DEFAULT_WRITE_BUFFER, Host)
+from ppq.wire import DEFAULT_MAX_FRAME
 
 HOST = '127.0.0.1'  # Standard loopback interface address (localhost)
 PORT = 27501        # Port to listen on (non-privileged ports are > 1023)
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.bind((HOST, PORT))
-    s.listen()
-    conn, addr = s.accept()
-    with conn:
-        print('Connected by', addr)
-        while True:
-            data = conn.recv(2000)
-            print (data)
-            if not data:
-                break
-            conn.sendall(data)
+parser = argparse.ArgumentParser(prog='Information Security', usage='Serves many client sessions at once')
+parser.add_argument('--host', default=HOST,
+                    help='Address to listen on')
+parser.add_argument('--port', default=PORT, type=int,
+                    help='Port to listen on')
+parser.add_argument('--max-frame', default=DEFAULT_MAX_FRAME, metavar='bytes', type=int,
+                    help='Largest message accepted from a client')
+parser.add_argument('--read-buffer', default=DEFAULT_READ_BUFFER, metavar='bytes', type=int,
+                    help='Size of the read buffer of each session')
+parser.add_argument('--write-buffer', default=DEFAULT_WRITE_BUFFER, metavar='bytes', type=int,
+                    help='Bytes queued for a session before the host waits for the client to read them')
+parser.add_argument('--trial-threads', default=DEFAULT_TRIAL_THREADS, metavar='N', type=int,
+                    help='Number of trial requests run at the same time, over all sessions')
+parser.add_argument('--max-libraries', default=DEFAULT_MAX_LIBRARIES, metavar='N', type=int,
+                    help='Libraries one session can upload; a session going over is closed')
+parser.add_argument('--max-chunk-runs', default=DEFAULT_MAX_CHUNK_RUNS, metavar='N', type=int,
+                    help='Runs of chunks one session can have unfinished at once; a session going over is closed')
+parser.add_argument('--seed', default=None, type=int,
+                    help="Seed of Alice's random number generators (default: fresh entropy each run)")
+parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                    help='Level of the log messages shown (DEBUG shows every frame)')
+args = parser.parse_args()
+
+logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(message)s')
+
+host = Host(args.max_frame, args.read_buffer, args.write_buffer, args.trial_threads, args.seed, args.max_libraries,
+            args.max_chunk_runs)
+try:
+    asyncio.run(host.serve(args.host, args.port))
+except KeyboardInterrupt:
+    pass
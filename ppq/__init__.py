@@ -0,0 +1,53 @@
+"""Shared building blocks for the bit string transmission protocol scripts.
+
+The main names are importable from the package itself, and importing ppq runs nothing and
+loads no module until one of them is first used:
+
+    import numpy as np
+    import ppq
+
+    rng = np.random.default_rng(7)
+    pairs, bits = ppq.build_library(400000, 100, 40.0, seed=7)
+    library = (pairs, bits, ppq.SatelliteString(bits, rng))
+    result = ppq.run_trial({40.0: library}, [40.0], [0.7], 400000, rng)
+    q = ppq.estimate_q(0.7, 40.0, 30000, 100, 500000, rng)
+
+The command line programs are in ppq.cli.
+"""
+import importlib
+
+# Name -> module defining it
+_EXPORTS = {
+    'BitString': 'ppq.bitstring',
+    'generate_pairs': 'ppq.pairs',
+    'build_library': 'ppq.pairs',
+    'PairLibrary': 'ppq.pairs',
+    'SatelliteString': 'ppq.satellite',
+    'SatelliteBatch': 'ppq.satellite',
+    'LibraryCache': 'ppq.cache',
+    'run_trial': 'ppq.trial',
+    'TrialResult': 'ppq.trial',
+    'FastLibrary': 'ppq.fastsim',
+    'run_fast_trial': 'ppq.fastsim',
+    'estimate_q': 'ppq.range_finder',
+    'analytic_q': 'ppq.range_finder',
+    'SigmaTable': 'ppq.sigma_table',
+    'run_sweep': 'ppq.sweep',
+    'ResultStore': 'ppq.sweep',
+    'Metrics': 'ppq.metrics',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,190 @@
+"""Compact bit strings packed 8 bits to a byte.
+
+Bits are stored most significant bit first (the layout of numpy.packbits), so bit i lives
+in byte i // 8 under the mask 0x80 >> (i % 8). The unused bits of the last byte are always
+kept at 0, which lets XOR, AND, OR and popcount work on whole bytes.
+"""
+import numpy as np
+
+# Number of 1's in each possible byte, used when numpy has no bitwise_count
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(data):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(data).sum(dtype=np.uint64))
+    return int(_POPCOUNT[data].sum(dtype=np.uint64))
+
+
+def popcount_rows(data):
+    """Number of 1's in each row of a 2-D array of packed bytes."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(data).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT[data].sum(axis=1, dtype=np.int64)
+
+
+class BitString:
+    """A fixed-length string of bits backed by a packed uint8 array."""
+
+    __slots__ = ('data', 'length')
+
+    def __init__(self, length=0, data=None):
+        self.length = length
+        if data is None:
+            data = np.zeros((length + 7) // 8, dtype=np.uint8)
+        self.data = data    # Packed bytes, (length + 7) // 8 of them
+
+    # Constructors
+
+    @classmethod
+    def from_bits(cls, bits):
+        """Pack a sequence or array of 0's and 1's."""
+        bits = np.asarray(bits, dtype=np.uint8)
+        return cls(len(bits), np.packbits(bits))
+
+    @classmethod
+    def from_bytes(cls, buffer, length):
+        """Wrap already packed bytes holding length bits (no copy is made for numpy arrays)."""
+        data = np.frombuffer(buffer, dtype=np.uint8) if not isinstance(buffer, np.ndarray) else buffer
+        if len(data) != (length + 7) // 8:
+            raise ValueError('buffer does not hold %d bits' % length)
+        return cls(length, data)
+
+    # Conversions
+
+    def unpack(self):
+        """Return the bits as a uint8 array with one element per bit."""
+        return np.unpackbits(self.data, count=self.length)
+
+    def tobytes(self):
+        """Return the packed bytes."""
+        return self.data.tobytes()
+
+    def copy(self):
+        return BitString(self.length, self.data.copy())
+
+    __copy__ = copy
+
+    # Counting
+
+    def count(self):
+        """Number of 1's in the string (replaces sum(bit_string))."""
+        return _popcount(self.data)
+
+    # Element access
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return iter(self.unpack().tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step == 1 and start % 8 == 0:
+                # Byte-aligned slices are a plain copy of the bytes
+                length = max(stop - start, 0)
+                sliced = BitString(length, self.data[start // 8:(start + length + 7) // 8].copy())
+                sliced._clear_padding()
+                return sliced
+            return BitString.from_bits(self.unpack()[index])
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('bit index out of range')
+        return (int(self.data[index >> 3]) >> (7 - (index & 7))) & 1
+
+    def take(self, indices):
+        """Bits at an array of indices, as a uint8 array."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return (self.data[indices >> 3] >> (7 - (indices & 7)).astype(np.uint8)) & 1
+
+    def __setitem__(self, index, bit):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += self.length
+            if not 0 <= index < self.length:
+                raise IndexError('bit index out of range')
+            mask = 0x80 >> (index & 7)
+            if bit:
+                self.data[index >> 3] |= mask
+            else:
+                self.data[index >> 3] &= ~mask & 0xFF
+            return
+
+        # An array of indices: set every listed bit to the same value
+        index = np.asarray(index, dtype=np.int64)
+        masks = (0x80 >> (index & 7)).astype(np.uint8)
+        if bit:
+            np.bitwise_or.at(self.data, index >> 3, masks)
+        else:
+            np.bitwise_and.at(self.data, index >> 3, ~masks)
+
+    def flip(self, indices):
+        """Flip the bits at the given (distinct) indices in place."""
+        indices = np.asarray(indices, dtype=np.int64)
+        np.bitwise_xor.at(self.data, indices >> 3, (0x80 >> (indices & 7)).astype(np.uint8))
+
+    # Whole-string operations
+
+    def _clear_padding(self):
+        extra = len(self.data) * 8 - self.length
+        if extra:
+            self.data[-1] &= (0xFF << extra) & 0xFF
+
+    def _check_length(self, other):
+        if other.length != self.length:
+            raise ValueError('bit strings have different lengths')
+
+    def __xor__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        self._check_length(other)
+        return BitString(self.length, self.data ^ other.data)
+
+    def __and__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        self._check_length(other)
+        return BitString(self.length, self.data & other.data)
+
+    def __or__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        self._check_length(other)
+        return BitString(self.length, self.data | other.data)
+
+    def __ixor__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        self._check_length(other)
+        np.bitwise_xor(self.data, other.data, out=self.data)
+        return self
+
+    def __iand__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        self._check_length(other)
+        np.bitwise_and(self.data, other.data, out=self.data)
+        return self
+
+    def __ior__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        self._check_length(other)
+        np.bitwise_or(self.data, other.data, out=self.data)
+        return self
+
+    def __invert__(self):
+        inverted = BitString(self.length, ~self.data)
+        inverted._clear_padding()
+        return inverted
+
+    def __eq__(self, other):
+        if not isinstance(other, BitString):
+            return NotImplemented
+        return self.length == other.length and np.array_equal(self.data, other.data)
+
+    def __repr__(self):
+        return 'BitString(length=%d, ones=%d)' % (self.length, self.count())
@@ -0,0 +1,134 @@
+"""On-disk cache of generated pair libraries.
+
+Each library is kept in its own directory, named after (m, n, sigma, seed, generator version),
+holding the arrays of a PairLibrary (b, B, and the packed bit string) as .npy files, plus a
+manifest with the parameters and a CRC-32 of each file. Later runs open the arrays with mmap,
+so a warm start skips Step 1 entirely and processes using the same library share its pages.
+
+Entries are written to a temporary directory and renamed into place, so a reader never sees
+a half-written library. When the cache grows past its size cap, the least recently used
+entries are removed.
+"""
+import json
+import os
+import shutil
+import tempfile
+import zlib
+
+import numpy as np
+
+from ppq.bitstring import BitString
+from ppq.metrics import NO_METRICS
+from ppq.pairs import PairLibrary, build_library
+
+# Bump whenever build_library gives different pairs for the same parameters and seed, or the files change
+GENERATOR_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ppq', 'libraries')
+DEFAULT_MAX_BYTES = 8 << 30    # 8 GiB
+
+MANIFEST = 'manifest.json'
+FILES = ('b.npy', 'B.npy', 'bits.npy')
+
+
+def _crc32(path):
+    crc = 0
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 24), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+class LibraryCache:
+    """Pair libraries cached under directory, using at most max_bytes of disk."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_name(self, m, n, sigma, seed):
+        return 'm%d-n%d-sigma%r-seed%d-v%d' % (m, n, float(sigma), seed, GENERATOR_VERSION)
+
+    def load(self, m, n, sigma, seed):
+        """Return the cached (PairLibrary, bit string) opened with mmap, or None if absent or corrupt."""
+        path = os.path.join(self.directory, self.entry_name(m, n, sigma, seed))
+        try:
+            with open(os.path.join(path, MANIFEST)) as file:
+                manifest = json.load(file)
+            for name in FILES:
+                if _crc32(os.path.join(path, name)) != manifest['crc32'][name]:
+                    raise ValueError('checksum mismatch in ' + name)
+            b = np.load(os.path.join(path, 'b.npy'), mmap_mode='r')
+            B = np.load(os.path.join(path, 'B.npy'), mmap_mode='r')
+            bits = np.load(os.path.join(path, 'bits.npy'), mmap_mode='r')
+            if b.shape != (m,) or B.shape != (m,):
+                raise ValueError('pairs have shapes %r and %r' % (b.shape, B.shape))
+            library = PairLibrary(b, B, BitString.from_bytes(bits, m))
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError):
+            # Integrity check failed: drop the entry so it is regenerated
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        os.utime(os.path.join(path, MANIFEST))     # Marks the entry as recently used
+        return library, library.bits
+
+    def store(self, m, n, sigma, seed, library):
+        """Write a library into the cache, then evict old entries if over the size cap."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = self.entry_name(m, n, sigma, seed)
+        staging = tempfile.mkdtemp(prefix='.' + name + '.', dir=self.directory)
+        try:
+            np.save(os.path.join(staging, 'b.npy'), library.b)
+            np.save(os.path.join(staging, 'B.npy'), library.B)
+            np.save(os.path.join(staging, 'bits.npy'), library.bits.data)
+            manifest = {'m': m, 'n': n, 'sigma': float(sigma), 'seed': seed, 'version': GENERATOR_VERSION,
+                        'crc32': {file: _crc32(os.path.join(staging, file)) for file in FILES}}
+            with open(os.path.join(staging, MANIFEST), 'w') as file:
+                json.dump(manifest, file)
+            os.rename(staging, os.path.join(self.directory, name))
+        except OSError:
+            # Most likely another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict(keep=name)
+
+    def library(self, m, n, sigma, seed, metrics=NO_METRICS, workers=1):
+        """Return the library for (m, n, sigma, seed), generating it on workers processes and caching it on a miss.
+
+        A library without a seed is drawn from fresh entropy, so it is generated and never cached.
+        """
+        if seed is None:
+            return build_library(m, n, sigma, seed, metrics, workers)
+        cached = self.load(m, n, sigma, seed)
+        if cached is not None:
+            metrics.count('cache.hits')
+            return cached
+        metrics.count('cache.misses')
+        library, bit_string = build_library(m, n, sigma, seed, metrics, workers)
+        self.store(m, n, sigma, seed, library)
+        return library, bit_string
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            try:
+                used = os.stat(os.path.join(path, MANIFEST)).st_mtime
+            except FileNotFoundError:
+                used = 0
+            entries.append((used, size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for used, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            total -= size
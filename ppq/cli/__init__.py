@@ -0,0 +1 @@
+"""Command line programs behind the scripts in the repository root; each module has a main()."""
@@ -0,0 +1,356 @@
+"""The protocol simulation behind Bit String Protocol.py.
+
+main() runs the whole command line program: it parses the arguments, creates the sigma
+libraries (Step 1), runs the trials (Steps 2 to 5), classifies each q with the sigma table
+(Step 6) and prints the results. Importing this module does none of that.
+"""
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from ppq.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, LibraryCache
+from ppq.fastsim import FastLibrary, run_fast_trial
+from ppq.metrics import NO_METRICS, Metrics, Progress
+from ppq.pairs import build_library
+from ppq.parallel import SharedLibraries, run_trials_parallel
+from ppq.pipeline import TrialPipeline
+from ppq.satellite import SatelliteBatch, SatelliteString
+from ppq.sigma_table import SigmaTable
+from ppq.streaming import StreamingLibrary, run_streaming_trial
+from ppq.streams import SATELLITE_BATCH, TRIAL, Streams, generator, sigma_key
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS, run_trial
+
+# Table of q ranges shipped next to the scripts
+DEFAULT_SIGMA_TABLE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'sigma_table.csv')
+
+
+def build_parser():
+    # Suggested parameters: m = R = 5000000, n = 100
+    parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters m, n, R')
+    parser.add_argument('-m', default=5000000, metavar='m', type=int,
+                        help='Integer > 0, number of pairs')
+    parser.add_argument('-n', default=100, metavar='n', type=int,
+                        help='Natural number, defines boundary of interval [0, n-1] for b')
+    parser.add_argument('-R', default=5000000, metavar='R', type=int,
+                        help='Even integer > 0, length of bit string, MUST be equal to m')
+    parser.add_argument('--seed', default=None, type=int,
+                        help='Seed of the random number generators (default: fresh entropy each run)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='Directory of the cache of generated pair libraries')
+    parser.add_argument('--cache-size', default=DEFAULT_MAX_BYTES / (1 << 30), type=float,
+                        help='Size cap of the library cache, in GiB')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always generate the pair libraries, without reading or writing the cache '
+                             '(runs without --seed never use it)')
+    parser.add_argument('--sigma-table', default=DEFAULT_SIGMA_TABLE,
+                        help='CSV table of q ranges for each (P, sigma), as written by the range finder')
+    parser.add_argument('--workers', default=1, metavar='N', type=int,
+                        help='Number of worker processes running trials in parallel (1 runs them in this process)')
+    parser.add_argument('--generation-workers', default=1, metavar='N', type=int,
+                        help='Number of worker processes generating the pair libraries (the libraries are the same for any N)')
+    parser.add_argument('--chunk-size', default=None, metavar='bits', type=int,
+                        help='Streaming mode for very large R: process the strings in chunks of this many bits, '
+                             'regenerating the pairs of each chunk instead of holding whole libraries '
+                             '(rounded up to a multiple of 65536 bits; results do not depend on it)')
+    parser.add_argument('--fast-sim', action='store_true',
+                        help='Sample each trial from per-library category counts instead of building and distorting the strings')
+    parser.add_argument('--trials', default=100, type=int,
+                        help='Number of trials')
+    parser.add_argument('--max-restarts', default=None, metavar='N', type=int,
+                        help='Stop with an error when a trial restarts more than N times because abs(mu) is too '
+                             'small, as it all but always is for small R (default: restart until it is large enough)')
+    parser.add_argument('--pipeline', default=0, metavar='N', type=int,
+                        help="Draw the random inputs of the next N trials, and a spare attempt of the current one, in a "
+                             "background thread while the current trial runs (0: draw them as each trial needs them)")
+    parser.add_argument('--pipeline-threads', default=1, metavar='N', type=int,
+                        help='With --pipeline, number of background threads, each drawing the inputs of a different trial')
+    parser.add_argument('--satellites', default=0, metavar='K', type=int,
+                        help='Also evaluate K satellites per sigma, each changing its own random number of bits, '
+                             'against every trial in the same pass')
+    parser.add_argument('--satellite-report', default=None, metavar='PATH',
+                        help='With --satellites, write the q statistics and success rate of each satellite to PATH as CSV')
+    parser.add_argument('--metrics', default=None, metavar='PATH',
+                        help='Write the time, calls and bits/sec of each step, and the run counters, to PATH as JSON')
+    parser.add_argument('--progress', action='store_true',
+                        help='Show a live progress line on standard error')
+    return parser
+
+
+def main(argv=None):
+    # (0) Initialization =============================================================================
+    print('\nPublic Key Transport Protocol: Transmitting Bit Strings', '\n')
+
+    start_time = time.time()
+
+    # Note: prefix sat_ indicates that the object is used for the satellite bit string,
+    #       and performs the same functions as the original object for the satellite
+
+    # Initialize variables
+    loop_counter = 0    #Tracks current loop trial
+    counter = 0         #Counts number of successes
+    bad_range = 0       #Counts number of times probability q does not fall in given ranges
+    sat_counter = 0
+    sat_bad_range = 0
+    restarted = 0       #Counts number of times mu needs to be recalculated
+
+    # Get parameters
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.chunk_size is not None and args.workers > 1:
+        parser.error('--chunk-size runs the trials in this process and cannot be combined with --workers')
+    if args.fast_sim and (args.chunk_size is not None or args.workers > 1):
+        parser.error('--fast-sim runs the trials in this process and cannot be combined with --chunk-size or --workers')
+    if args.pipeline and (args.fast_sim or args.chunk_size is not None or args.workers > 1):
+        parser.error('--pipeline feeds the trials run in this process and cannot be combined with '
+                     '--fast-sim, --chunk-size or --workers')
+    if args.pipeline and args.pipeline_threads < 1:
+        parser.error('--pipeline needs at least 1 of --pipeline-threads')
+    if args.satellites and (args.fast_sim or args.chunk_size is not None or args.workers > 1):
+        parser.error('--satellites needs whole libraries in this process and cannot be combined with '
+                     '--fast-sim, --chunk-size or --workers')
+
+    # Re-naming parameters 
+    m, n, R = args.m, args.n, args.R
+    assert(m == R)
+
+    # Random streams: one for each block of pairs, satellite and trial (see ppq.streams)
+    streams = Streams(args.seed)
+
+    # Table used to find sigma from q
+    sigma_table = SigmaTable.load(args.sigma_table)
+
+    # Cache of generated pair libraries; an unseeded run's libraries are new every time, so they are not cached
+    cache = None if args.no_cache or args.seed is None else LibraryCache(args.cache_dir, int(args.cache_size * (1 << 30)))
+
+    # Timers and counters of each step, which do nothing unless --metrics is given
+    metrics = Metrics() if args.metrics is not None else NO_METRICS
+
+
+    # (1) Creating pairs (b_i, B_i) ==========================================================================================
+
+    print("Step 1: Creating Bob's (b, B) pairs and converting them into bit strings", '\n\t', "[this might take a minute...]")
+
+    # Initializing the "libraries"
+    pairs_dict = dict()          # Initializing the "library" of pairs (b_i, B_i), for each value of sigma
+    pairs_to_bits = dict()       # Initialize dictionary of converted pair bit strings
+    string_class_dict = dict()   # Creates a dictionary for class SatelliteString
+    libraries = dict()           # Everything a trial reads for each sigma
+    batches = dict() if args.satellites else None   # With --satellites, the batch of satellites of each sigma
+
+    # Initialize sigma and P sets
+    sigma_set = {constant * n for constant in SIGMA_CONSTANTS}
+    P_set = set(P_VALUES)
+
+
+    # For each sigma, make a list of pairs, create its bit string, and create a copy of the bit string to be altered
+    for val in sigma_set:
+        #print(val) # Use to track what the current sigma is
+
+        # Streaming mode: only the seeds of the library's chunks are kept, and the chunks are regenerated during each trial
+        if args.chunk_size is not None:
+            libraries[val] = StreamingLibrary(m, n, val, streams, args.chunk_size)
+            continue
+
+        # Create the PairLibrary of (b, B) pairs and its packed bit string, or open them from the cache
+        with metrics.stage('step1.library', bits=m):
+            if cache is not None:
+                pairs_dict[val], pairs_to_bits[val] = cache.library(m, n, val, args.seed, metrics, args.generation_workers)
+            else:
+                pairs_dict[val], pairs_to_bits[val] = build_library(m, n, val, streams, metrics, args.generation_workers)
+
+        # For the given sigma value, create a SatelliteString object, which picks the random indices it changes
+        with metrics.stage('step1.satellite', bits=m):
+            string_class_dict[val] = SatelliteString.from_streams(pairs_to_bits[val], n, val, streams)
+
+        # With --satellites, the batch of satellites of this sigma
+        if batches is not None:
+            with metrics.stage('step1.satellites', bits=m):
+                batches[val] = SatelliteBatch.random(pairs_dict[val].less, pairs_dict[val].more, args.satellites,
+                                                     streams.generator(SATELLITE_BATCH, n, sigma_key(val), 0))
+
+        # Each trial reads its sigma's pairs, bit string and SatelliteString
+        libraries[val] = (pairs_dict[val], pairs_to_bits[val], string_class_dict[val])
+
+        # Fast simulation: a trial only needs the library's category counts
+        if args.fast_sim:
+            libraries[val] = FastLibrary.from_library(*libraries[val])
+
+    print('...done!', '\n')
+
+    # Checks parity of R (just in case)
+    if R % 2 != 0:
+        print('[ERROR] R is not even')
+        return
+
+    sigma_list = sorted(sigma_set)
+    P_list = sorted(P_set)
+
+    # Every trial gets its own random number generator, so serial and parallel runs are alike
+    trial_seeds = [streams.seed_sequence(TRIAL, trial) for trial in range(args.trials)]
+
+    # With several workers, the libraries are moved into shared memory and the trials farmed out to a process pool
+    if args.workers > 1:
+        shared = SharedLibraries(libraries)
+        libraries = shared.libraries
+        pairs_dict, pairs_to_bits, string_class_dict = None, None, None    # Drop the private copies
+        results = run_trials_parallel(shared, sigma_list, P_list, R, trial_seeds, args.workers, args.max_restarts)
+
+    # With --pipeline, a background thread draws each trial's random inputs ahead of it, from the same streams
+    pipeline = None
+    if args.pipeline:
+        sizes = {val: len(pairs_dict[val]) for val in sigma_list}
+        pipeline = TrialPipeline(trial_seeds, sigma_list, P_list, sizes, R, args.pipeline, args.pipeline_threads)
+
+    progress = Progress(args.trials, 'Trials') if args.progress else None
+
+    # Main loop for multiple trials
+    # Note: this loop can be placed before Step 1 to create a fresh library each trial, yet this saves time
+    while loop_counter < args.trials:
+
+        print("\033[1m" + 'Trial ', loop_counter + 1, "\033[0;0m")
+
+        # Steps 2 to 5, repeated while mu is too small
+        with metrics.stage('trial', bits=R):
+            if args.workers > 1:
+                try:
+                    result = next(results)
+                except RuntimeError:
+                    # A trial gave up after --max-restarts: the shared memory would outlive this process
+                    results.close()
+                    shared.close()
+                    raise
+                print('Chosen private values:', '\n\tP = ', result.P_round, '\n\tsigma = ', result.sigma)
+                print('\tk = ', result.k, '\n\tmu = ', result.mu, '\n\tSmu = ', result.sat_mu)
+            elif args.fast_sim:
+                result = run_fast_trial(libraries, sigma_list, P_list, R, generator(trial_seeds[loop_counter]), log=print,
+                                        max_restarts=args.max_restarts)
+            elif args.chunk_size is not None:
+                result = run_streaming_trial(libraries, sigma_list, P_list, R, generator(trial_seeds[loop_counter]),
+                                             log=print, max_restarts=args.max_restarts)
+            elif pipeline is not None:
+                result = run_trial(libraries, sigma_list, P_list, R, None, log=print, metrics=metrics, batches=batches,
+                                   inputs=pipeline.inputs(loop_counter), max_restarts=args.max_restarts)
+                pipeline.finished(loop_counter)
+            else:
+                result = run_trial(libraries, sigma_list, P_list, R, generator(trial_seeds[loop_counter]), log=print,
+                                   metrics=metrics, batches=batches, max_restarts=args.max_restarts)
+
+        sigma, P_round, k, mu, sat_mu = result.sigma, result.P_round, result.k, result.mu, result.sat_mu
+        restarted += result.restarts
+        metrics.count('restarts', result.restarts)
+
+        # (6) Computing q ========================================================================================================
+
+        q = 0.5 + mu / (2 * k)
+        sat_q = 0.5 + sat_mu / (2 * k)
+
+        print('Probability q = ', round(q, 4))
+        print('Satellite Prob q_s = ', round(sat_q, 4))
+
+        # Our test sigma, which we check to see if it lines up with the actual sigma
+        sample_sig = 0
+        sat_sample_sig = 0
+
+        # Table of values: the sigma whose q range for this P holds q
+        sample_constant = sigma_table.classify(P_round, q)
+        if sample_constant is not None:
+            sample_sig = sample_constant * n
+        else:
+            print('\tq is not in range...')
+            bad_range += 1
+
+        sat_sample_constant = sigma_table.classify(P_round, sat_q)
+        if sat_sample_constant is not None:
+            sat_sample_sig = sat_sample_constant * n
+        else:
+            print('\tq_s is not in range')
+            sat_bad_range += 1
+
+        print('\nOur Sigma = ', sample_sig)
+
+        if sample_sig == sigma:
+            counter += 1
+            print("\033[1m" + "Success!", "\033[0;0m", 'We correctly guessed sigma!\n')
+        else:
+            print("\033[1m" + "Failure...", "\033[0;0m" 'We did not get the correct sigma\n')
+
+        print('Satellite Sigma = ', sat_sample_sig)
+
+        if sat_sample_sig == sigma:
+            sat_counter += 1
+            print("\033[1m" + "Yes!", "\033[0;0m", 'The satellite correctly guessed sigma!\n\n')
+        else:
+            print("\033[1m" + "No...", "\033[0;0m", 'The satellite failed to guess sigma...\n\n')
+
+        # The batch of satellites, classified all at once
+        if batches is not None:
+            sat_qs = 0.5 + result.sat_mus / (2 * k)
+            sat_constants = sigma_table.classify_many(P_round, sat_qs)
+            guessed = sat_constants * n == sigma
+            batches[sigma].record(sat_qs, guessed, ~np.isnan(sat_constants))
+            print('Batch of', len(sat_qs), 'satellites: q_s from', round(sat_qs.min(), 4), 'to', round(sat_qs.max(), 4),
+                  '\n\t', np.count_nonzero(guessed), 'of them guessed sigma\n\n')
+
+        # Increases the loop count
+        loop_counter += 1
+        if progress is not None:
+            progress.update(loop_counter, successes=counter, range_fails=bad_range, restarts=restarted)
+
+    if progress is not None:
+        progress.close()
+
+    if args.workers > 1:
+        results.close()
+        shared.close()
+    if pipeline is not None:
+        pipeline.close()
+
+    if args.metrics is not None:
+        metrics.count('trials', loop_counter)
+        metrics.count('successes', counter)
+        metrics.count('bad_range', bad_range)
+        metrics.count('sat_successes', sat_counter)
+        metrics.count('sat_bad_range', sat_bad_range)
+        if metrics.counters.get('step1.candidates'):
+            metrics.set('step1.rejection_rate', metrics.counters['step1.rejected'] / metrics.counters['step1.candidates'])
+        metrics.set('restarts_per_trial', restarted / loop_counter if loop_counter else 0.0)
+        metrics.save(args.metrics)
+
+    print('Results:')
+    print('\tNumber of successes: ', counter)
+    print('\tNumber of range fails: ', bad_range)
+    print('\tNumber of true failures: ', loop_counter - (counter + bad_range))
+    print('\tNumber of mu restarts: ', restarted)
+
+    print('\nSatellite Results:')
+    print('\tNumber of successes: ', sat_counter)
+    print('\tNumber of range fails: ', sat_bad_range)
+    print('\tNumber of true failures: ', loop_counter - (sat_counter + sat_bad_range))
+
+    if batches is not None:
+        print('\nSatellite Batch Results:')
+        report = []
+        for val in sigma_list:
+            rows = list(batches[val].rows())
+            if batches[val].trials:
+                rates = np.array([row['success_rate'] for row in rows])
+                summary = (round(float(rates.min()), 4), '/', round(float(np.median(rates)), 4), '/', round(float(rates.max()), 4))
+            else:
+                summary = ('n/a',)
+            print('\tsigma = ', val, ' trials: ', batches[val].trials, ' success rate min / median / max: ', *summary)
+            report.extend(dict(sigma=val, **row) for row in rows)
+        if args.satellite_report is not None:
+            with open(args.satellite_report, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=list(report[0]))
+                writer.writeheader()
+                writer.writerows(report)
+            print('\tReport of each satellite written to', args.satellite_report)
+
+    elapsed_time = round(time.time() - start_time)
+    sec = elapsed_time % 60
+    min = int(elapsed_time / 60) % 60
+    hr = int(elapsed_time / 3600)
+    print("\nTime elapsed:", hr, "hours, ", min, "minutes, and ", sec, "seconds.")
@@ -0,0 +1,233 @@
+"""The q range finder behind Bit Transmission - Range Finder.py.
+
+main() runs the whole command line program: it estimates q over 100 trials for one (P, sigma),
+or with --table writes the q ranges of a grid of (P, sigma) to a sigma table. Importing this
+module does none of that.
+"""
+import argparse
+import math
+
+import numpy as np
+
+from ppq.metrics import NO_METRICS, Metrics, Progress
+from ppq.pairs import generate_pairs
+from ppq.range_finder import MIN_BATCHES, analytic_q, estimate_q, estimate_q_adaptive, interval_hits
+from ppq.sigma_table import SigmaTable
+
+
+def build_parser():
+    # Argument parser for parameters m, n, N, P;  used for command line
+    parser = argparse.ArgumentParser(prog='Information Security', usage='Gets the required parameters m, n, N, P')
+
+    parser.add_argument('-m', default=30000, metavar='m', type=int,
+                        help='Integer > 0, number of pairs')
+    parser.add_argument('-n', default=100, metavar='n', type=int,
+                        help='Natural number, defines boundary of interval [0, n-1] for b')
+    parser.add_argument('-N', default=500000, metavar='R', type=int,
+                        help="Large integer > 0, number of times to test a Bob's pair against the labeled interval")
+    parser.add_argument('-P', default=None, metavar='P', type=float,
+                        help='Real number in the interval [0, 1], probability to mark the interval [B, n-1] with bit one '
+                             '(prompted for if not given)')
+    parser.add_argument('-s', '--sigma', default=None, metavar='constant', type=float,
+                        help='Sigma constant, sigma = constant * n (prompted for if not given)')
+    parser.add_argument('--reuse-pairs', action='store_true',
+                        help='Generate the m pairs once and reuse them in every trial')
+    parser.add_argument('--analytic', action='store_true',
+                        help='Compute the expected q and its standard deviation from the truncated normal model instead of sampling')
+    parser.add_argument('--seed', default=None, type=int,
+                        help='Seed of the random number generator (default: fresh entropy)')
+    parser.add_argument('--table', default=None, metavar='PATH',
+                        help='Write the table of q ranges for every (P, sigma) of the grid below to PATH and exit')
+    parser.add_argument('--grid-P', default='0.2,0.3,0.7,0.8', metavar='P,P,...',
+                        help='Comma separated values of P for --table')
+    parser.add_argument('--grid-sigma', default='0.3,0.4,0.6,1.5', metavar='c,c,...',
+                        help='Comma separated sigma constants for --table')
+    parser.add_argument('--z', default=3.0, type=float,
+                        help='With --analytic or --adaptive, half-width of each q range in standard deviations')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Draw in batches, each from fresh pairs, until the q range is --tolerance wide or '
+                             '--budget draws are used, instead of running 100 trials of N draws')
+    parser.add_argument('--tolerance', default=0.002, type=float,
+                        help='With --adaptive, width of the q range to stop at')
+    parser.add_argument('--batch', default=50000, metavar='draws', type=int,
+                        help='With --adaptive, number of draws per batch (with --reuse-pairs, all from the one pool)')
+    parser.add_argument('--budget', default=None, metavar='draws', type=int,
+                        help='With --adaptive, most draws per (P, sigma) (default: 100 * N, the cost of the 100 trials)')
+    parser.add_argument('--metrics', default=None, metavar='PATH',
+                        help='Write the time, calls and bits/sec of each step, and the run counters, to PATH as JSON')
+    parser.add_argument('--progress', action='store_true',
+                        help='Show a live progress line on standard error')
+    return parser
+
+
+def main(argv=None):
+    # (0) Initialization =============================================================================
+
+    Q_List = []  # Keeps a list of q values
+    trial = 0  # Tracks current loop
+    testmin = 10000  # Used to display updates for max and min values
+    testmax = -10000
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.adaptive and args.analytic:
+        parser.error('--adaptive samples q and --analytic computes it; give only one of them')
+    budget = args.budget if args.budget is not None else 100 * args.N
+    if args.adaptive and budget < MIN_BATCHES * args.batch:
+        parser.error('--budget must allow at least %d batches of --batch draws (%d) to estimate a q range'
+                     % (MIN_BATCHES, MIN_BATCHES * args.batch))
+
+    # Timers and counters of each step, which do nothing unless --metrics is given
+    metrics = Metrics() if args.metrics is not None else NO_METRICS
+
+    # Table mode: the q range of each grid point, either the minimum and maximum of 100 trials or,
+    # with --analytic, the expected q plus or minus z standard deviations, or with --adaptive, the
+    # sampled q plus or minus z standard errors
+    if args.table is not None:
+        rng = np.random.default_rng(args.seed)
+        rows = []
+        for P in [float(value) for value in args.grid_P.split(',')]:
+            for constant in [float(value) for value in args.grid_sigma.split(',')]:
+                if args.analytic:
+                    q, variance = analytic_q(P, constant * args.n, args.n, args.m, args.N)
+                    q_min, q_max = q - args.z * math.sqrt(variance), q + args.z * math.sqrt(variance)
+                elif args.adaptive:
+                    estimate = estimate_q_adaptive(P, constant * args.n, args.m, args.n, args.batch, args.tolerance,
+                                                   budget, rng, args.z, metrics=metrics)
+                    q_min, q_max = estimate.q - estimate.half_width, estimate.q + estimate.half_width
+                    print('p=: ', P, ' sigma=: ', constant, '*n', ' draws: ', estimate.draws,
+                          ' width: ', format(2 * estimate.half_width, '.6g'),
+                          '' if estimate.converged else ' (budget reached)')
+                else:
+                    Q_List = [estimate_q(P, constant * args.n, args.m, args.n, args.N, rng, metrics=metrics)
+                              for trial in range(100)]
+                    q_min, q_max = min(Q_List), max(Q_List)
+                print('p=: ', P, ' sigma=: ', constant, '*n', ' minimum: ', q_min, ' maximum: ', q_max)
+                rows.append((P, constant, q_min, q_max))
+
+        SigmaTable.from_estimates(rows).save(args.table)
+        print('Table written to', args.table)
+        if args.metrics is not None:
+            metrics.save(args.metrics)
+        return
+
+    inputP = args.P
+    while inputP is None:
+        try:
+            inputP = float(input('Enter p: '))  # User input P value and attempts to convert to float
+        except ValueError:
+            print("Invalid positive float value, please enter p: ")    # If not float, prompt again
+            continue
+        else:           # Exits loop when true
+            break
+
+    inputSig = args.sigma
+    while inputSig is None:
+        try:
+             # sigma = {0.3, 0.4, 0.6, 1.5}
+             inputSig = float(input('Enter sigma constant (e.g. sigma = constant * n): '))  # user input sigma
+        except ValueError:
+            print("Invalid positive float value, please enter new constant: ")
+            continue
+        else:
+            break
+
+    assert(inputP > 0) and (inputSig > 0) #Checks that values are positive
+
+    # Rename parameters
+    m, n, N, P = args.m, args.n, args.N, inputP
+
+    # Selecting sigma
+    sigma = inputSig * n  # From user input
+
+    # Analytic mode: expected q and the spread of the trials below, without running them
+    if args.analytic:
+        q, variance = analytic_q(P, sigma, n, m, N)
+        print('expected q: ', format(q, '.12g'), ' standard deviation: ', format(math.sqrt(variance), '.6g'))
+        print('p=: ', P, ' sigma=: ', sigma / n, '*n')
+        return
+
+    # Random number generator
+    rng = np.random.default_rng(args.seed)
+
+    # With --reuse-pairs, one pool of pairs is generated here and shared by every trial
+    pair_pool = None
+    if args.reuse_pairs:
+        with metrics.stage('step1.pairs', bits=m):
+            b, B, bits = generate_pairs(m, n, sigma, rng, metrics=metrics)
+            pair_pool = interval_hits(b, B, n)
+
+    # Adaptive mode: batches of draws until the q range is narrow enough, instead of the trials below
+    if args.adaptive:
+        progress = Progress(budget, 'Draws') if args.progress else None
+        on_batch = None
+        if progress is not None:
+            def on_batch(estimate):
+                progress.update(estimate.draws, q=format(estimate.q, '.6f'), width=format(2 * estimate.half_width, '.3g'))
+        estimate = estimate_q_adaptive(P, sigma, m, n, args.batch, args.tolerance, budget, rng, args.z, pair_pool,
+                                       metrics, on_batch)
+        if progress is not None:
+            progress.close()
+
+        print('q: ', format(estimate.q, '.12g'), ' minimum: ', estimate.q - estimate.half_width,
+              ' maximum: ', estimate.q + estimate.half_width)
+        print('draws: ', estimate.draws, ' in ', estimate.batches, ' batches (',
+              format(estimate.draws / (100 * N), '.3g'), 'of 100 trials of N draws)')
+        print('width: ', format(2 * estimate.half_width, '.6g'), ' target: ', args.tolerance,
+              '' if estimate.converged else ' (budget reached first)')
+        print('p=: ', P, ' sigma=: ', sigma / n, '*n')
+        if args.metrics is not None:
+            metrics.set('q', estimate.q)
+            metrics.set('q_half_width', estimate.half_width)
+            metrics.set('converged', estimate.converged)
+            metrics.save(args.metrics)
+        return
+
+    progress = Progress(100, 'Trials') if args.progress else None
+
+    while trial < 100:
+
+        # (1) Creating (b_i, B_i) pairs and (2) Computing q experimentally ===============================================
+        # A fresh list of m pairs is drawn for each trial unless the pool is reused; then N pairs are drawn at random
+        # from it, and with probability P the larger interval [0, B) or (B, n-1] is labeled with bit 1, else the
+        # shorter one is. q is the fraction of draws in which Bob retrieves b from the interval labeled 1.
+        q = estimate_q(P, sigma, m, n, N, rng, pair_pool, metrics)
+
+        # (3) Computing q =======================================================================================
+
+        Q_List.append(q)
+        iconup = '\u25b2'
+        icondown = '\u25bc'
+        if q < testmin:
+            testmin = q
+            print(trial + 1, ' ', icondown, 'q=:', format(q, '.12g'))    # Displays if current q is a new max or min
+        if q > testmax:
+            testmax = q
+            print(trial + 1, ' ', iconup, 'q=:', format(q, '.12g'))
+        trial += 1
+        if progress is not None:
+            progress.update(trial, min=format(testmin, '.6f'), max=format(testmax, '.6f'))
+
+    if progress is not None:
+        progress.close()
+
+    minimum = 10000
+    maximum = -10000
+    for x in Q_List:        # Scans through Q list and picks out max and min
+        if x < minimum:     # This step is not necessary, as testmin/testmax should always be equivalent to this max/min
+            minimum = x     # For large number of trials, omit this step for efficiently, else it works as a fail safe
+        if x > maximum:
+            maximum = x
+
+    print('minimum: ', minimum, ' maximum: ', maximum)
+    #print('tmin ', testmin, 'tmax', testmax)
+    print('p=: ', P, ' sigma=: ', sigma / n, '*n')
+    print('\a')
+
+    if args.metrics is not None:
+        metrics.count('trials', trial)
+        if metrics.counters.get('step1.candidates'):
+            metrics.set('step1.rejection_rate', metrics.counters['step1.rejected'] / metrics.counters['step1.candidates'])
+        metrics.set('q_min', minimum)
+        metrics.set('q_max', maximum)
+        metrics.save(args.metrics)
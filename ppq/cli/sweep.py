@@ -0,0 +1,141 @@
+"""The parameter sweep behind Parameter Sweep.py.
+
+main() runs the whole command line program: it reads a sweep spec (see ppq.sweep), plans its
+points, runs the ones the result store does not hold yet on a pool of workers, and prints the
+result of every point. Importing this module does none of that.
+"""
+import argparse
+import csv
+import json
+import time
+
+from ppq.metrics import Progress
+from ppq.sigma_table import SigmaTable
+from ppq.sweep import ResultStore, plan, run_sweep
+
+
+def _values(text):
+    # Comma separated values, each read as JSON where possible (numbers, true/false, null), else as a string
+    values = []
+    for value in text.split(','):
+        try:
+            values.append(json.loads(value))
+        except ValueError:
+            values.append(value)
+    return values if len(values) > 1 else values[0]
+
+
+def _assignment(text):
+    name, separator, values = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError('expected name=value,value,..., got %r' % text)
+    return name, _values(values)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='Information Security', usage='Runs the points of a grid of parameters')
+    parser.add_argument('spec', nargs='?', default=None, metavar='SPEC',
+                        help='JSON sweep spec: {"kind": "range" or "protocol", "grid": {parameter: value or list}}')
+    parser.add_argument('--kind', default=None, choices=['range', 'protocol'],
+                        help='Kind of point, overriding the spec (default: range)')
+    parser.add_argument('--set', dest='assignments', default=[], action='append', type=_assignment,
+                        metavar='NAME=V,V,...',
+                        help='Values of one parameter of the grid, overriding the spec; may be repeated')
+    parser.add_argument('--store', default='sweep.sqlite', metavar='PATH',
+                        help='SQLite file keeping the result of every finished point')
+    parser.add_argument('--workers', default=1, metavar='N', type=int,
+                        help='Number of worker processes, each running one point at a time')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the plan and the points still to run, and exit')
+    parser.add_argument('--csv', default=None, metavar='PATH',
+                        help='Write the parameters and result of every point of the grid to PATH as CSV')
+    parser.add_argument('--table', default=None, metavar='PATH',
+                        help='With range points, write the sigma table of their q ranges to PATH')
+    parser.add_argument('--progress', action='store_true',
+                        help='Show a live progress line on standard error')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    spec = {'kind': 'range', 'grid': dict()}
+    if args.spec is not None:
+        with open(args.spec) as file:
+            spec.update(json.load(file))
+    if args.kind is not None:
+        spec['kind'] = args.kind
+    spec['grid'] = dict(spec.get('grid', {}), **dict(args.assignments))
+
+    try:
+        points = plan(spec)
+    except (ValueError, OSError) as error:
+        parser.error(str(error))
+    if args.table is not None and spec['kind'] != 'range':
+        parser.error('--table needs range points')
+
+    # Parameters that change across the grid, shown for each point
+    varying = [name for name in points[0][2] if len({json.dumps(params[name]) for _, _, params in points}) > 1]
+
+    store = ResultStore(args.store)
+    done = store.load(key for key, kind, params in points)
+    missing = len(points) - len(done)
+    print('Sweep of', len(points), spec['kind'], 'points over', ', '.join(varying) or 'one point', '\n\t',
+          len(done), 'in', args.store, '\n\t', missing, 'to run')
+
+    if args.dry_run:
+        for key, kind, params in points:
+            if key not in done:
+                print('\t', ', '.join('%s = %s' % (name, params[name]) for name in varying))
+        store.close()
+        return
+
+    start_time = time.time()
+    progress = Progress(missing, 'Points') if args.progress and missing else None
+    failed = 0
+    ran = 0
+
+    def on_point(key, kind, params, result, seconds, error):
+        nonlocal failed, ran
+        ran += 1
+        if error is not None:
+            failed += 1
+            print('[ERROR]', ', '.join('%s = %s' % (name, params[name]) for name in varying), '\n\t', error)
+        if progress is not None:
+            progress.update(ran, failed=failed)
+
+    # Every finished point is already in the store, so a stopped sweep is resumed by running it again
+    try:
+        results = run_sweep(spec, store, args.workers, on_point)
+    except KeyboardInterrupt:
+        print('\nStopped after', ran, 'points; run the same sweep again to resume')
+        return
+    finally:
+        if progress is not None:
+            progress.close()
+        store.close()
+
+    print('\nRan', ran, 'points in', round(time.time() - start_time), 'seconds,', failed, 'failed\n')
+
+    rows = []
+    for key, kind, params in points:
+        if key in results:
+            rows.append(dict(params, **results[key]))
+            print('\t', ', '.join('%s = %s' % (name, params[name]) for name in varying), '\t',
+                  ', '.join('%s: %s' % (name, format(value, '.6g') if isinstance(value, float) else value)
+                            for name, value in results[key].items()))
+
+    if args.csv is not None and rows:
+        fieldnames = list(rows[0])
+        for row in rows:
+            fieldnames.extend(name for name in row if name not in fieldnames)
+        with open(args.csv, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        print('\nResults written to', args.csv)
+
+    if args.table is not None:
+        SigmaTable.from_estimates((row['P'], row['sigma'], row['q_min'], row['q_max']) for row in rows).save(args.table)
+        print('Table written to', args.table)
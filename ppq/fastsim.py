@@ -0,0 +1,120 @@
+"""Count-based fast simulation of a trial.
+
+After Step 1, each final bit depends only on the category of its index (Bob's bit c, whether
+the satellite changed it, and whether b < B, b > B or b = B), on Alice's bit x there and on
+whether the bit was transmitted correctly (u). So Q1' is a sum over at most 24 (category, x)
+groups of a binomial count of u's, and the whole of Steps 3 to 5 can be sampled exactly
+without touching the strings:
+
+  * Alice's Q1 ones fall into the categories by a multivariate hypergeometric draw,
+  * in each (category, x) group the number of correct transmissions is Binomial(size, P),
+  * each (category, x, u) cell retrieves the same bit everywhere, for both strings.
+
+The category counts are computed once per library, after which a trial costs O(1).
+"""
+import numpy as np
+
+from ppq.trial import MU_THRESHOLD, TrialResult, _silent, draw_k
+
+# Index of the b/B relation in the category axis
+LESS, MORE, EQUAL = 0, 1, 2
+
+
+def retrieved_bit(x, u, c, s, less, more):
+    """Bit Bob retrieves from Alice's bit x, correct transmission u, Bob's bit c and secret bit s."""
+    distorted = x ^ u ^ c ^ s ^ 1
+    hit = (less and not distorted) or (more and distorted)
+    return s if hit else 1 - s
+
+
+class FastLibrary:
+    """Category counts of one sigma library: counts[c, flipped, relation]."""
+
+    def __init__(self, counts, pairs):
+        self.counts = counts
+        self.pairs = pairs      # Only read at the position Alice picks for her secret bit
+        self.m = int(counts.sum())
+
+    @classmethod
+    def from_library(cls, pairs, convert_pairs, satellite):
+        bob = convert_pairs.unpack().astype(bool)
+        flipped = satellite.positions.unpack().astype(bool)
+        relation = np.full(len(pairs), EQUAL, dtype=np.uint8)
+        relation[pairs.less.unpack().astype(bool)] = LESS
+        relation[pairs.more.unpack().astype(bool)] = MORE
+
+        category = (bob * 2 + flipped) * 3 + relation
+        counts = np.bincount(category, minlength=12).reshape(2, 2, 3).astype(np.int64)
+        return cls(counts, pairs)
+
+
+def _retrieval_tables():
+    """Bits retrieved by each (x, u, category) cell: tables[secret_bit] = (main, satellite), each (2, 2, 12)."""
+    tables = []
+    for s in (0, 1):
+        main = np.zeros((2, 2, 12), dtype=np.int64)
+        satellite = np.zeros((2, 2, 12), dtype=np.int64)
+        for x, u, cell in np.ndindex(main.shape):
+            c, flipped, relation = np.unravel_index(cell, (2, 2, 3))
+            less, more = relation == LESS, relation == MORE
+            main[x, u, cell] = retrieved_bit(x, u, c, s, less, more)
+            # The satellite distorts against its changed bit, then changes the retrieved bit back
+            satellite[x, u, cell] = retrieved_bit(x, u, c ^ flipped, s, less, more) ^ flipped
+        tables.append((main, satellite))
+    return tables
+
+
+RETRIEVAL_TABLES = _retrieval_tables()
+
+
+def sample_ones(counts, Q1_holder, P, secret_bit, rng):
+    """Draw Q1' for the original and the satellite strings; returns (Q1_distorted, sat_Q1_distorted)."""
+    flat = counts.reshape(-1)
+
+    # Alice's 1's spread over the categories, then the correct transmissions in each (x, category) group
+    ones = rng.multivariate_hypergeometric(flat, Q1_holder, method='marginals')
+    groups = np.stack((flat - ones, ones))
+    correct = rng.binomial(groups, P)
+    numbers = np.stack((groups - correct, correct), axis=1)     # numbers[x, u, category]
+
+    main, satellite = RETRIEVAL_TABLES[secret_bit]
+    return int((numbers * main).sum()), int((numbers * satellite).sum())
+
+
+def run_fast_trial(libraries, sigma_list, P_list, R, rng, log=None, max_restarts=None):
+    """Sample a trial's TrialResult in O(1) from the category counts.
+
+    libraries maps each sigma to its FastLibrary. The random choices of sigma, P, k and the
+    secret bit, the restarts while abs(mu) is too small and max_restarts follow ppq.trial.run_trial.
+    """
+    if log is None:
+        log = _silent
+
+    restarts = 0
+    while True:
+        sigma = sigma_list[rng.integers(len(sigma_list))]
+        P = P_list[rng.integers(len(P_list))]
+        P_round = round(1 - P, 1)
+
+        k = draw_k(R, rng)
+        Q1_holder = (k + R) // 2
+
+        library = libraries[sigma]
+        # Choose a random bit in Bob's string
+        pick = int(rng.integers(library.m))
+        secret_bit = 0 if library.pairs[pick][1] == 1 else 1
+
+        Q1_distorted, sat_Q1_distorted = sample_ones(library.counts, Q1_holder, P, secret_bit, rng)
+        mu = 2 * Q1_distorted - R
+        sat_mu = 2 * sat_Q1_distorted - R
+
+        log('Chosen private values:', '\n\tP = ', P_round, '\n\tsigma = ', sigma)
+        log('\tk = ', k, '\n\tmu = ', mu, '\n\tSmu = ', sat_mu)
+
+        if abs(mu) > MU_THRESHOLD:
+            return TrialResult(sigma, P, P_round, k, mu, sat_mu, restarts)
+
+        restarts += 1
+        if max_restarts is not None and restarts > max_restarts:
+            raise RuntimeError('abs(mu) stayed below %d in %d attempts' % (MU_THRESHOLD, restarts))
+        log('Value mu is too small, returning to Step 2', '\n')
@@ -0,0 +1,111 @@
+"""Distortion of Alice's bit string and Bob's retrieval of b (Step 4 of the protocol).
+
+With s the secret bit, c Bob's bit, x Alice's bit and u = 1 when the bit is transmitted
+correctly (probability P), Alice flips x exactly when u ^ c ^ s ^ 1 is 1. Bob then retrieves
+s where (b < B and x' = 0) or (b > B and x' = 1), and 1 - s everywhere else. Both rules are
+written below as whole-string XOR/AND/OR on packed bit strings.
+"""
+import numpy as np
+
+from ppq.bitstring import BitString
+
+# Number of uniforms drawn at a time when building a Bernoulli mask
+MASK_CHUNK = 1 << 22
+
+
+def bernoulli_mask(length, P, rng):
+    """Packed bit string whose bits are independently 1 with probability P."""
+    mask = BitString(length)
+    for start in range(0, length, MASK_CHUNK):     # MASK_CHUNK is a multiple of 8
+        stop = min(start + MASK_CHUNK, length)
+        mask.data[start // 8:(stop + 7) // 8] = np.packbits(rng.random(stop - start) < P)
+    return mask
+
+
+def distort(bit_string, bob_bits, secret_bit, correct):
+    """Alice's half of Step 4: return bit_string distorted against bob_bits."""
+
+    # Distorting the bit string: x' = x ^ u ^ c ^ s ^ 1
+    distorted = bit_string ^ correct
+    distorted ^= bob_bits
+    if secret_bit == 0:
+        distorted = ~distorted
+    return distorted
+
+
+def retrieve(distorted, b_less, b_more, secret_bit):
+    """Bob's half of Step 4: return the string he retrieves from Alice's distorted string."""
+
+    # Bob's retrieval of b: s on the pairs where the chosen interval contains b, else 1 - s
+    retrieved = b_less & ~distorted
+    retrieved |= b_more & distorted
+    if secret_bit == 0:
+        retrieved = ~retrieved
+    return retrieved
+
+
+def distort_and_retrieve(bit_string, bob_bits, b_less, b_more, secret_bit, correct):
+    """Return the string Bob retrieves once Alice has distorted bit_string.
+
+    bob_bits is Bob's converted pair string (or the satellite's copy of it), b_less and
+    b_more mark the pairs with b < B and b > B, and correct is the Bernoulli(P) mask.
+    All arguments are BitStrings of the same length; none of them is modified.
+    """
+    return retrieve(distort(bit_string, bob_bits, secret_bit, correct), b_less, b_more, secret_bit)
+
+
+def satellite_changes(distorted, retrieved, b_less, b_more, secret_bit):
+    """Where a changed bit of Bob's string changes what is retrieved, once changed back.
+
+    A satellite that changed Bob's bit at a position sees Alice's distorted bit there flipped,
+    retrieves from it and changes the result back. Returns (gain, loss): the positions where
+    that turns a 0 of retrieved into a 1, and a 1 into a 0. A satellite's number of 1's is
+    retrieved.count() plus its changed positions in gain minus those in loss.
+    """
+    changed = ~retrieve(~distorted, b_less, b_more, secret_bit)
+    return changed & ~retrieved, retrieved & ~changed
+
+
+def distort_and_retrieve_reference(bit_string, bob_bits, pairs, secret_bit, correct):
+    """Per-bit version of distort_and_retrieve, kept as the reference implementation.
+
+    pairs holds the (b, B) pairs; correct[i] plays the part of random.random() < P. Returns
+    the retrieved bits as a new list.
+    """
+    R = len(bit_string)
+    bit_string = list(bit_string)
+
+    # Main loop
+    # For each bit in the string
+    for i in range(R):
+
+        # Probability to do the correct bit transmission
+        if correct[i]:
+
+            # If Bob's bit does not match Alice's secret bit, she changes it
+            if bob_bits[i] == (secret_bit + 1) % 2:
+                bit_string[i] = (bit_string[i] + 1) % 2
+
+        # 'Incorrectly' transmit bit
+        else:
+
+            # If Bob's bit matches Alice's secret bit, she changes it
+            if bob_bits[i] == secret_bit:
+                bit_string[i] = (bit_string[i] + 1) % 2
+
+    # Bob's retrieval of b
+    for i in range(R):
+
+        # 0 < b < B and Left interval chosen
+        if (pairs[i][0] < pairs[i][1]) and (bit_string[i] == 0):
+            bit_string[i] = secret_bit  # Bob retrieves Alice's chosen interval labeling
+
+        # B < b < n-1 and Right interval chosen
+        elif (pairs[i][0] > pairs[i][1]) and (bit_string[i] == 1):
+            bit_string[i] = secret_bit
+
+        # other two cases: B < b < n-1 w/ Right interval; 0 < b < B w/ Left interval
+        else:
+            bit_string[i] = (secret_bit + 1) % 2  # Bob retrieves the other interval
+
+    return bit_string
@@ -0,0 +1,127 @@
+"""Timers and counters of a run, exported as JSON.
+
+A Metrics object adds up, for each named stage, the time spent in it, the number of times it
+ran and the number of bits it went through, and keeps named counters and values:
+
+    with metrics.stage('step3.distortion', bits=R):
+        ...
+    metrics.count('restarts')
+
+When metrics are off, code is handed NO_METRICS instead, whose stage() returns one shared
+context manager that does nothing and whose other methods return at once, so instrumented code
+costs a method call per stage. Progress draws a live one-line summary on a terminal.
+"""
+import json
+import sys
+import time
+
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 'bits', 'start')
+
+    def __init__(self, metrics, name, bits):
+        self.metrics, self.name, self.bits = metrics, name, bits
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start, self.bits)
+
+
+class Metrics:
+    """Time, calls and bits per stage, plus counters and values."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = dict()    # Stage name -> [seconds, calls, bits]
+        self.counters = dict()
+        self.values = dict()
+
+    def stage(self, name, bits=0):
+        """Context manager timing one run of the stage name over bits bits."""
+        return _Stage(self, name, bits)
+
+    def add_time(self, name, seconds, bits=0):
+        entry = self.stages.setdefault(name, [0.0, 0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        entry[2] += bits
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def report(self):
+        """Everything measured so far as a JSON-ready dict, with the rate of each stage."""
+        stages = dict()
+        for name, (seconds, calls, bits) in self.stages.items():
+            stages[name] = {'seconds': seconds, 'calls': calls, 'bits': bits,
+                            'seconds_per_call': seconds / calls,
+                            'bits_per_second': bits / seconds if bits and seconds > 0 else None}
+        return {'elapsed': time.perf_counter() - self.started, 'stages': stages,
+                'counters': dict(self.counters), 'values': dict(self.values)}
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=1)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullMetrics:
+    """Metrics that record nothing."""
+
+    _stage = _NullStage()
+
+    def stage(self, name, bits=0):
+        return self._stage
+
+    def add_time(self, name, seconds, bits=0):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+
+NO_METRICS = NullMetrics()
+
+
+class Progress:
+    """One line of progress on stream, redrawn at most every interval seconds."""
+
+    def __init__(self, total, label='', stream=sys.stderr, interval=0.5):
+        self.total, self.label, self.stream, self.interval = total, label, stream, interval
+        self.started = time.perf_counter()
+        self.drawn = 0.0
+
+    def update(self, done, **fields):
+        now = time.perf_counter()
+        if now - self.drawn < self.interval and done < self.total:
+            return
+        self.drawn = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - done) / rate if rate > 0 else float('inf')
+        extra = ''.join('  %s %s' % (name, value) for name, value in fields.items())
+        self.stream.write('\r%s %d/%d (%3.0f%%)  %.1f/s  ETA %.0f s%s\033[K' % (
+            self.label, done, self.total, 100 * done / self.total, rate, remaining, extra))
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write('\n')
+        self.stream.flush()
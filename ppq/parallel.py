@@ -0,0 +1,112 @@
+"""Running trials on a process pool, with the sigma libraries held in shared memory.
+
+The libraries are copied once into multiprocessing.shared_memory blocks. Workers attach to
+the blocks by name when the pool starts, so no worker ever receives a copy of a library; only
+the per-trial seeds go out and the small TrialResult tuples come back.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ppq.bitstring import BitString
+from ppq.pairs import PairLibrary
+from ppq.satellite import SatelliteString
+from ppq.streams import generator
+from ppq.trial import run_trial
+
+
+def _share(array, blocks):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    view[...] = array
+    blocks.append(block)
+    return view, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(spec, blocks):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    blocks.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _library(b, B, convert_pairs, less, more, sat_positions):
+    # The satellite's altered string is rebuilt from the shared mask on first use in each process
+    return PairLibrary(b, B, convert_pairs, less, more), convert_pairs, SatelliteString(convert_pairs, None, positions=sat_positions)
+
+
+class SharedLibraries:
+    """The sigma libraries copied into shared memory.
+
+    libraries has the same layout as the dictionary it was built from, but every array is a
+    view on a shared block. spec is what workers need to attach to the same blocks. Call
+    close() once the trials are done to release the blocks.
+    """
+
+    def __init__(self, libraries):
+        self.blocks = []
+        self.libraries = dict()
+        self.spec = dict()
+
+        for sigma, (pairs, convert_pairs, satellite) in libraries.items():
+            arrays, arrays_spec = zip(*(_share(array, self.blocks) for array in (pairs.b, pairs.B)))
+            strings, strings_spec = [], []
+            for string in (convert_pairs, pairs.less, pairs.more, satellite.positions):
+                data, data_spec = _share(string.data, self.blocks)
+                strings.append(BitString(len(string), data))
+                strings_spec.append((len(string), data_spec))
+            self.libraries[sigma] = _library(*arrays, *strings)
+            self.spec[sigma] = (arrays_spec, strings_spec)
+
+    def close(self):
+        self.libraries = dict()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def pool_context():
+    """multiprocessing context the process pools of ppq start their workers with.
+
+    Workers are forked where possible: they start at once and share the parent's pages, such
+    as libraries it has already built, instead of re-importing the main module. Elsewhere the
+    platform's default start method is used, which the command line programs support as they
+    only run from their main().
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+
+# State of a worker process, set once by _init_worker
+_worker = dict()
+
+
+def _init_worker(spec, sigma_list, P_list, R, max_restarts):
+    blocks = []
+    libraries = dict()
+    for sigma, (arrays_spec, strings_spec) in spec.items():
+        arrays = [_attach(array_spec, blocks) for array_spec in arrays_spec]
+        strings = [BitString(length, _attach(data_spec, blocks)) for length, data_spec in strings_spec]
+        libraries[sigma] = _library(*arrays, *strings)
+
+    _worker.update(blocks=blocks, libraries=libraries, sigma_list=sigma_list, P_list=P_list, R=R,
+                   max_restarts=max_restarts)
+
+
+def _run_worker_trial(seed):
+    return run_trial(_worker['libraries'], _worker['sigma_list'], _worker['P_list'], _worker['R'],
+                     generator(seed), max_restarts=_worker['max_restarts'])
+
+
+def run_trials_parallel(shared, sigma_list, P_list, R, seeds, workers, max_restarts=None):
+    """Yield the TrialResult of each seed, in order, computed on a pool of workers processes.
+
+    shared is a SharedLibraries; each trial uses its own stream built from its seed, so the
+    results are the same as running the trials one after another with the same seeds.
+    max_restarts is passed on to run_trial, whose RuntimeError is raised here.
+    """
+    initargs = (shared.spec, sigma_list, P_list, R, max_restarts)
+    with pool_context().Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.imap(_run_worker_trial, seeds)
@@ -0,0 +1,131 @@
+"""Drawing the random inputs of trials in background threads, ahead of the trials using them.
+
+Most of an attempt's time goes into its random inputs (ppq.trial.TrialInputs): Alice's string,
+which places (k + R) / 2 ones at random positions, and the Bernoulli(P) mask. They depend only
+on the trial's stream, not on the libraries' answers, so a producer thread draws them while
+the foreground runs the current attempt, and keeps them in a small ready store:
+
+    - the first attempt of each of the next depth trials, so a new trial starts at once;
+    - one spare attempt of the current trial, drawn once nothing else is due, so a restart
+      (mu too small) also starts at once;
+    - an attempt the foreground is waiting for comes first, before any of the above.
+
+Each trial's attempts are drawn from its own stream, one after another, exactly as run_trial
+draws them, so results are the same as without the pipeline; attempts drawn ahead but not
+needed (the spare of an accepted trial) are dropped. numpy releases the GIL while it fills
+the arrays, so the producer runs alongside the foreground on another core. Drawing the inputs
+usually takes longer than the rest of the attempt, so one producer thread can fall behind;
+with several, each draws a different trial (never two attempts of one trial at once), and
+they keep up on as many cores.
+"""
+import collections
+import threading
+
+from ppq.streams import generator
+from ppq.trial import draw_inputs
+
+# Default number of trials whose first attempt is drawn ahead, and of producer threads
+DEFAULT_DEPTH = 2
+DEFAULT_THREADS = 1
+
+
+class TrialPipeline:
+    """Producer threads drawing the TrialInputs of the trials of seeds, ahead of the foreground.
+
+    Run trial t with run_trial(..., inputs=pipeline.inputs(t)), then call finished(t) before
+    moving on; trials are run in order. Call close() once the trials are done.
+    """
+
+    def __init__(self, seeds, sigma_list, P_list, sizes, R, depth=DEFAULT_DEPTH, threads=DEFAULT_THREADS):
+        self.seeds = list(seeds)
+        self.sigma_list, self.P_list, self.sizes, self.R = sigma_list, P_list, sizes, R
+        self.depth = depth
+
+        self.condition = threading.Condition()
+        self.current = 0            # Trial the foreground is running
+        self.waiting = False        # Whether the foreground waits for an attempt of the current trial
+        self.rngs = dict()          # Trial -> its generator, from its first attempt on
+        self.ready = dict()         # Trial -> deque of attempts drawn and not yet used
+        self.busy = set()           # Trials a producer thread is drawing an attempt of
+        self.error = None
+        self.closed = False
+
+        self.threads = [threading.Thread(target=self._produce, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def _next_trial(self):
+        """Trial to draw an attempt for next, or None if nothing is due (called with the lock held)."""
+        current = self.current
+        if current >= len(self.seeds):
+            return None
+        idle = current not in self.busy
+        if self.waiting and idle and not self.ready.get(current):
+            return current
+        for trial in range(current, min(current + self.depth + 1, len(self.seeds))):
+            if trial not in self.rngs and trial not in self.busy:
+                return trial
+        if idle and not self.ready.get(current):
+            return current
+        return None
+
+    def _produce(self):
+        try:
+            while True:
+                with self.condition:
+                    trial = self._next_trial()
+                    while trial is None and not self.closed:
+                        self.condition.wait()
+                        trial = self._next_trial()
+                    if self.closed:
+                        return
+                    rng = self.rngs.get(trial)
+                    if rng is None:
+                        rng = generator(self.seeds[trial])
+                    self.busy.add(trial)
+
+                # Drawn without the lock; while the trial is busy no other thread uses its generator
+                attempt = draw_inputs(self.sigma_list, self.P_list, self.sizes, self.R, rng)
+
+                with self.condition:
+                    self.busy.discard(trial)
+                    if trial >= self.current:
+                        self.rngs[trial] = rng
+                        self.ready.setdefault(trial, collections.deque()).append(attempt)
+                    self.condition.notify_all()
+        except BaseException as error:
+            with self.condition:
+                self.error = error     # Raised again in the foreground
+                self.condition.notify_all()
+
+    def inputs(self, trial):
+        """Iterator over the TrialInputs of each attempt of trial, waiting for each to be drawn."""
+        while True:
+            with self.condition:
+                self.current = trial
+                self.waiting = True
+                self.condition.notify_all()
+                while not self.ready.get(trial) and self.error is None:
+                    self.condition.wait()
+                if self.error is not None:
+                    raise self.error
+                self.waiting = False
+                attempt = self.ready[trial].popleft()
+                self.condition.notify_all()
+            yield attempt
+
+    def finished(self, trial):
+        """Drop what is left of trial and let the producer move on to the next trials."""
+        with self.condition:
+            self.ready.pop(trial, None)
+            self.rngs.pop(trial, None)
+            self.current = trial + 1
+            self.waiting = False
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
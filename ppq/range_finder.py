@@ -0,0 +1,153 @@
+"""Experimental computation of q, the probability that Bob retrieves b from an interval labeled 1.
+
+For a pair (b, B), the intervals [0, B) and (B, n-1] are labeled: with probability P the longer
+one gets bit 1, otherwise the shorter one does. q is the chance that b lies in the interval
+labeled 1, for a pair drawn at random from a library of m pairs.
+
+estimate_q_adaptive samples in batches instead of a fixed number of draws: each batch is one
+estimate_q over a fresh library, and sampling stops once the confidence interval on q from the
+batch estimates is narrow enough, or the draw budget is spent.
+
+analytic_q gives the same quantity without sampling: B given b is a normal truncated to
+[1, n-2], so every probability needed is a difference of normal CDFs summed over b.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from ppq.metrics import NO_METRICS
+from ppq.pairs import generate_pairs
+
+# Number of draws evaluated at a time, which bounds the temporary memory
+DRAW_CHUNK = 1 << 22
+
+# Least number of batches of estimate_q_adaptive before their spread is trusted
+MIN_BATCHES = 10
+
+# Outcome of estimate_q_adaptive: mean of the batch estimates, half-width of the confidence
+# interval on q, batches and draws used, and whether the interval reached the target width
+AdaptiveEstimate = namedtuple('AdaptiveEstimate', ['q', 'half_width', 'batches', 'draws', 'converged'])
+
+
+def interval_hits(b, B, n):
+    """Masks of the pairs whose b lies in the longer and in the shorter of the two intervals."""
+    midpoint = (n - 1) / 2
+    right = (B < b) & (b <= n - 1)      # b in (B, n-1]
+    left = (0 <= b) & (b < B)           # b in [0, B)
+    longer = (right & (B < midpoint)) | (left & (B > midpoint))
+    shorter = (right & (B > midpoint)) | (left & (B < midpoint))
+    return longer, shorter
+
+
+def count_hits(longer, shorter, P, N, rng):
+    """Number of N random draws of a pair, with Alice's labeling, in which b is in the interval labeled 1."""
+    m = len(longer)
+    counter = 0
+    for start in range(0, N, DRAW_CHUNK):
+        size = min(DRAW_CHUNK, N - start)
+
+        # (i) Select random (b_i, B_i) pairs from the list
+        index = rng.integers(0, m, size=size)
+
+        # (ii) With probability P the longer interval is labeled 1, else the shorter one is
+        longer_labeled = rng.random(size) < P
+
+        counter += np.count_nonzero(np.where(longer_labeled, longer[index], shorter[index]))
+    return counter
+
+
+def estimate_q(P, sigma, m, n, N, rng, pairs=None, metrics=NO_METRICS):
+    """Monte Carlo estimate of q from N draws out of a library of m pairs.
+
+    A new library is generated unless pairs, the (longer, shorter) masks from interval_hits,
+    is given; passing the same masks to several calls reuses one pair pool across trials.
+    """
+    if pairs is None:
+        with metrics.stage('step1.pairs', bits=m):
+            b, B, bits = generate_pairs(m, n, sigma, rng, metrics=metrics)
+            pairs = interval_hits(b, B, n)
+    longer, shorter = pairs
+    with metrics.stage('step2.draws', bits=N):
+        return count_hits(longer, shorter, P, N, rng) / N
+
+
+def estimate_q_adaptive(P, sigma, m, n, batch, tolerance, budget, rng, z=3.0, pairs=None, metrics=NO_METRICS,
+                        on_batch=None):
+    """Estimate q in batches of batch draws until the interval q +- z standard errors is at most tolerance wide.
+
+    The standard error is that of the mean of the batch estimates, so with a fresh library per
+    batch it covers the spread between libraries as well as the sampling noise. Sampling also
+    stops once budget draws are used; converged tells the two apart. on_batch, if given, is
+    called with the AdaptiveEstimate after every batch. Returns the last AdaptiveEstimate.
+    """
+    mean = 0.0
+    squares = 0.0     # Sum of squared deviations from the running mean (Welford)
+    batches = 0
+    while True:
+        q = estimate_q(P, sigma, m, n, batch, rng, pairs, metrics)
+        batches += 1
+        delta = q - mean
+        mean += delta / batches
+        squares += delta * (q - mean)
+
+        half_width = math.inf
+        if batches >= MIN_BATCHES:
+            half_width = z * math.sqrt(squares / (batches - 1) / batches)
+        estimate = AdaptiveEstimate(mean, half_width, batches, batches * batch, 2 * half_width <= tolerance)
+        if on_batch is not None:
+            on_batch(estimate)
+        if estimate.converged or estimate.draws + batch > budget:
+            metrics.count('adaptive.batches', batches)
+            metrics.count('adaptive.draws', estimate.draws)
+            return estimate
+
+
+# math.erf applied elementwise
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+
+def _normal_cdf(x, mean, sigma):
+    return 0.5 * (1 + _erf((x - mean) / (sigma * math.sqrt(2))).astype(np.float64))
+
+
+def _normal_mass(lo, hi, b, sigma):
+    """Probability that N(b, sigma) lands in (lo, hi), for each b; 0 where the interval is empty."""
+    lo, hi = np.broadcast_arrays(lo, hi)
+    return np.where(hi > lo, _normal_cdf(hi, b, sigma) - _normal_cdf(lo, b, sigma), 0.0)
+
+
+def analytic_q(P, sigma, n, m=None, N=None):
+    """Expected q and its variance, computed from the truncated normal model.
+
+    The variance is that of the range finder's estimate: the spread between libraries of m
+    pairs (if m is given) plus the sampling noise of N draws from one library (if N is
+    given). With neither, the variance is 0.
+    """
+    b = np.arange(n, dtype=np.float64)
+    B_more_than, B_less_than = 1, n - 2
+    midpoint = (n - 1) / 2
+
+    # Normalisation: probability that B is kept, summed over b (each b is equally likely)
+    kept = _normal_mass(B_more_than, B_less_than, b, sigma).sum()
+
+    # b in (B, n-1] or [0, B) with B on either side of the midpoint
+    right_low = _normal_mass(B_more_than, np.minimum(b, midpoint), b, sigma).sum()      # B < b, B < midpoint
+    left_high = _normal_mass(np.maximum(b, midpoint), B_less_than, b, sigma).sum()      # b < B, B > midpoint
+    right_high = _normal_mass(midpoint, np.minimum(b, B_less_than), b, sigma).sum()     # B < b, B > midpoint
+    left_low = _normal_mass(np.maximum(b, B_more_than), midpoint, b, sigma).sum()       # b < B, B < midpoint
+
+    longer = (right_low + left_high) / kept
+    shorter = (right_high + left_low) / kept
+    q = P * longer + (1 - P) * shorter
+
+    variance = 0.0
+    library_variance = 0.0
+    if m is not None:
+        # Each pair contributes P * longer_i + (1 - P) * shorter_i, and q of a library is their mean
+        library_variance = (P ** 2 * longer + (1 - P) ** 2 * shorter - q ** 2) / m
+        variance += library_variance
+    if N is not None:
+        variance += (q * (1 - q) - library_variance) / N
+
+    return float(q), float(variance)
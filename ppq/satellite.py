@@ -0,0 +1,206 @@
+"""The satellite's altered copy of Bob's bit string.
+
+The satellite changes a random number of randomly chosen bits of Bob's string. Instead of a
+flipped copy and a dense list of positions, SatelliteString keeps only the packed mask of the
+changed positions: the altered string is Bob's string XOR the mask, built on first use, and
+the change is undone on a final string with the same XOR.
+
+A library's satellite is drawn from its streams block by block (see from_streams), the way
+ppq.streaming regenerates it one chunk at a time, so both give the same changed positions.
+
+SatelliteBatch holds many satellites of one library for security analysis. A changed bit only
+matters where it can change what Bob retrieves, which depends on the pair but not on the
+trial, so each satellite is kept as one row of a packed 2-D mask over just those positions.
+All of them are then evaluated against a trial at once, from the gain and loss strings of
+ppq.kernel.satellite_changes, at a cost that grows with the number of those positions rather
+than with R.
+"""
+import numpy as np
+
+from ppq.bitstring import BitString, popcount_rows
+from ppq.kernel import retrieve, satellite_changes
+from ppq.pairs import STREAM_BLOCK
+from ppq.streams import SATELLITE, SATELLITE_CHUNK, sigma_key
+
+# Bytes of satellite masks ANDed at a time, which bounds the temporary memory
+BATCH_BYTES = 1 << 26
+
+
+class SatelliteString:
+    """Bob's bit string with number randomly chosen bits changed."""
+
+    def __init__(self, bits, rng, positions=None):
+        self.bits = bits        # Bob's bit string, never modified
+        self._string = None
+
+        if positions is None:
+            m = len(bits)
+            self.number = int(rng.integers(1, m + 1, endpoint=True))    # Pseudo-random number of indices to change
+            positions = random_mask(m, min(self.number, m), rng)        # Cannot change more bits than the string has
+        else:
+            self.number = positions.count()
+        self.positions = positions      # Mask of the changed positions
+
+    @classmethod
+    def from_streams(cls, bits, n, sigma, streams):
+        """Satellite of the library of (n, sigma), drawn from the streams of a run.
+
+        The number of changed bits and their share of each block of STREAM_BLOCK bits come from
+        the stream (SATELLITE, n, sigma key, 0), and the positions within a block from the
+        block's own stream, as ppq.streaming.StreamingLibrary draws them.
+        """
+        m = len(bits)
+        rng = streams.generator(SATELLITE, n, sigma_key(sigma), 0)
+        number = int(rng.integers(1, m + 1, endpoint=True))
+        counts = allocate(min(number, m), m, STREAM_BLOCK, rng)
+        positions = join([random_mask(block_length(block, m), count,
+                                      streams.generator(SATELLITE_CHUNK, n, sigma_key(sigma), block))
+                          for block, count in enumerate(counts)])
+        return cls(bits, None, positions)
+
+    @property
+    def string(self):
+        """The altered bit string, Bob's string XOR the mask of changed positions."""
+        if self._string is None:
+            self._string = self.bits ^ self.positions
+        return self._string
+
+    def restore(self, bit_string):
+        """Change the satellite's positions of bit_string back, in place."""
+        bit_string ^= self.positions
+        return bit_string
+
+
+def random_mask(length, number, rng):
+    """Mask with exactly number 1's at uniformly random positions."""
+    mask = BitString(length)
+
+    # Sample whichever of the 1's or the 0's is the smaller set
+    if number <= length // 2:
+        mask[rng.choice(length, number, replace=False, shuffle=False)] = 1
+    else:
+        mask[rng.choice(length, length - number, replace=False, shuffle=False)] = 1
+        mask = ~mask
+    return mask
+
+
+def allocate(total, size, chunk_size, rng):
+    """Split total marked positions, uniformly placed among size, into counts per chunk (or block).
+
+    Each chunk's count is hypergeometric given the counts of the chunks before it, which makes
+    the union of uniform placements within chunks a uniform placement over the whole string.
+    """
+    counts = []
+    remaining = size
+    for start in range(0, size, chunk_size):
+        length = min(chunk_size, size - start)
+        count = int(rng.hypergeometric(total, remaining - total, length))
+        counts.append(count)
+        total -= count
+        remaining -= length
+    return counts
+
+
+def block_length(block, size):
+    """Number of bits of block number block of a string of size bits."""
+    return min(STREAM_BLOCK, size - block * STREAM_BLOCK)
+
+
+def join(strings):
+    """Bit strings joined end to end; all but the last must hold whole bytes."""
+    return BitString(sum(len(string) for string in strings), np.concatenate([string.data for string in strings]))
+
+
+def sensitive_positions(b_less, b_more):
+    """Positions where changing Bob's bit can change the retrieved bit, in any trial.
+
+    Retrieval works bit by bit, so trying both distorted bits and both secret bits on whole
+    strings finds every position where satellite_changes can ever mark a gain or a loss.
+    """
+    m = len(b_less)
+    sensitive = BitString(m)
+    for distorted in (BitString(m), ~BitString(m)):
+        for secret_bit in (0, 1):
+            retrieved = retrieve(distorted, b_less, b_more, secret_bit)
+            gain, loss = satellite_changes(distorted, retrieved, b_less, b_more, secret_bit)
+            sensitive |= gain | loss
+    return np.flatnonzero(sensitive.unpack())
+
+
+class SatelliteBatch:
+    """K satellites of one library, each changing its own number of random bits of Bob's string.
+
+    masks has one row per satellite, packed over the sensitive positions only. The statistics
+    of the trials recorded so far are kept per satellite.
+    """
+
+    def __init__(self, b_less, b_more, numbers, rng):
+        m = len(b_less)
+        self.numbers = np.minimum(np.asarray(numbers, dtype=np.int64), m)   # Cannot change more bits than the string has
+        self.positions = sensitive_positions(b_less, b_more)
+        sensitive = len(self.positions)
+
+        # Of the number positions a satellite changes among all m, a hypergeometric share is sensitive
+        self.masks = np.zeros((len(self.numbers), (sensitive + 7) // 8), dtype=np.uint8)
+        for row, number in enumerate(self.numbers):
+            hits = int(rng.hypergeometric(sensitive, m - sensitive, number))
+            self.masks[row] = random_mask(sensitive, hits, rng).data
+
+        K = len(self.numbers)
+        self.trials = 0
+        self.q_sum = np.zeros(K)
+        self.q_squares = np.zeros(K)
+        self.q_min = np.full(K, np.inf)
+        self.q_max = np.full(K, -np.inf)
+        self.successes = np.zeros(K, dtype=np.int64)
+        self.bad_range = np.zeros(K, dtype=np.int64)
+
+    @classmethod
+    def random(cls, b_less, b_more, K, rng):
+        """K satellites, each changing a random number of bits drawn as in SatelliteString."""
+        m = len(b_less)
+        return cls(b_less, b_more, rng.integers(1, m + 1, size=K, endpoint=True), rng)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def count_ones(self, ones, gain, loss):
+        """Number of 1's each satellite retrieves, given the main string's ones and satellite_changes."""
+        gain = np.packbits(gain.take(self.positions))
+        loss = np.packbits(loss.take(self.positions))
+        counts = np.empty(len(self), dtype=np.int64)
+        rows = max(1, BATCH_BYTES // max(self.masks.shape[1], 1))
+        for start in range(0, len(self), rows):
+            block = self.masks[start:start + rows]
+            counts[start:start + rows] = ones + popcount_rows(block & gain) - popcount_rows(block & loss)
+        return counts
+
+    def record(self, q, guessed, in_range):
+        """Add one trial: each satellite's q, whether it guessed sigma and whether q was in a range."""
+        self.trials += 1
+        self.q_sum += q
+        self.q_squares += q * q
+        np.minimum(self.q_min, q, out=self.q_min)
+        np.maximum(self.q_max, q, out=self.q_max)
+        self.successes += guessed
+        self.bad_range += ~in_range
+
+    def rows(self):
+        """One dict of statistics per satellite, for the trials recorded.
+
+        With no trials recorded the statistics of q and the success rate are None.
+        """
+        trials = self.trials
+        if trials:
+            mean = self.q_sum / trials
+            deviation = np.sqrt(np.maximum(self.q_squares / trials - mean * mean, 0))
+        for i in range(len(self)):
+            row = {'satellite': i + 1, 'changed': int(self.numbers[i]), 'trials': trials,
+                   'q_mean': None, 'q_std': None, 'q_min': None, 'q_max': None,
+                   'successes': int(self.successes[i]), 'bad_range': int(self.bad_range[i]),
+                   'success_rate': None}
+            if trials:
+                row.update(q_mean=float(mean[i]), q_std=float(deviation[i]),
+                           q_min=float(self.q_min[i]), q_max=float(self.q_max[i]),
+                           success_rate=float(self.successes[i]) / trials)
+            yield row
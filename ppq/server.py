@@ -0,0 +1,217 @@
+"""Asyncio host serving many client sessions at once.
+
+Each accepted connection is a Session, which keeps that client's state for as long as the
+connection lasts, so one host can run the Alice side of many exchanges concurrently. Messages
+are framed and encoded as in ppq.wire, and the host answers a message with at most one reply.
+Activity is reported through the logging module at a configurable level instead of printed.
+
+The libraries a client uploads, as a LIBRARY message or a completed run of CHUNK messages, stay
+with its session under library IDs; a BITSTRING message is only echoed back. Trial requests
+naming a library run as Alice in a thread pool, several at a time, and each answer goes back as
+soon as it is ready, tagged with the request ID. A session holding more than max_libraries
+libraries or max_chunk_runs unfinished runs of chunks is closed, which bounds its memory.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ppq.bitstring import BitString
+from ppq.kernel import bernoulli_mask, distort
+from ppq.streams import ALICE, Streams
+from ppq.trial import build_alice_string
+from ppq.wire import (ACK, BITSTRING, CHUNK, DEFAULT_MAX_FRAME, LIBRARY, RESULT, TRIAL, decode_message, encode_header,
+                      read_frame, write_frame)
+
+# Default size of the StreamReader buffer and high-water mark of the write buffer, in bytes
+DEFAULT_READ_BUFFER = 1 << 20
+DEFAULT_WRITE_BUFFER = 1 << 20
+
+# Default number of threads running trial requests
+DEFAULT_TRIAL_THREADS = 4
+
+# Default number of libraries, and of runs of chunks not yet complete, that one session can hold
+DEFAULT_MAX_LIBRARIES = 64
+DEFAULT_MAX_CHUNK_RUNS = 16
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """State of one client connection."""
+
+    def __init__(self, number, peer):
+        self.number = number
+        self.peer = peer
+        self.started = time.monotonic()
+        self.frames = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.state = dict()     # Protocol state of this client, filled in by the message handlers
+        self.tasks = set()      # Trial requests still running
+        self.write_lock = asyncio.Lock()
+
+    def __repr__(self):
+        return 'Session(%d, %s)' % (self.number, self.peer)
+
+
+class Host:
+    """Accepts connections and answers the framed messages of each session."""
+
+    def __init__(self, max_frame=DEFAULT_MAX_FRAME, read_buffer=DEFAULT_READ_BUFFER, write_buffer=DEFAULT_WRITE_BUFFER,
+                 trial_threads=DEFAULT_TRIAL_THREADS, seed=None, max_libraries=DEFAULT_MAX_LIBRARIES,
+                 max_chunk_runs=DEFAULT_MAX_CHUNK_RUNS):
+        self.max_frame = max_frame
+        self.read_buffer = read_buffer
+        self.write_buffer = write_buffer
+        self.max_libraries = max_libraries
+        self.max_chunk_runs = max_chunk_runs
+        self.executor = ThreadPoolExecutor(trial_threads)
+        self.streams = Streams(seed)    # Trial request r of session s draws from the stream (ALICE, s, r)
+        self.sessions = dict()
+        self._numbers = itertools.count(1)
+
+    def handle_message(self, session, message, bit_string, payload):
+        """Reply to one message of session as a tuple of buffers, or None if it needs no reply.
+
+        A bit string is echoed back without being kept, a run of chunks is acknowledged once it
+        is complete and an uploaded library is acknowledged with its library ID.
+        """
+        if message.type == BITSTRING:
+            logger.debug('%r: echoing a bit string of %d bits', session, len(bit_string))
+            return (payload,)
+        if message.type == CHUNK:
+            ack = self.store_chunk(session, message, bit_string)
+            return None if ack is None else (ack,)
+        if message.type == LIBRARY:
+            library = self.store_library(session, message, bit_string)
+            return (encode_header(ACK, len(bit_string), message.n, message.sigma, sequence=message.sequence, library=library),)
+        raise ValueError('unknown message type %d' % message.type)
+
+    def store_library(self, session, message, bit_string):
+        """Keep Bob's bit string for one sigma for the rest of the session; returns its library ID."""
+        libraries = session.state.setdefault('libraries', dict())
+        if len(libraries) >= self.max_libraries:
+            raise ValueError('session already holds the limit of %d libraries' % self.max_libraries)
+        library = len(libraries) + 1
+        libraries[library] = bit_string
+        logger.debug('%r: library %d, bit string of %d bits for m = %d, n = %d, sigma = %s',
+                     session, library, len(bit_string), message.m, message.n, message.sigma)
+        return library
+
+    def store_chunk(self, session, message, bit_string):
+        """Add one chunk to its sigma's run; once every chunk is in, join them and return an ACK."""
+        runs = session.state.setdefault('chunks', dict())         # sigma -> {sequence number: chunk}
+        last_chunks = session.state.setdefault('last_chunk', dict())  # sigma -> sequence number of the last chunk
+        if message.sigma not in runs and len(runs) >= self.max_chunk_runs:
+            raise ValueError('session already has the limit of %d unfinished runs of chunks' % self.max_chunk_runs)
+        chunks = runs.setdefault(message.sigma, dict())
+        if message.sequence in chunks:
+            raise ValueError('chunk %d of sigma = %s received twice' % (message.sequence, message.sigma))
+        chunks[message.sequence] = bit_string
+        if message.last:
+            last_chunks[message.sigma] = message.sequence
+        last = last_chunks.get(message.sigma)
+        if last is not None and max(chunks) > last:
+            raise ValueError('chunk %d of sigma = %s follows the last chunk %d' % (max(chunks), message.sigma, last))
+        if last is None or len(chunks) < last + 1:
+            return None
+
+        del runs[message.sigma], last_chunks[message.sigma]
+        ordered = [chunks[sequence] for sequence in range(last + 1)]
+        if any(len(chunk) % 8 for chunk in ordered[:-1]):
+            raise ValueError('a chunk of sigma = %s other than the last does not hold whole bytes' % message.sigma)
+        length = sum(len(chunk) for chunk in ordered)
+        if length != message.m:
+            raise ValueError('chunks of sigma = %s hold %d bits instead of %d' % (message.sigma, length, message.m))
+
+        library = self.store_library(session, message, BitString(length, np.concatenate([chunk.data for chunk in ordered])))
+        return encode_header(ACK, length, message.n, message.sigma, sequence=last, library=library)
+
+    def start_trial(self, session, writer, message):
+        """Run a trial request in the thread pool; its RESULT is sent when it is ready."""
+        library = session.state.get('libraries', dict()).get(message.library)
+        if library is None:
+            raise ValueError('trial request %d names unknown library %d' % (message.sequence, message.library))
+        rng = self.streams.generator(ALICE, session.number, message.sequence)
+
+        task = asyncio.ensure_future(self.answer_trial(session, writer, message, library, rng))
+        session.tasks.add(task)
+        task.add_done_callback(session.tasks.discard)
+
+    async def answer_trial(self, session, writer, message, library, rng):
+        try:
+            reply = await asyncio.get_running_loop().run_in_executor(self.executor, alice_trial, message, library, rng)
+            await self.send_reply(session, writer, reply)
+        except ConnectionError as error:
+            logger.warning('%r: trial request %d: %s', session, message.sequence, error)
+        except Exception:
+            logger.exception('%r: trial request %d failed, closing the session', session, message.sequence)
+            writer.close()
+
+    async def send_reply(self, session, writer, buffers):
+        async with session.write_lock:
+            write_frame(writer, *buffers)
+            session.bytes_sent += sum(memoryview(buffer).nbytes for buffer in buffers)
+            await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        session = Session(next(self._numbers), writer.get_extra_info('peername'))
+        self.sessions[session.number] = session
+        writer.transport.set_write_buffer_limits(high=self.write_buffer)
+        logger.info('%r connected (%d open)', session, len(self.sessions))
+
+        try:
+            while True:
+                payload = await read_frame(reader, self.max_frame)
+                if payload is None:
+                    break
+                session.frames += 1
+                session.bytes_received += len(payload)
+                logger.debug('%r: frame %d of %d bytes', session, session.frames, len(payload))
+
+                message, bit_string = decode_message(payload)
+                if message.type == TRIAL:
+                    self.start_trial(session, writer, message)
+                    continue
+                reply = self.handle_message(session, message, bit_string, payload)
+                if reply is not None:
+                    await self.send_reply(session, writer, reply)
+
+            # The client has finished sending; let its last trial requests answer
+            if session.tasks:
+                await asyncio.wait(session.tasks)
+        except (ConnectionError, ValueError) as error:
+            logger.warning('%r: %s', session, error)
+        finally:
+            for task in session.tasks:
+                task.cancel()
+            del self.sessions[session.number]
+            writer.close()
+            logger.info('%r closed after %d frames, %d bytes in, %d bytes out, %.3f s',
+                        session, session.frames, session.bytes_received, session.bytes_sent,
+                        time.monotonic() - session.started)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=self.read_buffer)
+        logger.info('Listening on %s', ', '.join(str(sock.getsockname()) for sock in server.sockets))
+        async with server:
+            await server.serve_forever()
+
+
+def alice_trial(message, bob_bits, rng):
+    """Alice's side of one trial request: her string of len(bob_bits) bits, distorted.
+
+    Returns the RESULT reply, header with k and the distorted bits, as a tuple of buffers.
+    """
+    P, secret_bit = message.extra
+    R = len(bob_bits)
+    k, bit_string = build_alice_string(R, rng)
+    correct = bernoulli_mask(R, P, rng)
+    distorted = distort(bit_string, bob_bits, secret_bit, correct)
+    header = encode_header(RESULT, message.m, message.n, message.sigma, R, message.sequence,
+                           library=message.library, extra=(k,))
+    return (header, distorted.data)
@@ -0,0 +1,108 @@
+"""Lookup of sigma from the probability q, using a table of q ranges.
+
+The table has one row per (P, sigma) point: P, the sigma constant (sigma = constant * n) and
+the range [q_min, q_max] of q observed or expected for that point. It is stored as a CSV file
+with the header P,sigma,q_min,q_max. For each P the ranges are kept sorted by q_min, so a q
+is classified with one bisection, and an array of q's with one searchsorted.
+"""
+import bisect
+import csv
+import math
+
+import numpy as np
+
+HEADER = ['P', 'sigma', 'q_min', 'q_max']
+
+
+def _key(P):
+    # P values are compared after rounding, so 1 - 0.8 finds the row written as 0.2
+    return round(float(P), 6)
+
+
+def _check_finite(P, constant, q_min, q_max):
+    # An estimate stopped before it had a standard error has an infinite half-width
+    if not (math.isfinite(q_min) and math.isfinite(q_max)):
+        raise ValueError('q range [%s, %s] of sigma = %s * n for P = %s is not finite' % (q_min, q_max, constant, P))
+
+
+class SigmaTable:
+    """Sorted, non-overlapping q ranges for each P."""
+
+    def __init__(self, rows):
+        """rows is an iterable of (P, sigma constant, q_min, q_max)."""
+        grouped = dict()
+        for P, constant, q_min, q_max in rows:
+            _check_finite(P, constant, q_min, q_max)
+            if q_min > q_max:
+                raise ValueError('empty q range for P = %s, sigma = %s * n' % (P, constant))
+            grouped.setdefault(_key(P), []).append((float(q_min), float(q_max), float(constant)))
+
+        self.index = dict()     # P -> (q_min list, q_max list, sigma constant list), sorted by q_min
+        for P, ranges in grouped.items():
+            ranges.sort()
+            for (low, high, constant), (next_low, _, next_constant) in zip(ranges, ranges[1:]):
+                if next_low <= high:
+                    raise ValueError('q ranges of sigma = %s * n and %s * n overlap for P = %s' % (constant, next_constant, P))
+            self.index[P] = tuple(list(column) for column in zip(*ranges))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, newline='') as file:
+            reader = csv.DictReader(file)
+            return cls([(float(row['P']), float(row['sigma']), float(row['q_min']), float(row['q_max']))
+                        for row in reader])
+
+    @classmethod
+    def from_estimates(cls, rows):
+        """Build a table from estimated ranges, splitting any overlap between neighbours at its middle."""
+        grouped = dict()
+        for P, constant, q_min, q_max in rows:
+            _check_finite(P, constant, q_min, q_max)
+            grouped.setdefault(_key(P), []).append([q_min, q_max, constant])
+
+        resolved = []
+        for P, ranges in grouped.items():
+            ranges.sort()
+            for current, following in zip(ranges, ranges[1:]):
+                if following[0] <= current[1]:
+                    middle = (following[0] + current[1]) / 2
+                    current[1] = np.nextafter(middle, -np.inf)
+                    following[0] = middle
+            resolved.extend((P, constant, q_min, q_max) for q_min, q_max, constant in ranges)
+        return cls(resolved)
+
+    def rows(self):
+        for P, (lows, highs, constants) in sorted(self.index.items()):
+            for low, high, constant in zip(lows, highs, constants):
+                yield P, constant, low, high
+
+    def save(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADER)
+            for P, constant, low, high in self.rows():
+                writer.writerow([P, constant, repr(float(low)), repr(float(high))])
+
+    def classify(self, P, q):
+        """Sigma constant whose q range holds q for this P, or None if q is in no range."""
+        entry = self.index.get(_key(P))
+        if entry is None:
+            return None
+        lows, highs, constants = entry
+        i = bisect.bisect_right(lows, q) - 1
+        if i >= 0 and q <= highs[i]:
+            return constants[i]
+        return None
+
+    def classify_many(self, P, q):
+        """Sigma constants for an array of q's, with NaN where q is in no range."""
+        q = np.asarray(q, dtype=np.float64)
+        result = np.full(q.shape, np.nan)
+        entry = self.index.get(_key(P))
+        if entry is None:
+            return result
+        lows, highs, constants = (np.asarray(column) for column in entry)
+        i = np.searchsorted(lows, q, side='right') - 1
+        found = (i >= 0) & (q <= highs[np.maximum(i, 0)])
+        result[found] = constants[i[found]]
+        return result
@@ -0,0 +1,167 @@
+"""Streaming execution of trials for very large R.
+
+Nothing of length R is ever held in memory. A StreamingLibrary keeps only the random streams
+of its chunks (see ppq.streams) and regenerates each chunk of pairs, with its bit string and
+the satellite's changed positions, when a trial reaches it. A trial then runs generate, distort, retrieve, restore and
+count one chunk at a time, keeping only the running totals of 1's, so peak memory is
+proportional to the chunk size.
+
+Alice's string still has exactly Q1 = (k + R) / 2 ones placed uniformly at random: the number
+of ones in each block of STREAM_BLOCK bits is drawn from the hypergeometric distribution of the
+ones not yet placed among the positions not yet filled, and the ones of a block are placed
+uniformly within it. The satellite's changed positions are spread over the blocks the same way.
+
+Every chunk is a run of whole blocks, and everything drawn for a block (its pairs, its share of
+the satellite, Alice's ones in it and its Bernoulli(P) mask) comes from a stream of that block,
+the same streams ppq.trial.run_trial and SatelliteString.from_streams draw the whole strings
+from. So with the same seed a trial gives the same results whatever the chunk size, and the
+same as run_trial on libraries built with that seed.
+"""
+import numpy as np
+
+from ppq.kernel import bernoulli_mask, distort_and_retrieve
+from ppq.pairs import STREAM_BLOCK, PairLibrary, generate_block
+from ppq.satellite import allocate, block_length, join, random_mask
+from ppq.streams import SATELLITE, SATELLITE_CHUNK, Streams, sigma_key
+from ppq.trial import MU_THRESHOLD, TrialResult, _silent, block_generator, draw_k
+
+# Default number of bits per chunk, a multiple of STREAM_BLOCK
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+
+class StreamingLibrary:
+    """The library of one sigma, regenerated chunk by chunk from its streams instead of stored.
+
+    The pairs are those of ppq.pairs.build_library and the satellite that of
+    SatelliteString.from_streams with the same seed; both are drawn block by block, so neither
+    depends on the chunk size, which is rounded up to whole blocks.
+    """
+
+    def __init__(self, m, n, sigma, seed, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.m, self.n, self.sigma = m, n, sigma
+        self.streams = seed if isinstance(seed, Streams) else Streams(seed)
+        self.chunk_size = -(-chunk_size // STREAM_BLOCK) * STREAM_BLOCK      # Whole blocks per chunk
+        self.chunks = -(-m // self.chunk_size)
+        self._block = (None, None)     # Last block's (b, B, bits) arrays, shared by consecutive small chunks
+
+        # Number of bits the satellite changes, and how many of them fall in each block
+        rng = self.streams.generator(SATELLITE, n, sigma_key(sigma), 0)
+        self.number = int(rng.integers(1, m + 1, endpoint=True))
+        self.satellite_counts = allocate(min(self.number, m), m, STREAM_BLOCK, rng)
+
+    def chunk_length(self, c):
+        return min(self.chunk_size, self.m - c * self.chunk_size)
+
+    def blocks(self, c):
+        """Range of the blocks making up chunk c."""
+        start = c * self.chunk_size // STREAM_BLOCK
+        return range(start, start + -(-self.chunk_length(c) // STREAM_BLOCK))
+
+    def pairs(self, c):
+        """PairLibrary of chunk c."""
+        start = c * self.chunk_size
+        stop = start + self.chunk_length(c)
+        pieces = []
+        for block in range(start // STREAM_BLOCK, -(-stop // STREAM_BLOCK)):
+            if self._block[0] != block:
+                self._block = (block, generate_block(self.n, self.sigma, self.streams, block))
+            offset = block * STREAM_BLOCK
+            pieces.append([array[max(start - offset, 0):stop - offset] for array in self._block[1]])
+        return PairLibrary.from_arrays(*(np.concatenate(arrays) for arrays in zip(*pieces)), self.n)
+
+    def chunk(self, c):
+        """Pairs, Bob's bit string and the satellite's changed positions of chunk c."""
+        pairs = self.pairs(c)
+        convert_pairs = pairs.bits
+        sat_positions = join([random_mask(block_length(block, self.m), self.satellite_counts[block],
+                                          self.streams.generator(SATELLITE_CHUNK, self.n, sigma_key(self.sigma), block))
+                              for block in self.blocks(c)])
+        return pairs, convert_pairs, sat_positions
+
+
+def run_streaming_trial(libraries, sigma_list, P_list, R, rng, log=None, max_restarts=None):
+    """Run Steps 2 to 5 chunk by chunk until abs(mu) exceeds MU_THRESHOLD; returns a TrialResult.
+
+    libraries maps each sigma to its StreamingLibrary. Apart from the memory used, the trial,
+    including max_restarts, follows ppq.trial.run_trial.
+    """
+    if log is None:
+        log = _silent
+
+    restarts = 0
+
+    # While mu is too small, repeat from Step 2
+    while True:
+
+        # (2) Initialization of Protocol 2
+        sigma = sigma_list[rng.integers(len(sigma_list))]
+        P = P_list[rng.integers(len(P_list))]
+        P_round = round(1 - P, 1)
+
+        log('Chosen private values:', '\n\tP = ', P_round, '\n\tsigma = ', sigma)
+
+        # (3) Building a bit string: only k and the number of 1's per chunk are drawn here
+        log("Step 2: Creating Alice's random bit string")
+
+        k = draw_k(R, rng)
+        Q1_holder = (k + R) // 2
+        library = libraries[sigma]
+        pick = int(rng.integers(library.m))  # Choose a random bit in Bob's string
+        ones_per_block = allocate(Q1_holder, R, STREAM_BLOCK, rng)
+        key = int(rng.integers(1 << 63))     # Names the generators of the blocks of this attempt
+
+        log('Bit string created with the following values:', '\n\tk = ', k)
+        log('\tQ1 = ', Q1_holder, '\n\tQ0 = ', R - Q1_holder)
+
+        # (4) Distorting the bit string, one chunk at a time
+        log("Step 3: Distorting Alice's bit string")
+
+        pick_pairs = library.pairs(pick // library.chunk_size)
+        if pick_pairs[pick % library.chunk_size][1] == 1:   # If Bob's bit is a 1, Alice chooses the interval [0, Bi]
+            secret_bit = 0
+        else:
+            secret_bit = 1          # If the bit is a 0, she chooses the interval [Bi, n-1]
+
+        Q1_original = Q1_distorted = sat_Q1_distorted = 0
+        for c in range(library.chunks):
+            pairs, convert_pairs, sat_positions = library.chunk(c)
+
+            # Alice's chunk, with exactly each block's share of the 1's, and its mask, drawn from
+            # the generator of each block, as ppq.trial.place_ones draws them
+            blocks = library.blocks(c)
+            block_rngs = [block_generator(key, block) for block in blocks]
+            bit_string = join([random_mask(block_length(block, R), ones_per_block[block], block_rng)
+                               for block, block_rng in zip(blocks, block_rngs)])
+            correct = join([bernoulli_mask(block_length(block, R), P, block_rng)
+                            for block, block_rng in zip(blocks, block_rngs)])
+            Q1_original += sum(ones_per_block[block] for block in blocks)
+
+            retrieved = distort_and_retrieve(bit_string, convert_pairs, pairs.less, pairs.more, secret_bit, correct)
+            sat_retrieved = distort_and_retrieve(bit_string, convert_pairs ^ sat_positions, pairs.less, pairs.more, secret_bit,
+                                                 correct)
+            sat_retrieved ^= sat_positions     # Change the satellite string values back
+
+            Q1_distorted += retrieved.count()
+            sat_Q1_distorted += sat_retrieved.count()
+
+        # Checks if the formula for k holds
+        assert (k == Q1_original - (R - Q1_original))
+
+        # (5) Computing Q1' - Q0'
+        mu = 2 * Q1_distorted - R
+        sat_mu = 2 * sat_Q1_distorted - R
+
+        log('Bit string was distorted to the following values:')
+        log('\tQ1* = ', Q1_distorted, '\n\tQ0* = ', R - Q1_distorted)
+        log('\tmu = ', mu)
+        log('Satellite bit string was distorted to the following values:')
+        log('\tSQ1 = ', sat_Q1_distorted, '\n\tSQ0 = ', R - sat_Q1_distorted)
+        log('\tSmu = ', sat_mu)
+
+        if abs(mu) > MU_THRESHOLD:
+            return TrialResult(sigma, P, P_round, k, mu, sat_mu, restarts)
+
+        restarts += 1
+        if max_restarts is not None and restarts > max_restarts:
+            raise RuntimeError('abs(mu) stayed below %d in %d attempts' % (MU_THRESHOLD, restarts))
+        log('Value mu is too small, returning to Step 2', '\n')
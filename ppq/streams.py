@@ -0,0 +1,53 @@
+"""Reproducible, independent random number streams for every piece of work of a run.
+
+A run has one seed. Each piece of work that draws random numbers (a block of a sigma library,
+a satellite, a trial, a trial request answered by the host) gets its own stream, named by a
+path of integers such as (PAIRS, n, sigma key, block). The stream is a Philox generator, a
+counter-based bit generator, keyed by the run seed's entropy with the path as spawn key, so:
+
+    - the numbers a piece of work draws depend only on the seed and its path, never on which
+      worker runs it, in which order, or how the work is split into chunks;
+    - streams of different paths are independent, so pieces of work can run concurrently.
+
+Streams are cheap to create; a stream is made where it is used rather than passed around.
+"""
+import zlib
+
+import numpy as np
+
+# Kinds of work, the first element of every stream path
+PAIRS = 0               # (PAIRS, n, sigma key, block): one block of a library's pairs
+SATELLITE = 1           # (SATELLITE, n, sigma key, 0): the number of bits a library's satellite changes per block
+SATELLITE_CHUNK = 2     # (SATELLITE_CHUNK, n, sigma key, block): the satellite's changed positions in one block
+TRIAL = 3               # (TRIAL, trial): one trial of the protocol
+ALICE = 4               # (ALICE, session, request): one trial request answered by the host
+SATELLITE_BATCH = 5     # (SATELLITE_BATCH, n, sigma key, 0): the batch of satellites of a library
+
+
+def sigma_key(sigma):
+    """Integer naming sigma in stream paths."""
+    return zlib.crc32(repr(float(sigma)).encode())
+
+
+def generator(seed_sequence):
+    """Philox generator of a stream's seed sequence."""
+    return np.random.Generator(np.random.Philox(seed_sequence))
+
+
+class Streams:
+    """The streams of one run; seed None draws fresh entropy once, shared by all its streams."""
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.entropy = np.random.SeedSequence(seed).entropy
+
+    def __repr__(self):
+        return 'Streams(%r)' % (self.seed,)
+
+    def seed_sequence(self, *path):
+        """Seed sequence of the stream named by path, which can be sent to another process."""
+        return np.random.SeedSequence(self.entropy, spawn_key=path)
+
+    def generator(self, *path):
+        """Generator of the stream named by path."""
+        return generator(self.seed_sequence(*path))
@@ -0,0 +1,281 @@
+"""Sweeps over grids of parameters, with the finished points kept in a SQLite result store.
+
+A sweep spec names the kind of point and, for each parameter, one value or a list of values:
+
+    {"kind": "range", "grid": {"P": [0.2, 0.3, 0.7, 0.8], "sigma": [0.3, 0.4, 0.6, 1.5],
+                               "m": 30000, "seed": [1, 2, 3]}}
+
+plan() expands the grid into points, every parameter not given taking its default, and
+ResultStore keeps the result of each finished point under a key made of its kind, all its
+parameters (seed included) and the version of the code behind it. A sweep only runs the
+points the store does not hold yet, and stores each one as soon as it finishes, so a sweep
+that was stopped, or whose grid was extended, picks up where the store left off.
+
+The kinds of point are:
+
+    range       the range finder for one (P, sigma): the minimum, maximum and mean of q over
+                trials estimates, or the adaptive or analytic range (see ppq.range_finder).
+                The q's are those of Bit Transmission - Range Finder.py run with the same
+                parameters and seed.
+    protocol    trials of the protocol with the libraries of one (m, n): the successes and
+                range fails of Bob's and the satellite's guesses, as counted by
+                Bit String Protocol.py run with the same parameters and seed.
+
+A point's random numbers depend only on its own parameters and seed, so results do not
+depend on the other points of the grid, on the order they run in, or on the number of workers.
+"""
+import itertools
+import json
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from ppq.cache import GENERATOR_VERSION
+from ppq.fastsim import FastLibrary, run_fast_trial
+from ppq.pairs import build_library, generate_pairs
+from ppq.parallel import pool_context
+from ppq.range_finder import MIN_BATCHES, analytic_q, estimate_q, estimate_q_adaptive, interval_hits
+from ppq.satellite import SatelliteString
+from ppq.sigma_table import SigmaTable
+from ppq.streams import TRIAL, Streams, generator
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS, run_trial
+
+# Bump whenever a point gives a different result for the same parameters; stored results of
+# other versions are then recomputed (GENERATOR_VERSION, of the pair libraries, is part of the key too)
+SWEEP_VERSION = 3
+
+# Parameters of each kind of point and their defaults; None marks a parameter the grid must give
+RANGE_DEFAULTS = {'P': None, 'sigma': None, 'm': 30000, 'n': 100, 'N': 500000, 'seed': None,
+                  'trials': 100, 'method': 'trials', 'reuse_pairs': False,
+                  'z': 3.0, 'tolerance': 0.002, 'batch': 50000, 'budget': None}
+PROTOCOL_DEFAULTS = {'m': 5000000, 'n': 100, 'seed': None, 'trials': 100, 'fast_sim': False,
+                     'sigma_table': None}
+
+RANGE_METHODS = ('trials', 'adaptive', 'analytic')
+
+# Restarts after which a protocol point's trial gives up, so a point whose R is too small for
+# abs(mu) to exceed MU_THRESHOLD fails instead of running forever
+MAX_RESTARTS = 1000
+
+
+def _table_crc32(path):
+    with open(path, 'rb') as file:
+        return '%08x' % zlib.crc32(file.read())
+
+
+def run_range_point(P, sigma, m, n, N, seed, trials, method, reuse_pairs, z, tolerance, batch, budget):
+    """The q range of one (P, sigma constant) point of the range finder, as a dict."""
+    if method == 'analytic':
+        q, variance = analytic_q(P, sigma * n, n, m, N)
+        return {'q': q, 'q_min': q - z * variance ** 0.5, 'q_max': q + z * variance ** 0.5, 'draws': 0}
+
+    # The steps of Bit Transmission - Range Finder.py for one point, from one generator
+    rng = np.random.default_rng(seed)
+    pair_pool = None
+    if reuse_pairs:
+        b, B, bits = generate_pairs(m, n, sigma * n, rng)
+        pair_pool = interval_hits(b, B, n)
+
+    if method == 'adaptive':
+        estimate = estimate_q_adaptive(P, sigma * n, m, n, batch, tolerance, budget if budget is not None else 100 * N,
+                                       rng, z, pair_pool)
+        return {'q': estimate.q, 'q_min': estimate.q - estimate.half_width, 'q_max': estimate.q + estimate.half_width,
+                'draws': estimate.draws, 'converged': estimate.converged}
+
+    Q_List = [estimate_q(P, sigma * n, m, n, N, rng, pair_pool) for trial in range(trials)]
+    return {'q': float(np.mean(Q_List)), 'q_min': min(Q_List), 'q_max': max(Q_List), 'draws': trials * N}
+
+
+def run_protocol_point(m, n, seed, trials, fast_sim, sigma_table, table):
+    """Successes and range fails of trials of the protocol with the libraries of (m, n), as a dict.
+
+    sigma_table only names the table in the key; table is the SigmaTable itself.
+    """
+    # The steps of Bit String Protocol.py, from the same streams
+    streams = Streams(seed)
+    R = m
+    sigma_list = sorted(constant * n for constant in SIGMA_CONSTANTS)
+    P_list = sorted(P_VALUES)
+
+    libraries = dict()
+    for val in sigma_list:
+        pairs, convert_pairs = build_library(m, n, val, streams)
+        satellite = SatelliteString.from_streams(convert_pairs, n, val, streams)
+        libraries[val] = (pairs, convert_pairs, satellite)
+        if fast_sim:
+            libraries[val] = FastLibrary.from_library(*libraries[val])
+
+    counts = dict.fromkeys(('successes', 'bad_range', 'sat_successes', 'sat_bad_range', 'restarts'), 0)
+    for trial in range(trials):
+        rng = generator(streams.seed_sequence(TRIAL, trial))
+        if fast_sim:
+            result = run_fast_trial(libraries, sigma_list, P_list, R, rng, max_restarts=MAX_RESTARTS)
+        else:
+            result = run_trial(libraries, sigma_list, P_list, R, rng, max_restarts=MAX_RESTARTS)
+        counts['restarts'] += result.restarts
+
+        for prefix, mu in (('', result.mu), ('sat_', result.sat_mu)):
+            constant = table.classify(result.P_round, 0.5 + mu / (2 * result.k))
+            if constant is None:
+                counts[prefix + 'bad_range'] += 1
+            elif constant * n == result.sigma:
+                counts[prefix + 'successes'] += 1
+
+    counts['success_rate'] = counts['successes'] / trials
+    counts['sat_success_rate'] = counts['sat_successes'] / trials
+    return counts
+
+
+# Kind -> (parameters and defaults, function computing a point)
+KINDS = {'range': (RANGE_DEFAULTS, run_range_point),
+         'protocol': (PROTOCOL_DEFAULTS, run_protocol_point)}
+
+
+def point_key(kind, params):
+    """Key of a point in the result store: its kind, parameters and code versions as canonical JSON."""
+    return json.dumps({'kind': kind, 'params': params, 'version': [SWEEP_VERSION, GENERATOR_VERSION]},
+                      sort_keys=True, separators=(',', ':'))
+
+
+def plan(spec):
+    """Expand a sweep spec into its list of (key, kind, params), in grid order.
+
+    Raises ValueError on an unknown kind or parameter, a required parameter left out, or a
+    point that could not give a result: one without trials, or an adaptive range point whose
+    budget is too small to estimate a q range.
+    """
+    kind = spec.get('kind', 'range')
+    if kind not in KINDS:
+        raise ValueError('unknown kind of point %r, expected one of %s' % (kind, ', '.join(KINDS)))
+    defaults = KINDS[kind][0]
+
+    grid = dict(spec.get('grid', {}))
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError('unknown parameters %s for %s points' % (', '.join(sorted(unknown)), kind))
+
+    # The table's checksum stands for it in the key, so a new table gives new points
+    if kind == 'protocol':
+        if grid.get('sigma_table') is None:
+            raise ValueError('protocol points need a sigma_table')
+        if isinstance(grid['sigma_table'], list):
+            raise ValueError('protocol points take one sigma_table')
+        grid['sigma_table'] = _table_crc32(grid['sigma_table'])
+
+    names = list(defaults)
+    axes = []
+    for name in names:
+        values = grid.get(name, defaults[name])
+        if values is None and name != 'budget':
+            raise ValueError('%s points need a value of %s%s' % (
+                kind, name, ' (results are kept by seed)' if name == 'seed' else ''))
+        axes.append(values if isinstance(values, list) else [values])
+
+    points = []
+    for values in itertools.product(*axes):
+        params = dict(zip(names, values))
+        if kind == 'range' and params['method'] not in RANGE_METHODS:
+            raise ValueError('unknown range method %r, expected one of %s' % (params['method'], ', '.join(RANGE_METHODS)))
+        if params['trials'] < 1 and (kind == 'protocol' or params['method'] == 'trials'):
+            raise ValueError('%s points need at least 1 trial, not %d' % (kind, params['trials']))
+        if kind == 'range' and params['method'] == 'adaptive':
+            budget = params['budget'] if params['budget'] is not None else 100 * params['N']
+            if budget < MIN_BATCHES * params['batch']:
+                raise ValueError('an adaptive budget of %d draws is less than %d batches of %d' % (
+                    budget, MIN_BATCHES, params['batch']))
+        points.append((point_key(kind, params), kind, params))
+    return points
+
+
+class ResultStore:
+    """Results of finished points in the SQLite database at path, keyed by point_key."""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, kind TEXT NOT NULL, '
+                                    'params TEXT NOT NULL, result TEXT NOT NULL, seconds REAL, finished REAL)')
+
+    def load(self, keys):
+        """Dict of key -> result of the given keys that are in the store."""
+        results = dict()
+        keys = list(keys)
+        # SQLite limits the number of parameters of a statement, so the keys are looked up in slices
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            rows = self.connection.execute('SELECT key, result FROM results WHERE key IN (%s)' % ','.join('?' * len(part)),
+                                           part)
+            results.update((key, json.loads(result)) for key, result in rows)
+        return results
+
+    def store(self, key, kind, params, result, seconds):
+        """Keep a finished point; committed at once, so it survives the sweep being stopped."""
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                                    (key, kind, json.dumps(params, sort_keys=True), json.dumps(result), seconds,
+                                     time.time()))
+
+    def close(self):
+        self.connection.close()
+
+
+# State of a worker process, set once by _init_worker
+_worker = dict()
+
+
+def _init_worker(context):
+    _worker.update(context)
+
+
+def _run_point(point):
+    """Run one point; returns (key, result, seconds, error), with error a message and result None on failure."""
+    key, kind, params = point
+    start = time.perf_counter()
+    try:
+        arguments = dict(params)
+        if kind == 'protocol':
+            arguments['table'] = _worker['tables'][params['sigma_table']]
+        result = KINDS[kind][1](**arguments)
+    except Exception as error:
+        return key, None, time.perf_counter() - start, '%s: %s' % (type(error).__name__, error)
+    return key, result, time.perf_counter() - start, None
+
+
+def run_sweep(spec, store, workers=1, on_point=None):
+    """Run the points of spec missing from store on workers processes, storing each as it finishes.
+
+    on_point, if given, is called with (key, kind, params, result, seconds, error) after every
+    point run. Returns the dict of key -> result of every point of the grid that has one, in
+    grid order; points that failed are left out and run again by the next sweep.
+    """
+    points = plan(spec)
+    done = store.load(key for key, kind, params in points)
+    missing = [point for point in points if point[0] not in done]
+
+    context = {'tables': dict()}
+    if spec.get('kind') == 'protocol':
+        path = spec['grid']['sigma_table']
+        context['tables'][_table_crc32(path)] = SigmaTable.load(path)
+
+    by_key = {key: (kind, params) for key, kind, params in missing}
+
+    def finished(outcomes):
+        for key, result, seconds, error in outcomes:
+            kind, params = by_key[key]
+            if error is None:
+                store.store(key, kind, params, result, seconds)
+                done[key] = result
+            if on_point is not None:
+                on_point(key, kind, params, result, seconds, error)
+
+    if workers > 1 and len(missing) > 1:
+        with pool_context().Pool(min(workers, len(missing)), initializer=_init_worker, initargs=(context,)) as pool:
+            finished(pool.imap_unordered(_run_point, missing))
+    else:
+        _init_worker(context)
+        finished(map(_run_point, missing))
+
+    return {key: done[key] for key, kind, params in points if key in done}
@@ -0,0 +1,141 @@
+"""Bob's side of the client: sending his bit strings and running trials over one connection.
+
+Pipelined sending: a producer thread generates each sigma's library one chunk at a time (the
+chunks of a StreamingLibrary) and puts the chunk's bit string on a bounded queue; the sending
+thread takes chunks off the queue and sends them as CHUNK messages. Generation of the next
+chunks overlaps with the socket I/O of the previous ones, the first bytes go out as soon as the
+first chunk exists, and the bounded queue stops the producer when the socket falls behind.
+
+Persistent sessions: each library is uploaded once and named by the library ID the host gives
+it. Trial requests then carry only that ID, P and the secret bit, up to in_flight of them are
+outstanding at once, and each answer (k and Alice's distorted string) is matched to its trial
+by the request ID, so the library never crosses the connection again. As in ppq.trial.run_trial,
+an attempt whose abs(mu) is not above MU_THRESHOLD is restarted, with a new request.
+"""
+import itertools
+import queue
+import threading
+
+from ppq.bitstring import BitString
+from ppq.kernel import retrieve
+from ppq.streaming import StreamingLibrary
+from ppq.streams import TRIAL
+from ppq.trial import MU_THRESHOLD
+from ppq.wire import CHUNK, LIBRARY, TRIAL as TRIAL_MESSAGE, recv_message, send_message
+
+# Default number of bits per chunk and number of chunks waiting to be sent
+DEFAULT_CHUNK_BITS = 1 << 20
+DEFAULT_QUEUE_DEPTH = 4
+
+# Default number of trial requests sent ahead of their answers
+DEFAULT_IN_FLIGHT = 8
+
+# Marks the end of the producer's chunks
+_DONE = object()
+
+
+def produce_chunks(m, n, sigmas, seed, chunk_bits, chunks):
+    """Put (sigma, sequence number, last flag, BitString) on the queue chunks, then _DONE."""
+    try:
+        for sigma in sigmas:
+            library = StreamingLibrary(m, n, sigma, seed, chunk_bits)
+            for c in range(library.chunks):
+                bit_string = library.pairs(c).bits
+                chunks.put((sigma, c, c == library.chunks - 1, bit_string))
+        chunks.put(_DONE)
+    except BaseException as error:
+        chunks.put(error)   # Raised again by the sending thread
+
+
+def send_pipelined(sock, m, n, sigmas, seed, chunk_bits=DEFAULT_CHUNK_BITS, depth=DEFAULT_QUEUE_DEPTH):
+    """Generate and send the bit string of each sigma in chunks; returns the number of chunks sent."""
+    chunks = queue.Queue(maxsize=depth)
+    producer = threading.Thread(target=produce_chunks, args=(m, n, sigmas, seed, chunk_bits, chunks), daemon=True)
+    producer.start()
+
+    sent = 0
+    while True:
+        item = chunks.get()
+        if item is _DONE:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        sigma, sequence, last, bit_string = item
+        send_message(sock, CHUNK, m, n, sigma, bit_string, sequence, last)
+        sent += 1
+
+    producer.join()
+    return sent
+
+
+def upload_libraries(sock, m, n, bit_strings):
+    """Upload the bit string of each sigma once; returns {sigma: library ID}."""
+    library_ids = dict()
+    for request, (sigma, bit_string) in enumerate(sorted(bit_strings.items()), 1):
+        send_message(sock, LIBRARY, m, n, sigma, bit_string, sequence=request)
+        message, _ = recv_message(sock)
+        library_ids[sigma] = message.library
+    return library_ids
+
+
+def run_remote_trials(sock, n, libraries, library_ids, sigma_list, P_list, trials, streams, in_flight=DEFAULT_IN_FLIGHT,
+                      max_restarts=None):
+    """Run trials with the host as Alice; yields (trial, sigma, P, k, mu, restarts) as trials are accepted.
+
+    libraries maps each sigma to (PairLibrary, Bob's bit string). Like ppq.trial.run_trial, each
+    attempt of trial t draws sigma, P and the position that decides Alice's secret bit from the
+    stream of streams named (TRIAL, t), and an attempt with abs(mu) not above MU_THRESHOLD is
+    counted as a restart and followed by the next attempt, with max_restarts as in run_trial.
+    Every attempt is one TRIAL request, numbered in the order the requests are sent; Bob's
+    retrieval from the distorted string the host sends back happens here.
+    """
+    m = {sigma: len(pairs) for sigma, (pairs, bits) in libraries.items()}
+    trials_left = iter(range(trials))
+    requests = itertools.count(1)
+    rngs = dict()       # trial -> its generator, while it runs
+    restarts = dict()   # trial -> number of restarts so far
+    pending = dict()    # request ID -> (trial, sigma, P, secret bit)
+
+    def send_attempt(trial):
+        rng = rngs[trial]
+        sigma = sigma_list[rng.integers(len(sigma_list))]
+        P = P_list[rng.integers(len(P_list))]
+        pairs, bits = libraries[sigma]
+        pick = int(rng.integers(len(pairs)))   # Choose a random bit in Bob's string
+        secret_bit = 0 if pairs[pick][1] == 1 else 1
+        request = next(requests)
+        send_message(sock, TRIAL_MESSAGE, m[sigma], n, sigma, BitString(0), sequence=request,
+                     library=library_ids[sigma], extra=(P, secret_bit))
+        pending[request] = (trial, sigma, P, secret_bit)
+
+    def start_next():
+        trial = next(trials_left, None)
+        if trial is None:
+            return
+        rngs[trial] = streams.generator(TRIAL, trial)
+        restarts[trial] = 0
+        send_attempt(trial)
+
+    for _ in range(in_flight):
+        start_next()
+
+    while pending:
+        message, distorted = recv_message(sock)
+        trial, sigma, P, secret_bit = pending.pop(message.sequence)
+
+        pairs, bits = libraries[sigma]
+        retrieved = retrieve(distorted, pairs.less, pairs.more, secret_bit)
+        (k,) = message.extra
+        mu = 2 * retrieved.count() - m[sigma]
+
+        # Requires that mu be a certain size, or the trial starts over from Step 2
+        if abs(mu) <= MU_THRESHOLD:
+            restarts[trial] += 1
+            if max_restarts is not None and restarts[trial] > max_restarts:
+                raise RuntimeError('abs(mu) stayed below %d in %d attempts' % (MU_THRESHOLD, restarts[trial]))
+            send_attempt(trial)
+            continue
+
+        del rngs[trial]
+        start_next()
+        yield trial, sigma, P, k, mu, restarts.pop(trial)
@@ -0,0 +1,248 @@
+"""One trial of the protocol: Steps 2 to 5, repeated until mu is large enough.
+
+A trial only reads the sigma libraries, so trials are independent of each other once the
+libraries exist. Each library is the tuple (pairs, convert_pairs, satellite): the PairLibrary
+(the arrays b and B, with Bob's bits and the masks less and more), Bob's bit string and the
+SatelliteString holding the satellite's altered copy.
+
+Alice's string and her Bernoulli(P) mask are drawn block by block: the number of her 1's in
+each block of STREAM_BLOCK bits comes from the trial's generator, and the positions of those 1's
+and the block's mask from a generator of the block, keyed by a number the attempt draws from the
+trial's generator (see block_generator). ppq.streaming draws the same
+numbers a chunk of blocks at a time, so with the same seed a trial gives the same result
+whether it runs on whole strings or streams them in chunks of any size.
+"""
+import copy
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from ppq.kernel import bernoulli_mask, distort, distort_and_retrieve, retrieve, satellite_changes
+from ppq.metrics import NO_METRICS
+from ppq.pairs import STREAM_BLOCK
+from ppq.satellite import allocate, block_length, join, random_mask
+from ppq.streams import generator
+
+# Smallest accepted value of abs(mu), suggested abs(mu) > 10000
+MU_THRESHOLD = 10000
+
+# The private values a trial chooses from: sigma = constant * n, and P
+SIGMA_CONSTANTS = (0.3, 0.4, 0.6, 1.5)
+P_VALUES = (0.2, 0.3, 0.7, 0.8)
+
+# Outcome of a trial: the chosen private values, Alice's k, Q1' - Q0' for the original and
+# satellite strings, the number of times mu had to be recalculated and, with a batch of
+# satellites, the array of Q1' - Q0' of each of them
+TrialResult = namedtuple('TrialResult', ['sigma', 'P', 'P_round', 'k', 'mu', 'sat_mu', 'restarts', 'sat_mus'],
+                         defaults=(None,))
+
+# The random inputs of one attempt of a trial (Steps 2 and 3, before mu is known): the chosen
+# sigma and P, Alice's k and bit string, the position of Bob's string that decides her secret
+# bit, and the Bernoulli(P) mask of correct transmissions
+TrialInputs = namedtuple('TrialInputs', ['sigma', 'P', 'k', 'bit_string', 'pick', 'correct'])
+
+
+def _silent(*args):
+    pass
+
+
+def draw_k(R, rng):
+    """Draw k = Q1 - Q0 for Alice's bit string of length R: even, sqrt(R) <= |k| <= R/2, random sign."""
+
+    # Generates a random integer k in given bounds
+    k = int(rng.integers(int(math.sqrt(R)), R // 2, endpoint=True))
+
+    # Guarantees k is even (this is used to guarantee Q1 and Q0 are integers by our method of generation)
+    if k % 2 == 1:
+        k += 1
+
+    # Coin flip to decide if k should be negative
+    flip = rng.integers(0, 2)
+    if flip == 1:
+        k = k * -1
+
+    return k
+
+
+def block_generator(key, block):
+    """Generator of block number block of Alice's string and mask in the attempt that drew key."""
+    return generator(np.random.SeedSequence(key, spawn_key=(block,)))
+
+
+def place_ones(R, Q1_holder, rng):
+    """Alice's bit string of length R with Q1_holder 1's at random; returns it and the generator of each block.
+
+    The generator of a block places the block's 1's and then draws its part of the Bernoulli(P)
+    mask (see bernoulli_blocks).
+    """
+    # Number of 1's in each block, then a generator for each block
+    ones_per_block = allocate(Q1_holder, R, STREAM_BLOCK, rng)
+    key = int(rng.integers(1 << 63))
+    block_rngs = [block_generator(key, block) for block in range(len(ones_per_block))]
+
+    # Randomly selects the positions of each block's 1's
+    bit_string = join([random_mask(block_length(block, R), ones, block_rng)
+                       for block, (ones, block_rng) in enumerate(zip(ones_per_block, block_rngs))])
+    return bit_string, block_rngs
+
+
+def bernoulli_blocks(R, P, block_rngs):
+    """Bernoulli(P) mask of length R, each block drawn from its generator of place_ones."""
+    return join([bernoulli_mask(block_length(block, R), P, block_rng) for block, block_rng in enumerate(block_rngs)])
+
+
+def build_alice_string(R, rng):
+    """Create Alice's random bit string of length R; returns (k, bit_string) with k = Q1 - Q0."""
+    k = draw_k(R, rng)
+
+    # Q1_holder is the number of 1's we will place randomly in the string
+    Q1_holder = (k + R) // 2
+
+    bit_string, block_rngs = place_ones(R, Q1_holder, rng)
+    return k, bit_string
+
+
+def draw_inputs(sigma_list, P_list, sizes, R, rng, metrics=NO_METRICS):
+    """Draw the TrialInputs of one attempt from rng, in the order the steps of a trial use them.
+
+    sizes maps each sigma to the number of pairs m of its library.
+    """
+    # Selects random sigma and P
+    sigma = sigma_list[rng.integers(len(sigma_list))]
+    P = P_list[rng.integers(len(P_list))]
+
+    k = draw_k(R, rng)
+    pick = int(rng.integers(sizes[sigma]))  # Choose a random bit in Bob's string
+
+    with metrics.stage('step2.alice', bits=R):
+        bit_string, block_rngs = place_ones(R, (k + R) // 2, rng)
+
+    # Bernoulli(P) mask: a 1 wherever Alice does the correct bit transmission
+    with metrics.stage('step3.mask', bits=R):
+        correct = bernoulli_blocks(R, P, block_rngs)
+
+    return TrialInputs(sigma, P, k, bit_string, pick, correct)
+
+
+def run_trial(libraries, sigma_list, P_list, R, rng, log=None, metrics=NO_METRICS, batches=None, inputs=None,
+              max_restarts=None):
+    """Run Steps 2 to 5 until abs(mu) exceeds MU_THRESHOLD and return a TrialResult.
+
+    libraries maps each sigma to its library tuple (see the module docstring). log, if given,
+    is called like print with the progress messages of each step, and the time of each step
+    is added to metrics. batches, if given, maps each sigma to a SatelliteBatch whose
+    satellites are all evaluated against the accepted trial, giving TrialResult.sat_mus.
+    inputs, if given, is an iterator of the TrialInputs of each attempt, used instead of
+    drawing them from rng (see ppq.pipeline); rng is then not used. With max_restarts, a trial
+    restarting more often than that raises RuntimeError instead of trying on, since for small R
+    abs(mu) can all but never exceed MU_THRESHOLD.
+    """
+    if log is None:
+        log = _silent
+
+    restarts = 0
+    sizes = {sigma: len(libraries[sigma][0]) for sigma in sigma_list}
+
+    # While mu is too small, repeat from Step 2
+    while True:
+
+        # (2) Initialization of Protocol 2 ========================================================================================
+
+        # Random sigma, P, Alice's string, pick and mask of this attempt
+        if inputs is None:
+            attempt = draw_inputs(sigma_list, P_list, sizes, R, rng, metrics)
+        else:
+            with metrics.stage('pipeline.wait'):
+                attempt = next(inputs)
+        sigma, P, k = attempt.sigma, attempt.P, attempt.k
+        P_round = round(1 - P, 1)   # We calculate 1-P as use that as our 'printed' P value
+        # This is done so that our table of values created by the first program is matched here
+        # e.g., values of q created by P actually lie in the table for 1-P
+
+        log('Chosen private values:', '\n\tP = ', P_round, '\n\tsigma = ', sigma)
+
+        # (3) Building a bit string ==========================================================================================
+
+        log("Step 2: Creating Alice's random bit string")
+
+        bit_string = attempt.bit_string
+
+        # Number of 1's
+        Q1_original = bit_string.count()
+        # Number of 0's
+        Q0_original = R - Q1_original
+
+        # Checks if the formula for k holds
+        assert (k == Q1_original - Q0_original)
+
+        # Creates a copy of the generated bit string for use in satellite bit string testing
+        sat_bit_string = copy.copy(bit_string)
+
+        log('Bit string created with the following values:', '\n\tk = ', k)
+        log('\tQ1 = ', Q1_original, '\n\tQ0 = ', Q0_original)
+
+        # (4) Main loop: distorting the bit string ============================================================================
+
+        # Renames library of pairs, the chosen bit string and the satellite's copy for simplicity below
+        pairs, convert_pairs, satellite = libraries[sigma]
+        sat_convert_pairs = satellite.string
+
+        log("Step 3: Distorting Alice's bit string")
+
+        secret_bit = -1 # Initialize Alice's secret bit to an impossible value
+        pick = attempt.pick     # The random bit chosen in Bob's string
+        if pairs[pick][1] == 1:     # If Bob's bit is a 1, Alice chooses the interval [0, Bi]
+            secret_bit = 0
+        else:
+            secret_bit = 1          # If the bit is a 0, she chooses the interval [Bi, n-1]
+        assert (secret_bit >= 0)
+
+        correct = attempt.correct
+
+        # Masks of the pairs with b < B and with b > B, kept with the library
+        b_less, b_more = pairs.less, pairs.more
+
+        # Distorting the bit string and Bob's retrieval of b, for the original and satellite strings
+        # (see ppq.kernel.distort_and_retrieve_reference for the per-bit version of these rules)
+        with metrics.stage('step3.distortion', bits=2 * R):
+            distorted = distort(bit_string, convert_pairs, secret_bit, correct)
+            bit_string = retrieve(distorted, b_less, b_more, secret_bit)
+            sat_bit_string = distort_and_retrieve(sat_bit_string, sat_convert_pairs, b_less, b_more, secret_bit, correct)
+
+        # This code is used to change the satellite string values back
+        with metrics.stage('step3.restore', bits=R):
+            satellite.restore(sat_bit_string)
+
+        # (5) Computing Q1' - Q0' =========================================================
+
+        # New values after bit string distortion
+        Q1_distorted = bit_string.count()  # Q1'
+        Q0_distorted = R - Q1_distorted  # Q0'
+        mu = Q1_distorted - Q0_distorted  # Q1' - Q0'
+
+        log('Bit string was distorted to the following values:')
+        log('\tQ1* = ', Q1_distorted, '\n\tQ0* = ', Q0_distorted)
+        log('\tmu = ', mu)
+
+        sat_Q1_distorted = sat_bit_string.count()
+        sat_Q0_distorted = R - sat_Q1_distorted
+        sat_mu = sat_Q1_distorted - sat_Q0_distorted
+
+        log('Satellite bit string was distorted to the following values:')
+        log('\tSQ1 = ', sat_Q1_distorted, '\n\tSQ0 = ', sat_Q0_distorted)
+        log('\tSmu = ', sat_mu)
+
+        # Requires that mu be a certain size, suggested abs(mu) > 10000
+        if abs(mu) > MU_THRESHOLD:
+            sat_mus = None
+            if batches is not None:
+                with metrics.stage('step3.satellites', bits=R):
+                    gain, loss = satellite_changes(distorted, bit_string, b_less, b_more, secret_bit)
+                    sat_mus = 2 * batches[sigma].count_ones(Q1_distorted, gain, loss) - R
+            return TrialResult(sigma, P, P_round, k, mu, sat_mu, restarts, sat_mus)
+
+        restarts += 1
+        if max_restarts is not None and restarts > max_restarts:
+            raise RuntimeError('abs(mu) stayed below %d in %d attempts' % (MU_THRESHOLD, restarts))
+        log('Value mu is too small, returning to Step 2', '\n')
@@ -0,0 +1,180 @@
+"""Framing and binary format of the messages between client and host.
+
+Every message on a connection is one frame: the payload length as a 4-byte big-endian integer,
+followed by the payload. The asyncio functions are used by the host, the blocking socket
+functions by the client. A connection closed between frames ends the stream; one closed inside
+a frame raises ConnectionError.
+
+A bit string message is a fixed header (magic, message type, m, n, sigma, the number of bits,
+a sequence number and a last flag) followed by the bits packed 8 to a byte, most significant
+bit first, exactly as a BitString holds them. It is sent straight from the BitString's buffer
+and received into one preallocated buffer, which the received BitString then wraps, so neither
+side copies the bits.
+
+A whole string is one BITSTRING message. A string sent while it is being generated is a run of
+CHUNK messages with sequence numbers 0, 1, ..., the last one flagged; every chunk but the last
+holds a multiple of 8 bits, so the chunks' bytes join into the string's bytes. The host answers
+a completed run with an ACK whose m is the number of bits reassembled and whose library ID
+names the string from then on.
+
+In a persistent session Bob's string for each sigma is uploaded once as a LIBRARY message; the
+host's ACK gives it a library ID. Each TRIAL request then names a library ID, with the request
+ID in the sequence field and P and the secret bit in the fields after the header, and the host
+answers with a RESULT for the same request ID holding k and Alice's distorted string. Requests
+may be sent without waiting for earlier answers, which can come back in any order.
+"""
+import asyncio
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from ppq.bitstring import BitString
+
+# Payload length prefix
+LENGTH = struct.Struct('!I')
+
+# Largest payload accepted by default, in bytes
+DEFAULT_MAX_FRAME = 1 << 30
+
+# Message header: magic, message type, m, n, sigma, number of bits, sequence number (or request
+# ID), last flag, library ID
+MAGIC = b'PPQ1'
+HEADER = struct.Struct('!4sBIIdQI?I')
+
+# Message types
+BITSTRING = 1
+CHUNK = 2
+ACK = 3
+LIBRARY = 4
+TRIAL = 5
+RESULT = 6
+
+# Fields following the header in some message types: P and secret bit of a TRIAL, k of a RESULT
+EXTRA = {TRIAL: struct.Struct('!dB'), RESULT: struct.Struct('!q')}
+
+Message = namedtuple('Message', ['type', 'm', 'n', 'sigma', 'nbits', 'sequence', 'last', 'library', 'extra'],
+                     defaults=[()])
+
+
+def _check_size(length, max_size):
+    if length > max_size:
+        raise ValueError('frame of %d bytes exceeds the limit of %d bytes' % (length, max_size))
+
+
+async def read_frame(reader, max_size=DEFAULT_MAX_FRAME):
+    """Read one frame's payload from an asyncio StreamReader, or None at the end of the stream."""
+    try:
+        header = await reader.readexactly(LENGTH.size)
+    except asyncio.IncompleteReadError as error:
+        if not error.partial:
+            return None
+        raise ConnectionError('connection closed inside a frame header') from None
+    (length,) = LENGTH.unpack(header)
+    _check_size(length, max_size)
+
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError as error:
+        raise ConnectionError('connection closed after %d of %d payload bytes' % (len(error.partial), length)) from None
+
+
+def write_frame(writer, *buffers):
+    """Queue one frame made of the given buffers on an asyncio StreamWriter; the caller drains it."""
+    writer.write(LENGTH.pack(sum(memoryview(buffer).nbytes for buffer in buffers)))
+    for buffer in buffers:
+        writer.write(memoryview(buffer).cast('B'))
+
+
+def send_frame(sock, payload):
+    """Send one frame on a blocking socket."""
+    sock.sendall(LENGTH.pack(len(payload)))
+    sock.sendall(payload)
+
+
+def send_buffers(sock, buffers):
+    """Send several buffers back to back on a blocking socket, without joining them."""
+    views = [memoryview(buffer).cast('B') for buffer in buffers]
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if views:
+            views[0] = views[0][sent:]
+
+
+def recv_into(sock, view):
+    """Fill the writable memoryview view from a blocking socket."""
+    size = len(view)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError('connection closed after %d of %d bytes' % (received, size))
+        received += count
+
+
+def recv_exactly(sock, size):
+    """Receive exactly size bytes from a blocking socket into a new bytearray."""
+    buffer = bytearray(size)
+    recv_into(sock, memoryview(buffer))
+    return buffer
+
+
+def recv_frame(sock, max_size=DEFAULT_MAX_FRAME):
+    """Receive one frame's payload from a blocking socket."""
+    (length,) = LENGTH.unpack(recv_exactly(sock, LENGTH.size))
+    _check_size(length, max_size)
+    return recv_exactly(sock, length)
+
+
+# Bit string messages
+
+def unpack_header(payload):
+    """Message header at the start of payload; raises ValueError if it is not one."""
+    if len(payload) < HEADER.size:
+        raise ValueError('message of %d bytes is shorter than its header' % len(payload))
+    magic, *fields = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError('message does not start with %r' % MAGIC)
+    return Message(*fields)
+
+
+def decode_message(payload):
+    """Split a received payload into its Message header and a BitString wrapping its bits."""
+    message = unpack_header(payload)
+    offset = HEADER.size
+    if message.type in EXTRA:
+        fields = EXTRA[message.type]
+        if len(payload) < offset + fields.size:
+            raise ValueError('message of type %d is too short for its fields' % message.type)
+        message = message._replace(extra=fields.unpack_from(payload, offset))
+        offset += fields.size
+    data = np.frombuffer(payload, dtype=np.uint8, offset=offset)
+    bit_string = BitString.from_bytes(data, message.nbits)
+    if message.nbits % 8 and data[-1] & (0xFF >> (message.nbits % 8)):
+        raise ValueError('padding bits of the last byte are not 0')
+    return message, bit_string
+
+
+def encode_header(message_type, m, n, sigma, nbits=0, sequence=0, last=True, library=0, extra=()):
+    """Header of a message, with its extra fields if the type has them.
+
+    On its own it is a complete message without bits, such as an ACK.
+    """
+    header = HEADER.pack(MAGIC, message_type, m, n, sigma, nbits, sequence, last, library)
+    if message_type in EXTRA:
+        header += EXTRA[message_type].pack(*extra)
+    return header
+
+
+def send_message(sock, message_type, m, n, sigma, bit_string, sequence=0, last=True, library=0, extra=()):
+    """Send bit_string with its header, directly from the BitString's packed buffer."""
+    header = encode_header(message_type, m, n, sigma, len(bit_string), sequence, last, library, extra)
+    send_buffers(sock, [LENGTH.pack(len(header) + len(bit_string.data)) + header, bit_string.data])
+
+
+def recv_message(sock, max_size=DEFAULT_MAX_FRAME):
+    """Receive one bit string message; returns (Message, BitString)."""
+    return decode_message(recv_frame(sock, max_size))
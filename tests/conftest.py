@@ -0,0 +1,5 @@
+# The tests import ppq from the repository root, like the scripts and benchmarks
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
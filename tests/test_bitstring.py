@@ -0,0 +1,131 @@
+"""BitString against the same operations on a numpy array of bools."""
+import numpy as np
+import pytest
+
+from ppq.bitstring import BitString, popcount_rows
+
+LENGTHS = [0, 1, 7, 8, 9, 63, 64, 1001]
+
+
+def random_bits(length, seed):
+    return np.random.default_rng(seed).integers(0, 2, length).astype(bool)
+
+
+def padding(bit_string):
+    """The unused bits of the last byte, which must stay 0."""
+    extra = len(bit_string.data) * 8 - len(bit_string)
+    return int(bit_string.data[-1]) & ((1 << extra) - 1) if extra else 0
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_round_trip_and_count(length):
+    bits = random_bits(length, length)
+    bit_string = BitString.from_bits(bits)
+    assert len(bit_string.data) == (length + 7) // 8
+    assert np.array_equal(bit_string.unpack(), bits)
+    assert list(bit_string) == bits.astype(int).tolist()
+    assert bit_string.count() == np.count_nonzero(bits)
+    assert BitString.from_bytes(bit_string.tobytes(), length) == bit_string
+
+
+def test_from_bytes_checks_the_length():
+    with pytest.raises(ValueError):
+        BitString.from_bytes(bytes(2), 17)
+
+
+@pytest.mark.parametrize('length', [1001, 64])
+@pytest.mark.parametrize('start, stop, step', [(0, 16, 1), (8, 1000, 1), (3, 900, 1), (5, 6, 1), (7, 7, 1),
+                                               (-20, None, 1), (1, None, 3), (None, None, -1), (16, 64, 1)])
+def test_slicing(length, start, stop, step):
+    bits = random_bits(length, 1)
+    sliced = BitString.from_bits(bits)[start:stop:step]
+    assert np.array_equal(sliced.unpack(), bits[start:stop:step])
+    assert padding(sliced) == 0
+    assert sliced.count() == np.count_nonzero(bits[start:stop:step])
+
+
+@pytest.mark.parametrize('length', [1, 9, 1001])
+def test_padding_stays_clear(length):
+    bit_string = BitString.from_bits(random_bits(length, 2))
+    inverted = ~bit_string
+    assert padding(inverted) == 0
+    assert inverted.count() == length - bit_string.count()
+    assert (~BitString(length)).count() == length
+
+
+def test_item_access():
+    bits = random_bits(100, 3)
+    bit_string = BitString.from_bits(bits)
+    assert [bit_string[i] for i in range(100)] == bits.astype(int).tolist()
+    assert bit_string[-1] == bits[-1]
+    with pytest.raises(IndexError):
+        bit_string[100]
+
+
+def test_setitem():
+    rng = np.random.default_rng(4)
+    bits = random_bits(1001, 4)
+    bit_string = BitString.from_bits(bits)
+
+    for index in rng.integers(0, 1001, 50):
+        value = int(rng.integers(0, 2))
+        bit_string[int(index)] = value
+        bits[index] = value
+    bit_string[-1] = 1
+    bits[-1] = True
+
+    ones, zeros = rng.choice(1001, 200, replace=False), rng.choice(1001, 200, replace=False)
+    bit_string[ones] = 1
+    bits[ones] = True
+    bit_string[zeros] = 0
+    bits[zeros] = False
+
+    # Repeated indices in one call
+    bit_string[np.array([5, 5, 6, 6])] = 1
+    bits[[5, 6]] = True
+
+    assert np.array_equal(bit_string.unpack(), bits)
+    assert padding(bit_string) == 0
+    with pytest.raises(IndexError):
+        bit_string[1001] = 1
+
+
+def test_take_and_flip():
+    rng = np.random.default_rng(5)
+    bits = random_bits(1001, 5)
+    bit_string = BitString.from_bits(bits)
+    indices = rng.integers(0, 1001, 300)
+    assert np.array_equal(bit_string.take(indices), bits[indices])
+
+    distinct = rng.choice(1001, 300, replace=False)
+    bit_string.flip(distinct)
+    bits[distinct] ^= True
+    assert np.array_equal(bit_string.unpack(), bits)
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_bitwise_operations(length):
+    a, b = random_bits(length, 6), random_bits(length, 7)
+    x, y = BitString.from_bits(a), BitString.from_bits(b)
+    assert np.array_equal((x ^ y).unpack(), a ^ b)
+    assert np.array_equal((x & y).unpack(), a & b)
+    assert np.array_equal((x | y).unpack(), a | b)
+
+    z = x.copy()
+    z ^= y
+    assert np.array_equal(z.unpack(), a ^ b)
+    z &= x
+    assert np.array_equal(z.unpack(), (a ^ b) & a)
+    z |= y
+    assert np.array_equal(z.unpack(), ((a ^ b) & a) | b)
+    assert np.array_equal(x.unpack(), a)    # The copy shares nothing with x
+
+
+def test_lengths_must_match():
+    with pytest.raises(ValueError):
+        BitString(8) ^ BitString(9)
+
+
+def test_popcount_rows():
+    rows = np.random.default_rng(8).integers(0, 256, (5, 13), dtype=np.uint8)
+    assert np.array_equal(popcount_rows(rows), np.unpackbits(rows, axis=1).sum(axis=1))
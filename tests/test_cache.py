@@ -0,0 +1,108 @@
+"""LibraryCache: hits and misses, corrupted entries, keys and least recently used eviction."""
+import os
+
+import numpy as np
+
+import ppq.cache
+from ppq.cache import LibraryCache
+from ppq.metrics import Metrics
+from ppq.pairs import build_library
+
+M, N, SIGMA = 1000, 100, 40.0
+
+
+def same_library(cached, expected):
+    (library, bits), (expected_library, expected_bits) = cached, expected
+    return (np.array_equal(library.b, expected_library.b) and np.array_equal(library.B, expected_library.B)
+            and bits == expected_bits)
+
+
+def cache_counts(metrics):
+    return {name: count for name, count in metrics.counters.items() if name.startswith('cache.')}
+
+
+def entries(cache):
+    return sorted(name for name in os.listdir(cache.directory) if not name.startswith('.'))
+
+
+def test_miss_then_hit(tmp_path):
+    cache, metrics = LibraryCache(str(tmp_path)), Metrics()
+    first = cache.library(M, N, SIGMA, 1, metrics)
+    second = cache.library(M, N, SIGMA, 1, metrics)
+    assert cache_counts(metrics) == {'cache.misses': 1, 'cache.hits': 1}
+    assert same_library(second, first)
+    assert same_library(second, build_library(M, N, SIGMA, 1))
+    assert isinstance(second[0].b, np.memmap)
+
+
+def test_corrupted_entry_is_rebuilt(tmp_path):
+    cache = LibraryCache(str(tmp_path))
+    expected = cache.library(M, N, SIGMA, 1)
+    path = os.path.join(str(tmp_path), cache.entry_name(M, N, SIGMA, 1), 'B.npy')
+    with open(path, 'r+b') as file:
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 1]))
+
+    assert cache.load(M, N, SIGMA, 1) is None
+    assert entries(cache) == []
+
+    metrics = Metrics()
+    assert same_library(cache.library(M, N, SIGMA, 1, metrics), expected)
+    assert cache_counts(metrics) == {'cache.misses': 1}
+    assert same_library(cache.load(M, N, SIGMA, 1), expected)
+
+
+def test_missing_file_is_rebuilt(tmp_path):
+    cache = LibraryCache(str(tmp_path))
+    expected = cache.library(M, N, SIGMA, 1)
+    os.remove(os.path.join(str(tmp_path), cache.entry_name(M, N, SIGMA, 1), 'bits.npy'))
+    assert cache.load(M, N, SIGMA, 1) is None
+    assert same_library(cache.library(M, N, SIGMA, 1), expected)
+
+
+def test_keyed_by_seed_and_generator_version(tmp_path, monkeypatch):
+    cache, metrics = LibraryCache(str(tmp_path)), Metrics()
+    one = cache.library(M, N, SIGMA, 1, metrics)
+    two = cache.library(M, N, SIGMA, 2, metrics)
+    assert not same_library(one, two)
+    assert cache_counts(metrics) == {'cache.misses': 2}
+    assert same_library(cache.load(M, N, SIGMA, 2), two)
+
+    monkeypatch.setattr(ppq.cache, 'GENERATOR_VERSION', ppq.cache.GENERATOR_VERSION + 1)
+    assert cache.load(M, N, SIGMA, 1) is None
+    cache.library(M, N, SIGMA, 1, metrics)
+    assert cache_counts(metrics) == {'cache.misses': 3}
+    assert len(entries(cache)) == 3
+
+
+def test_unseeded_libraries_are_not_cached(tmp_path):
+    cache, metrics = LibraryCache(str(tmp_path)), Metrics()
+    cache.library(M, N, SIGMA, None, metrics)
+    cache.library(M, N, SIGMA, None, metrics)
+    assert cache_counts(metrics) == {}
+    assert not os.path.exists(str(tmp_path)) or entries(cache) == []
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = LibraryCache(str(tmp_path))
+    for seed in (1, 2, 3):
+        cache.library(M, N, SIGMA, seed)
+        # Spread the use times, so the order does not rest on the file system's timestamp resolution
+        os.utime(os.path.join(str(tmp_path), cache.entry_name(M, N, SIGMA, seed), 'manifest.json'),
+                 (1000 * seed, 1000 * seed))
+    size = sum(entry.stat().st_size for entry in os.scandir(os.path.join(str(tmp_path),
+                                                                         cache.entry_name(M, N, SIGMA, 1))))
+
+    # Using seed 1 makes seed 2 the least recently used
+    assert cache.load(M, N, SIGMA, 1) is not None
+    # Manifests differ by a few bytes, so leave room for that but not for a fourth entry
+    cache.max_bytes = 3 * size + size // 2
+    cache.library(M, N, SIGMA, 4)
+    assert entries(cache) == sorted(cache.entry_name(M, N, SIGMA, seed) for seed in (1, 3, 4))
+
+    # The entry just stored is kept even when it alone is over the cap
+    cache.max_bytes = 0
+    cache.library(M, N, SIGMA, 5)
+    assert entries(cache) == [cache.entry_name(M, N, SIGMA, 5)]
@@ -0,0 +1,48 @@
+"""The count-based fast simulation against distorting whole strings as run_trial does."""
+import math
+
+import numpy as np
+import pytest
+
+from ppq.fastsim import FastLibrary, sample_ones
+from ppq.kernel import bernoulli_mask, distort_and_retrieve
+from ppq.pairs import build_library
+from ppq.satellite import SatelliteString, random_mask
+from ppq.trial import SIGMA_CONSTANTS
+
+# Largest z-score allowed between the means of the two simulations, and bounds of the ratio of their variances
+Z_TOLERANCE = 5
+VARIANCE_RATIO = (0.5, 2)
+
+
+def full_ones(library, R, Q1_holder, P, secret_bit, rng):
+    """Q1' for the original and the satellite strings, by distorting whole strings."""
+    pairs, convert_pairs, satellite = library
+    bit_string = random_mask(R, Q1_holder, rng)
+    correct = bernoulli_mask(R, P, rng)
+    retrieved = distort_and_retrieve(bit_string, convert_pairs, pairs.less, pairs.more, secret_bit, correct)
+    sat_retrieved = satellite.restore(distort_and_retrieve(bit_string, satellite.string, pairs.less, pairs.more,
+                                                           secret_bit, correct))
+    return retrieved.count(), sat_retrieved.count()
+
+
+@pytest.mark.parametrize('constant', SIGMA_CONSTANTS)
+@pytest.mark.parametrize('P', [0.2, 0.8])
+@pytest.mark.parametrize('secret_bit', [0, 1])
+def test_fast_matches_full(constant, P, secret_bit):
+    R, n, draws, seed = 20000, 100, 100, 2019
+    rng = np.random.default_rng(seed)
+    pairs, bits = build_library(R, n, constant * n, seed)
+    library = (pairs, bits, SatelliteString(bits, rng))
+    counts = FastLibrary.from_library(*library).counts
+    Q1_holder = R // 2 + R // 8
+
+    full = np.array([full_ones(library, R, Q1_holder, P, secret_bit, rng) for draw in range(draws)], dtype=np.float64)
+    fast = np.array([sample_ones(counts, Q1_holder, P, secret_bit, rng) for draw in range(draws)], dtype=np.float64)
+
+    # Column 0 is Bob's Q1', column 1 the satellite's
+    for column in range(2):
+        full_variance, fast_variance = full[:, column].var(ddof=1), fast[:, column].var(ddof=1)
+        z = (full[:, column].mean() - fast[:, column].mean()) / math.sqrt((full_variance + fast_variance) / draws + 1e-12)
+        assert abs(z) < Z_TOLERANCE
+        assert VARIANCE_RATIO[0] < (full_variance + 1) / (fast_variance + 1) < VARIANCE_RATIO[1]
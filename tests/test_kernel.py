@@ -0,0 +1,34 @@
+"""The packed distortion and retrieval kernel against the per-bit reference loop."""
+import numpy as np
+import pytest
+
+from ppq.bitstring import BitString
+from ppq.kernel import bernoulli_mask, distort_and_retrieve, distort_and_retrieve_reference
+from ppq.pairs import generate_pairs
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('R', [1, 7, 8, 13, 1000, 4099])
+@pytest.mark.parametrize('secret_bit', [0, 1])
+def test_kernel_matches_reference(seed, R, secret_bit):
+    n = 100
+    rng = np.random.default_rng(seed)
+    b, B, bits = generate_pairs(R, n, 0.4 * n, rng)
+
+    # Generated B is never equal to b, so some pairs are given B = b to cover that case too
+    B = B.copy()
+    equal = rng.random(R) < 0.1
+    B[equal] = b[equal]
+    pairs = np.column_stack((b, B))
+
+    bob_bits = BitString.from_bits(bits)
+    bit_string = BitString.from_bits(rng.integers(0, 2, R))
+    correct = bernoulli_mask(R, 0.7, rng)
+
+    expected = distort_and_retrieve_reference(bit_string.unpack().tolist(), bob_bits.unpack().tolist(),
+                                              pairs.tolist(), secret_bit, correct.unpack().tolist())
+    b_less = BitString.from_bits(b < B)
+    b_more = BitString.from_bits(b > B)
+    retrieved = distort_and_retrieve(bit_string, bob_bits, b_less, b_more, secret_bit, correct)
+
+    assert retrieved == BitString.from_bits(expected)
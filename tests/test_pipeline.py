@@ -0,0 +1,57 @@
+"""Trials with their inputs drawn by a TrialPipeline against trials drawing their own."""
+import pytest
+
+import ppq.trial
+from ppq.pairs import build_library
+from ppq.pipeline import TrialPipeline
+from ppq.satellite import SatelliteString
+from ppq.streams import TRIAL, Streams, generator
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS, run_trial
+
+R, N, TRIALS = 20000, 100, 8
+
+SIGMA_LIST = sorted(constant * N for constant in SIGMA_CONSTANTS)
+P_LIST = sorted(P_VALUES)
+
+
+@pytest.fixture(scope='module')
+def libraries():
+    streams = Streams(11)
+    result = dict()
+    for sigma in SIGMA_LIST:
+        pairs, bits = build_library(R, N, sigma, streams)
+        result[sigma] = (pairs, bits, SatelliteString.from_streams(bits, N, sigma, streams))
+    return result
+
+
+@pytest.fixture
+def threshold(monkeypatch):
+    # Low enough for R = 20000 to pass, high enough for some attempts to restart
+    monkeypatch.setattr(ppq.trial, 'MU_THRESHOLD', 1500)
+
+
+def seeds():
+    return [Streams(3).seed_sequence(TRIAL, trial) for trial in range(TRIALS)]
+
+
+@pytest.mark.parametrize('depth', [1, 2, 4])
+@pytest.mark.parametrize('threads', [1, 3])
+def test_pipeline_matches_serial(libraries, threshold, depth, threads):
+    expected = [run_trial(libraries, SIGMA_LIST, P_LIST, R, generator(seed)) for seed in seeds()]
+    assert sum(result.restarts for result in expected) > 0
+
+    pipeline = TrialPipeline(seeds(), SIGMA_LIST, P_LIST, {sigma: R for sigma in SIGMA_LIST}, R, depth, threads)
+    results = []
+    for trial in range(TRIALS):
+        results.append(run_trial(libraries, SIGMA_LIST, P_LIST, R, None, inputs=pipeline.inputs(trial)))
+        pipeline.finished(trial)
+    pipeline.close()
+    assert results == expected
+
+
+def test_producer_errors_reach_the_trial(libraries):
+    # No size for any sigma: drawing the pick fails in the producer thread
+    pipeline = TrialPipeline(seeds(), SIGMA_LIST, P_LIST, dict(), R)
+    with pytest.raises(KeyError):
+        run_trial(libraries, SIGMA_LIST, P_LIST, R, None, inputs=pipeline.inputs(0))
+    pipeline.close()
@@ -0,0 +1,27 @@
+"""The analytic q of the range finder against its Monte Carlo estimate."""
+import math
+
+import numpy as np
+import pytest
+
+from ppq.range_finder import analytic_q, estimate_q
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS
+
+# The trial mean may be at most Z_TOLERANCE standard errors, and Q_TOLERANCE in absolute terms, from the analytic q
+Z_TOLERANCE = 5
+Q_TOLERANCE = 0.01
+
+
+@pytest.mark.parametrize('P', P_VALUES)
+@pytest.mark.parametrize('constant', SIGMA_CONSTANTS)
+def test_analytic_q_matches_estimate(P, constant):
+    m, n, N, trials = 20000, 100, 100000, 5
+    rng = np.random.default_rng(2019)
+    sigma = constant * n
+
+    Q_List = [estimate_q(P, sigma, m, n, N, rng) for trial in range(trials)]
+    q, variance = analytic_q(P, sigma, n, m, N)
+
+    mean = float(np.mean(Q_List))
+    assert abs(mean - q) / math.sqrt(variance / trials) < Z_TOLERANCE
+    assert mean == pytest.approx(q, abs=Q_TOLERANCE)
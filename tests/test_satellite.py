@@ -0,0 +1,66 @@
+"""Satellites: the batched evaluation against distorting each satellite's whole string."""
+import numpy as np
+import pytest
+
+from ppq.bitstring import BitString
+from ppq.kernel import bernoulli_mask, distort, distort_and_retrieve, retrieve, satellite_changes
+from ppq.pairs import PairLibrary, build_library
+from ppq.satellite import SatelliteBatch, SatelliteString, random_mask
+from ppq.streams import Streams
+
+
+def full_mask(batch, row, R):
+    """The changed positions of one satellite of batch as a whole string."""
+    mask = BitString(R)
+    mask[batch.positions[np.unpackbits(batch.masks[row], count=len(batch.positions)) == 1]] = 1
+    return mask
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+@pytest.mark.parametrize('secret_bit', [0, 1])
+def test_batch_matches_full_evaluation(seed, secret_bit):
+    R, n = 20000, 100
+    rng = np.random.default_rng(seed)
+    library, bits = build_library(R, n, 0.4 * n, seed)
+
+    # A generated B never equals b, and only pairs with b = B let a satellite differ from Bob
+    B = library.B.copy()
+    equal = rng.choice(R, R // 50, replace=False)
+    B[equal] = library.b[equal]
+    library = PairLibrary(library.b, B, bits)
+
+    bit_string = random_mask(R, R // 2, rng)
+    correct = bernoulli_mask(R, 0.7, rng)
+    batch = SatelliteBatch.random(library.less, library.more, 20, rng)
+
+    distorted = distort(bit_string, bits, secret_bit, correct)
+    retrieved = retrieve(distorted, library.less, library.more, secret_bit)
+    gain, loss = satellite_changes(distorted, retrieved, library.less, library.more, secret_bit)
+    counts = batch.count_ones(retrieved.count(), gain, loss)
+
+    expected = []
+    for row in range(len(batch)):
+        mask = full_mask(batch, row, R)
+        expected.append((distort_and_retrieve(bit_string, bits ^ mask, library.less, library.more, secret_bit, correct)
+                         ^ mask).count())
+    assert list(counts) == expected
+    assert any(count != retrieved.count() for count in counts)
+
+
+def test_rows_without_trials():
+    library, bits = build_library(1000, 100, 40.0, 1)
+    batch = SatelliteBatch.random(library.less, library.more, 3, np.random.default_rng(1))
+    for row in batch.rows():
+        assert row['trials'] == 0
+        assert row['success_rate'] is None and row['q_mean'] is None and row['q_min'] is None
+
+
+def test_satellite_from_streams():
+    m = 150000
+    bits = BitString.from_bits(np.random.default_rng(3).integers(0, 2, m))
+    satellite = SatelliteString.from_streams(bits, 100, 40.0, Streams(9))
+    again = SatelliteString.from_streams(bits, 100, 40.0, Streams(9))
+    assert satellite.positions == again.positions
+    assert 1 <= satellite.number <= m
+    assert satellite.string == bits ^ satellite.positions
+    assert satellite.restore(satellite.string.copy()) == bits
@@ -0,0 +1,132 @@
+"""What the host keeps of each session's messages."""
+import numpy as np
+import pytest
+
+from ppq.bitstring import BitString
+from ppq.server import Host, Session
+from ppq.wire import ACK, BITSTRING, CHUNK, LIBRARY, decode_message, encode_header, unpack_header
+
+
+def message(message_type, bit_string, sigma=40.0, sequence=0, last=True, m=None):
+    """Payload and decoded (Message, BitString) of a message holding bit_string."""
+    m = len(bit_string) if m is None else m
+    payload = encode_header(message_type, m, 100, sigma, len(bit_string), sequence, last) + bit_string.tobytes()
+    return (payload,) + decode_message(payload)
+
+
+def send(host, session, message_type, bit_string, **fields):
+    payload, header, bits = message(message_type, bit_string, **fields)
+    return host.handle_message(session, header, bits, payload)
+
+
+def random_string(length, seed):
+    return BitString.from_bits(np.random.default_rng(seed).integers(0, 2, length))
+
+
+def test_bitstring_is_echoed_and_not_kept():
+    host, session = Host(trial_threads=1), Session(1, None)
+    bit_string = random_string(1000, 1)
+    for _ in range(10):
+        payload, = send(host, session, BITSTRING, bit_string)
+        assert decode_message(payload)[1] == bit_string
+    assert not session.state.get('libraries')
+
+
+def test_library_upload_gets_an_id():
+    host, session = Host(trial_threads=1), Session(1, None)
+    strings = [random_string(1000, seed) for seed in range(3)]
+    ids = [unpack_header(send(host, session, LIBRARY, string)[0]).library for string in strings]
+    assert ids == [1, 2, 3]
+    assert [session.state['libraries'][library] for library in ids] == strings
+
+
+def test_libraries_are_capped():
+    host, session = Host(trial_threads=1, max_libraries=2), Session(1, None)
+    send(host, session, LIBRARY, random_string(16, 1))
+    send(host, session, LIBRARY, random_string(16, 2))
+    with pytest.raises(ValueError):
+        send(host, session, LIBRARY, random_string(16, 3))
+
+
+def test_completed_chunk_run_is_a_library():
+    host, session = Host(trial_threads=1), Session(1, None)
+    bit_string = random_string(20, 1)
+    assert send(host, session, CHUNK, bit_string[:16], sequence=0, last=False, m=20) is None
+    ack, = send(host, session, CHUNK, bit_string[16:], sequence=1, m=20)
+    header = unpack_header(ack)
+    assert header.type == ACK and header.m == 20
+    assert session.state['libraries'][header.library] == bit_string
+
+
+def test_unfinished_chunk_runs_are_capped():
+    host, session = Host(trial_threads=1, max_chunk_runs=2), Session(1, None)
+    send(host, session, CHUNK, random_string(16, 1), sigma=30.0, last=False, m=32)
+    send(host, session, CHUNK, random_string(16, 2), sigma=40.0, last=False, m=32)
+    with pytest.raises(ValueError):
+        send(host, session, CHUNK, random_string(16, 3), sigma=60.0, last=False, m=32)
+
+
+def chunks(bit_string, size):
+    """(sequence number, chunk, last flag) of bit_string cut into chunks of size bits."""
+    starts = list(range(0, len(bit_string), size))
+    return [(sequence, bit_string[start:start + size], sequence == len(starts) - 1)
+            for sequence, start in enumerate(starts)]
+
+
+@pytest.mark.parametrize('order', [[0, 1, 2, 3], [3, 2, 1, 0], [2, 0, 3, 1], [3, 0, 1, 2]])
+def test_chunks_out_of_order(order):
+    host, session = Host(trial_threads=1), Session(1, None)
+    bit_string = random_string(60, 1)
+    run = chunks(bit_string, 16)
+    replies = [send(host, session, CHUNK, run[i][1], sequence=run[i][0], last=run[i][2], m=60) for i in order]
+    assert replies[:-1] == [None] * 3
+    header = unpack_header(replies[-1][0])
+    assert (header.type, header.m, header.sequence) == (ACK, 60, 3)
+    assert session.state['libraries'][header.library] == bit_string
+    assert not session.state['chunks']
+
+
+def test_runs_of_different_sigmas_interleave():
+    host, session = Host(trial_threads=1), Session(1, None)
+    strings = {30.0: random_string(24, 1), 40.0: random_string(24, 2)}
+    for sequence in (0, 1):
+        for sigma, bit_string in strings.items():
+            send(host, session, CHUNK, bit_string[16 * sequence:16 * sequence + 16], sigma=sigma, sequence=sequence,
+                 last=sequence == 1, m=24)
+    # Libraries are numbered in the order their runs complete
+    assert session.state['libraries'] == {1: strings[30.0], 2: strings[40.0]}
+
+
+@pytest.mark.parametrize('sequence', [0, 2])
+def test_duplicate_chunk(sequence):
+    host, session = Host(trial_threads=1), Session(1, None)
+    run = chunks(random_string(40, 1), 16)
+    for chunk_sequence, chunk, last in (run[0], run[2]):
+        assert send(host, session, CHUNK, chunk, sequence=chunk_sequence, last=last, m=40) is None
+    with pytest.raises(ValueError, match='received twice'):
+        send(host, session, CHUNK, run[sequence][1], sequence=sequence, last=run[sequence][2], m=40)
+
+
+def test_chunk_after_the_last():
+    host, session = Host(trial_threads=1), Session(1, None)
+    bit_string = random_string(48, 1)
+    send(host, session, CHUNK, bit_string[16:32], sequence=1, m=48)
+    with pytest.raises(ValueError, match='follows the last chunk'):
+        send(host, session, CHUNK, bit_string[32:], sequence=2, last=False, m=48)
+
+
+def test_chunk_that_is_not_whole_bytes():
+    # Only the last chunk may end inside a byte, or the chunks' bytes would not join into the string's
+    host, session = Host(trial_threads=1), Session(1, None)
+    bit_string = random_string(30, 1)
+    send(host, session, CHUNK, bit_string[:13], sequence=0, last=False, m=30)
+    with pytest.raises(ValueError, match='whole bytes'):
+        send(host, session, CHUNK, bit_string[13:], sequence=1, m=30)
+
+
+def test_chunks_of_the_wrong_length():
+    host, session = Host(trial_threads=1), Session(1, None)
+    bit_string = random_string(30, 1)
+    send(host, session, CHUNK, bit_string[:16], sequence=0, last=False, m=40)
+    with pytest.raises(ValueError, match='instead of 40'):
+        send(host, session, CHUNK, bit_string[16:], sequence=1, m=40)
@@ -0,0 +1,66 @@
+"""SigmaTable: building, saving and classifying q values."""
+import math
+
+import numpy as np
+import pytest
+
+from ppq.sigma_table import SigmaTable
+
+ROWS = [(0.2, 0.3, 0.10, 0.20), (0.2, 0.4, 0.25, 0.30), (0.2, 1.5, 0.40, 0.50), (0.7, 0.6, 0.60, 0.70)]
+
+
+def classified(table, P, q):
+    """classify and classify_many of each q, which must agree."""
+    one = [table.classify(P, value) for value in q]
+    many = table.classify_many(P, q)
+    assert [None if math.isnan(value) else value for value in many] == one
+    return one
+
+
+def test_classify_inside_on_boundaries_and_outside():
+    table = SigmaTable(ROWS)
+    assert classified(table, 0.2, [0.15, 0.27, 0.45]) == [0.3, 0.4, 1.5]
+    assert classified(table, 0.2, [0.10, 0.20, 0.25, 0.30, 0.40, 0.50]) == [0.3, 0.3, 0.4, 0.4, 1.5, 1.5]
+    assert classified(table, 0.2, [0.0, 0.05, np.nextafter(0.2, 1), 0.22, 0.35, 0.55, 1.0]) == [None] * 7
+    assert classified(table, 0.7, [0.65, 0.15]) == [0.6, None]
+
+
+def test_unknown_P():
+    table = SigmaTable(ROWS)
+    assert classified(table, 0.3, [0.15]) == [None]
+    assert classified(table, 1 - 0.8, [0.15]) == [0.3]
+
+
+def test_rejects_overlapping_and_empty_ranges():
+    with pytest.raises(ValueError):
+        SigmaTable([(0.2, 0.3, 0.10, 0.20), (0.2, 0.4, 0.15, 0.30)])
+    with pytest.raises(ValueError):
+        SigmaTable([(0.2, 0.3, 0.10, 0.20), (0.2, 0.4, 0.20, 0.30)])    # Sharing a boundary
+    with pytest.raises(ValueError):
+        SigmaTable([(0.2, 0.3, 0.20, 0.10)])
+    # The same ranges for different P do not overlap
+    SigmaTable([(0.2, 0.3, 0.10, 0.20), (0.7, 0.3, 0.10, 0.20)])
+
+
+def test_from_estimates_splits_overlaps():
+    table = SigmaTable.from_estimates([(0.2, 0.4, 0.18, 0.30), (0.2, 0.3, 0.10, 0.22)])
+    rows = list(table.rows())
+    assert rows[0][1:3] == (0.3, 0.10) and rows[1][1:] == (0.4, 0.20, 0.30)
+    assert rows[0][3] < rows[1][2]
+    assert classified(table, 0.2, [0.19, 0.20, 0.21]) == [0.3, 0.4, 0.4]
+
+
+@pytest.mark.parametrize('q_min, q_max', [(-math.inf, math.inf), (math.nan, math.nan), (0.1, math.inf)])
+def test_rejects_ranges_that_are_not_finite(q_min, q_max):
+    # An adaptive estimate stopped before MIN_BATCHES batches has an infinite half-width
+    with pytest.raises(ValueError):
+        SigmaTable.from_estimates([(0.2, 0.3, 0.10, 0.20), (0.2, 0.4, q_min, q_max)])
+    with pytest.raises(ValueError):
+        SigmaTable([(0.2, 0.4, q_min, q_max)])
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'table.csv')
+    table = SigmaTable.from_estimates([(0.2, 0.4, 0.18, 0.30), (0.2, 0.3, 0.10, 0.22), (0.7, 0.6, 0.6, 0.7)])
+    table.save(path)
+    assert list(SigmaTable.load(path).rows()) == list(table.rows())
@@ -0,0 +1,91 @@
+"""The same seed gives the same trials whatever the worker count, chunk size or engine."""
+import pytest
+
+import ppq.streaming
+
+from ppq.pairs import build_library
+from ppq.parallel import SharedLibraries, run_trials_parallel
+from ppq.pipeline import TrialPipeline
+from ppq.satellite import SatelliteString
+from ppq.streaming import StreamingLibrary, run_streaming_trial
+from ppq.streams import TRIAL, Streams, generator
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS, run_trial
+
+# Large enough for abs(mu) to pass MU_THRESHOLD, and not a whole number of blocks
+M, N, SEED, TRIALS = 400000, 100, 5, 4
+
+SIGMA_LIST = sorted(constant * N for constant in SIGMA_CONSTANTS)
+P_LIST = sorted(P_VALUES)
+
+
+def trial_seeds(streams):
+    return [streams.seed_sequence(TRIAL, trial) for trial in range(TRIALS)]
+
+
+def whole_libraries(streams, workers=1):
+    libraries = dict()
+    for sigma in SIGMA_LIST:
+        pairs, bits = build_library(M, N, sigma, streams, workers=workers)
+        libraries[sigma] = (pairs, bits, SatelliteString.from_streams(bits, N, sigma, streams))
+    return libraries
+
+
+@pytest.fixture(scope='module')
+def expected():
+    streams = Streams(SEED)
+    libraries = whole_libraries(streams)
+    return [run_trial(libraries, SIGMA_LIST, P_LIST, M, generator(seed)) for seed in trial_seeds(streams)]
+
+
+def test_library_workers(expected):
+    streams = Streams(SEED)
+    libraries = whole_libraries(streams, workers=2)
+    assert [run_trial(libraries, SIGMA_LIST, P_LIST, M, generator(seed)) for seed in trial_seeds(streams)] == expected
+
+
+def test_trial_workers(expected):
+    streams = Streams(SEED)
+    shared = SharedLibraries(whole_libraries(streams))
+    try:
+        assert list(run_trials_parallel(shared, SIGMA_LIST, P_LIST, M, trial_seeds(streams), 2)) == expected
+    finally:
+        shared.close()
+
+
+def test_pipeline(expected):
+    # The seed sequences are used twice, so nothing drawn may depend on their earlier use
+    streams = Streams(SEED)
+    libraries = whole_libraries(streams)
+    seeds = trial_seeds(streams)
+    assert [run_trial(libraries, SIGMA_LIST, P_LIST, M, generator(seed)) for seed in seeds] == expected
+
+    pipeline = TrialPipeline(seeds, SIGMA_LIST, P_LIST, {sigma: M for sigma in SIGMA_LIST}, M, 2, 2)
+    results = []
+    for trial in range(TRIALS):
+        results.append(run_trial(libraries, SIGMA_LIST, P_LIST, M, None, inputs=pipeline.inputs(trial)))
+        pipeline.finished(trial)
+    pipeline.close()
+    assert results == expected
+
+
+@pytest.mark.parametrize('chunk_size', [65536, 200000, 1 << 22])
+def test_streaming(expected, chunk_size):
+    streams = Streams(SEED)
+    libraries = {sigma: StreamingLibrary(M, N, sigma, streams, chunk_size) for sigma in SIGMA_LIST}
+    assert [run_streaming_trial(libraries, SIGMA_LIST, P_LIST, M, generator(seed))
+            for seed in trial_seeds(streams)] == expected
+
+
+def test_streaming_max_restarts(monkeypatch):
+    monkeypatch.setattr(ppq.streaming, 'MU_THRESHOLD', 10 ** 9)
+    streams = Streams(SEED)
+    libraries = {sigma: StreamingLibrary(20000, N, sigma, streams, 65536) for sigma in SIGMA_LIST}
+    with pytest.raises(RuntimeError):
+        run_streaming_trial(libraries, SIGMA_LIST, P_LIST, 20000, generator(trial_seeds(streams)[0]), max_restarts=3)
+
+
+@pytest.mark.parametrize('m', [0, -1])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_library_needs_pairs(m, workers):
+    with pytest.raises(ValueError):
+        build_library(m, N, SIGMA_LIST[0], SEED, workers=workers)
@@ -0,0 +1,36 @@
+"""Sweep plans: expanding grids into points and rejecting points that cannot give a result."""
+import pytest
+
+from ppq.sweep import plan
+
+RANGE = {'P': 0.2, 'sigma': 0.3, 'seed': 1}
+
+
+def test_grid_is_expanded_in_order():
+    points = plan({'kind': 'range', 'grid': dict(RANGE, P=[0.2, 0.8], sigma=[0.3, 0.4])})
+    assert [(params['P'], params['sigma']) for key, kind, params in points] == [(0.2, 0.3), (0.2, 0.4),
+                                                                                (0.8, 0.3), (0.8, 0.4)]
+    assert len({key for key, kind, params in points}) == 4
+
+
+@pytest.mark.parametrize('grid', [dict(RANGE, trials=0), dict(RANGE, trials=[10, 0]),
+                                  dict(RANGE, method='adaptive', N=1000),
+                                  dict(RANGE, method='adaptive', batch=1000, budget=9999),
+                                  dict(RANGE, method='unknown'), dict(RANGE, unknown=1), {'P': 0.2, 'sigma': 0.3}])
+def test_rejected_range_points(grid):
+    with pytest.raises(ValueError):
+        plan({'kind': 'range', 'grid': grid})
+
+
+@pytest.mark.parametrize('grid', [dict(RANGE, method='analytic', trials=0),
+                                  dict(RANGE, method='adaptive', trials=0, batch=1000, budget=10000)])
+def test_trials_are_not_needed_without_the_trials_method(grid):
+    assert len(plan({'kind': 'range', 'grid': grid})) == 1
+
+
+def test_protocol_points_need_trials(tmp_path):
+    table = tmp_path / 'table.csv'
+    table.write_text('P,sigma,q_min,q_max\n0.2,0.3,0.1,0.2\n')
+    assert len(plan({'kind': 'protocol', 'grid': {'seed': 1, 'sigma_table': str(table)}})) == 1
+    with pytest.raises(ValueError):
+        plan({'kind': 'protocol', 'grid': {'seed': 1, 'trials': 0, 'sigma_table': str(table)}})
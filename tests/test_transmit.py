@@ -0,0 +1,128 @@
+"""Persistent sessions: LIBRARY, TRIAL and RESULT messages between Bob's client and the host."""
+import asyncio
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+import ppq.transmit
+from ppq.bitstring import BitString
+from ppq.pairs import build_library
+from ppq.server import Host, alice_trial
+from ppq.streams import Streams
+from ppq.transmit import run_remote_trials, upload_libraries
+from ppq.wire import ACK, LIBRARY, RESULT, TRIAL, decode_message, encode_header, recv_message, send_frame
+from ppq.trial import P_VALUES, SIGMA_CONSTANTS
+
+N = 100
+
+
+def libraries(m, seed):
+    """{sigma: (PairLibrary, bit string)} of every sigma constant."""
+    return {constant * N: build_library(m, N, constant * N, seed) for constant in SIGMA_CONSTANTS}
+
+
+def test_messages_round_trip():
+    bits = BitString.from_bits(np.random.default_rng(1).integers(0, 2, 1001))
+
+    message, data = decode_message(encode_header(LIBRARY, 1001, N, 40.0, 1001, sequence=3) + bits.tobytes())
+    assert (message.type, message.m, message.n, message.sigma, message.sequence) == (LIBRARY, 1001, N, 40.0, 3)
+    assert data == bits
+
+    message, data = decode_message(encode_header(TRIAL, 1001, N, 40.0, sequence=7, library=2, extra=(0.7, 1)))
+    assert (message.type, message.sequence, message.library, message.extra) == (TRIAL, 7, 2, (0.7, 1))
+    assert len(data) == 0
+
+    message, data = decode_message(encode_header(RESULT, 1001, N, 40.0, 1001, sequence=7, library=2, extra=(-8,))
+                                   + bits.tobytes())
+    assert (message.type, message.sequence, message.library, message.extra) == (RESULT, 7, 2, (-8,))
+    assert data == bits
+
+
+def serve(host, sock):
+    """Run one session of host on sock until the client closes its end."""
+    async def run():
+        reader, writer = await asyncio.open_connection(sock=sock, limit=host.read_buffer)
+        await host.handle_connection(reader, writer)
+    asyncio.run(run())
+
+
+def fake_host(sock, in_flight, reverse):
+    """Answer LIBRARY uploads, then each batch of in_flight TRIAL requests, in reverse order if reverse.
+
+    Alice's generator of a request is seeded with its request ID.
+    """
+    strings = dict()
+    while True:
+        try:
+            message, bits = recv_message(sock)
+        except ConnectionError:
+            return
+        if message.type == LIBRARY:
+            strings[len(strings) + 1] = bits
+            send_frame(sock, encode_header(ACK, message.m, message.n, message.sigma, sequence=message.sequence,
+                                           library=len(strings)))
+            continue
+
+        batch = [message]
+        sock.settimeout(0.2)
+        try:
+            while len(batch) < in_flight:
+                batch.append(recv_message(sock)[0])
+        except (socket.timeout, ConnectionError):
+            pass
+        sock.settimeout(None)
+        for message in (reversed(batch) if reverse else batch):
+            header, data = alice_trial(message, strings[message.library], np.random.default_rng(message.sequence))
+            send_frame(sock, header + data.tobytes())
+
+
+def remote_trials(host, library_set, trials, in_flight, seed=5):
+    client, server = socket.socketpair()
+    thread = threading.Thread(target=host, args=(server,), daemon=True)
+    thread.start()
+    with client:
+        bits = {sigma: bits for sigma, (pairs, bits) in library_set.items()}
+        library_ids = upload_libraries(client, len(next(iter(bits.values()))), N, bits)
+        results = list(run_remote_trials(client, N, library_set, library_ids, sorted(library_set), sorted(P_VALUES),
+                                         trials, Streams(seed), in_flight))
+    thread.join(10)
+    return results
+
+
+def test_trials_restart_until_mu_is_large_enough(monkeypatch):
+    monkeypatch.setattr(ppq.transmit, 'MU_THRESHOLD', 2000)
+    results = remote_trials(lambda sock: serve(Host(trial_threads=2, seed=3), sock), libraries(20000, 1), 12, 4)
+
+    assert sorted(result[0] for result in results) == list(range(12))
+    for trial, sigma, P, k, mu, restarts in results:
+        assert abs(mu) > 2000
+        assert k % 2 == 0
+    assert sum(result[5] for result in results) > 0
+
+
+def test_answers_out_of_order(monkeypatch):
+    # Every attempt is accepted, so request IDs, and with them Alice's strings, do not depend on the order of answers
+    monkeypatch.setattr(ppq.transmit, 'MU_THRESHOLD', -1)
+    library_set = libraries(5000, 2)
+    in_order = remote_trials(lambda sock: fake_host(sock, 4, False), library_set, 10, 4)
+    reversed_order = remote_trials(lambda sock: fake_host(sock, 4, True), library_set, 10, 4)
+
+    assert [result[0] for result in reversed_order] != list(range(10))
+    assert sorted(reversed_order) == sorted(in_order)
+    assert all(result[5] == 0 for result in in_order)
+
+
+def test_max_restarts(monkeypatch):
+    monkeypatch.setattr(ppq.transmit, 'MU_THRESHOLD', 10 ** 9)
+    client, server = socket.socketpair()
+    thread = threading.Thread(target=serve, args=(Host(trial_threads=1, seed=3), server), daemon=True)
+    thread.start()
+    library_set = libraries(2000, 3)
+    with client:
+        library_ids = upload_libraries(client, 2000, N, {sigma: bits for sigma, (pairs, bits) in library_set.items()})
+        with pytest.raises(RuntimeError):
+            list(run_remote_trials(client, N, library_set, library_ids, sorted(library_set), sorted(P_VALUES), 1,
+                                   Streams(5), 1, max_restarts=3))
+    thread.join(10)
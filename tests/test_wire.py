@@ -0,0 +1,81 @@
+"""Messages and frames: decoding well-formed payloads and rejecting malformed ones."""
+import socket
+
+import numpy as np
+import pytest
+
+from ppq.bitstring import BitString
+from ppq.wire import (BITSTRING, CHUNK, HEADER, LENGTH, MAGIC, RESULT, TRIAL, decode_message, encode_header,
+                      recv_frame, recv_message, send_message)
+
+
+def bit_string(length, seed=1):
+    return BitString.from_bits(np.random.default_rng(seed).integers(0, 2, length))
+
+
+@pytest.mark.parametrize('length', [0, 1, 8, 13, 1001])
+def test_round_trip(length):
+    bits = bit_string(length)
+    message, data = decode_message(encode_header(CHUNK, 5000, 100, 40.0, length, sequence=4, last=False)
+                                   + bits.tobytes())
+    assert tuple(message) == (CHUNK, 5000, 100, 40.0, length, 4, False, 0, ())
+    assert data == bits
+
+
+def test_short_header():
+    payload = encode_header(BITSTRING, 13, 100, 40.0, 13) + bit_string(13).tobytes()
+    for size in (0, 4, HEADER.size - 1):
+        with pytest.raises(ValueError, match='shorter than its header'):
+            decode_message(payload[:size])
+
+
+def test_bad_magic():
+    payload = encode_header(BITSTRING, 13, 100, 40.0, 13) + bit_string(13).tobytes()
+    assert payload.startswith(MAGIC)
+    with pytest.raises(ValueError, match='does not start with'):
+        decode_message(b'PPQ0' + payload[len(MAGIC):])
+
+
+@pytest.mark.parametrize('message_type, extra', [(TRIAL, (0.7, 1)), (RESULT, (-8,))])
+def test_extra_fields_too_short(message_type, extra):
+    payload = encode_header(message_type, 13, 100, 40.0, sequence=1, library=1, extra=extra)
+    decode_message(payload)
+    with pytest.raises(ValueError, match='too short for its fields'):
+        decode_message(payload[:-1])
+
+
+@pytest.mark.parametrize('nbits, nbytes', [(13, 1), (13, 3), (16, 1), (16, 3), (0, 1), (1, 0)])
+def test_wrong_data_length(nbits, nbytes):
+    with pytest.raises(ValueError, match='does not hold'):
+        decode_message(encode_header(BITSTRING, 16, 100, 40.0, nbits) + bytes(nbytes))
+
+
+@pytest.mark.parametrize('nbits, last_byte', [(13, 0x01), (13, 0x04), (9, 0x7F), (1, 0x80 | 0x01)])
+def test_nonzero_padding(nbits, last_byte):
+    data = bytearray(bit_string(nbits).tobytes())
+    data[-1] |= last_byte
+    with pytest.raises(ValueError, match='padding bits'):
+        decode_message(encode_header(BITSTRING, nbits, 100, 40.0, nbits) + bytes(data))
+
+
+def test_messages_over_a_socket():
+    bits = bit_string(1001)
+    left, right = socket.socketpair()
+    with left, right:
+        send_message(left, BITSTRING, 1001, 100, 40.0, bits, sequence=2)
+        message, data = recv_message(right)
+        assert (message.type, message.nbits, message.sequence) == (BITSTRING, 1001, 2)
+        assert data == bits
+
+        left.sendall(LENGTH.pack(1 << 20))
+        with pytest.raises(ValueError, match='exceeds the limit'):
+            recv_frame(right, max_size=1 << 10)
+
+
+def test_connection_closed_inside_a_frame():
+    left, right = socket.socketpair()
+    with right:
+        with left:
+            left.sendall(LENGTH.pack(100) + bytes(10))
+        with pytest.raises(ConnectionError):
+            recv_frame(right)